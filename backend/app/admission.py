@@ -0,0 +1,302 @@
+"""
+Admission control for inbound HTTP requests.
+
+Every request is sorted into a route group and must hold a slot while it
+runs. ADMISSION_MAX_CONCURRENCY slots exist for the routes that work the
+database: emergency routes (Red Alert, resolve, sending a broadcast, safety
+mode) and auth have reserved slots no one else can take, and share the rest
+with dashboard traffic (default, which includes broadcast acks). The kiosk
+path (public), served from memory, has a small pool of its own, so a kiosk
+flood and a dashboard flood cannot starve each other. A request that finds
+no slot waits in its group's FIFO queue; freed slots go to emergency
+waiters first. A full queue or a wait past the group's timeout is answered
+at once with 503 + Retry-After, so overload sheds the excess instead of
+stretching every request's latency. /public/* is also rate-limited per
+client IP with token buckets (429 + Retry-After).
+
+WebSockets, the health check and metrics scrapes are not admitted here.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import (
+    ADMISSION_EMERGENCY_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_PUBLIC_MAX_CONCURRENCY,
+    ADMISSION_PUBLIC_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ADMISSION_RESERVED_AUTH,
+    ADMISSION_RESERVED_EMERGENCY,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    ADMISSION_TRUST_FORWARDED_FOR,
+    PUBLIC_RATE_BURST,
+    PUBLIC_RATE_PER_SECOND,
+)
+
+EMERGENCY = "emergency"
+AUTH = "auth"
+DEFAULT = "default"
+PUBLIC = "public"
+
+EMERGENCY_PREFIXES = (
+    "/emergency/red-alert",
+    "/emergency/resolve",
+    "/emergency/voice-alert",
+    "/ai/safety-mode",
+)
+# Sending a broadcast is an emergency; the ack storm and ack-count polls
+# that follow it (/emergency/broadcasts/…) are default traffic, so they
+# cannot queue ahead of a Red Alert.
+EMERGENCY_PATHS = {"/emergency/broadcast", "/emergency/broadcast/"}
+EXEMPT_PATHS = {"/", "/metrics", "/emergency/admission/metrics"}
+# Client IPs remembered for rate limiting (least recently seen are forgotten)
+MAX_TRACKED_CLIENTS = 10000
+
+
+def route_group(path: str) -> Optional[str]:
+    """The group a request path is admitted under (None = not admitted here)."""
+    if path in EXEMPT_PATHS:
+        return None
+    if path in EMERGENCY_PATHS or path.startswith(EMERGENCY_PREFIXES):
+        return EMERGENCY
+    if path.startswith("/auth/"):
+        return AUTH
+    if path.startswith("/public/"):
+        return PUBLIC
+    return DEFAULT
+
+
+class _Group:
+    def __init__(self, name: str, reserved: int, limit: int, queue_timeout: float):
+        self.name = name
+        self.reserved = reserved
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_reserved = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.rate_limited = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.active,
+            "reserved": self.reserved,
+            "limit": self.limit,
+            "waiting": len(self.waiters),
+            "admitted_total": self.admitted,
+            "queued_total": self.queued,
+            "shed_queue_full_total": self.shed_queue_full,
+            "shed_timeout_total": self.shed_timeout,
+            "rate_limited_total": self.rate_limited,
+            "queue_wait_ms_avg": round(self.wait_ms_total / self.queued, 2) if self.queued else 0.0,
+            "queue_wait_ms_max": round(self.wait_ms_max, 2),
+        }
+
+
+class _TokenBuckets:
+    """Per-key token buckets: `rate` tokens/second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key → [tokens, updated]
+
+    def take(self, key: str, now: float) -> float:
+        """Spend a token: 0.0 if allowed, else seconds until one is available."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class Controller:
+    """Slot accounting; only touched from the event loop, so it needs no locks."""
+
+    def __init__(
+        self,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        reserved_emergency: int = ADMISSION_RESERVED_EMERGENCY,
+        reserved_auth: int = ADMISSION_RESERVED_AUTH,
+        public_limit: int = ADMISSION_PUBLIC_MAX_CONCURRENCY,
+    ):
+        self.shared = max(1, max_concurrency - reserved_emergency - reserved_auth)
+        self.shared_active = 0
+        # Listed in wake-up priority order
+        self.groups: Dict[str, _Group] = {
+            EMERGENCY: _Group(EMERGENCY, reserved_emergency, reserved_emergency + self.shared,
+                              ADMISSION_EMERGENCY_QUEUE_TIMEOUT_SECONDS),
+            AUTH: _Group(AUTH, reserved_auth, reserved_auth + self.shared // 2, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+            DEFAULT: _Group(DEFAULT, 0, self.shared, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+            PUBLIC: _Group(PUBLIC, public_limit, public_limit, ADMISSION_PUBLIC_QUEUE_TIMEOUT_SECONDS),
+        }
+        self.public_buckets = _TokenBuckets(PUBLIC_RATE_PER_SECOND, PUBLIC_RATE_BURST)
+
+    def _try_acquire(self, group: _Group) -> Optional[bool]:
+        """Take a slot if one is free: True = reserved, False = shared, None = none free."""
+        if group.active >= group.limit:
+            return None
+        if group.active_reserved < group.reserved:
+            group.active_reserved += 1
+            group.active += 1
+            return True
+        if self.shared_active < self.shared:
+            self.shared_active += 1
+            group.active += 1
+            return False
+        return None
+
+    def release(self, group: _Group, reserved: bool) -> None:
+        group.active -= 1
+        if reserved:
+            group.active_reserved -= 1
+        else:
+            self.shared_active -= 1
+        self._wake()
+
+    @staticmethod
+    def _abandon(group: _Group, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        group.waiters.remove(waiter)
+
+    def _wake(self) -> None:
+        for group in self.groups.values():
+            while group.waiters:
+                slot = self._try_acquire(group)
+                if slot is None:
+                    break
+                group.waiters.popleft().set_result(slot)
+
+    async def acquire(self, group: _Group) -> Optional[bool]:
+        """
+        A slot for `group` (True = reserved, False = shared), waiting up to
+        the group's queue timeout; None = shed (queue full or timed out).
+        """
+        # Arrivals do not overtake requests already queued in their group
+        if not group.waiters:
+            slot = self._try_acquire(group)
+            if slot is not None:
+                group.admitted += 1
+                return slot
+        if len(group.waiters) >= ADMISSION_MAX_QUEUE:
+            group.shed_queue_full += 1
+            return None
+
+        waiter = asyncio.get_running_loop().create_future()
+        group.waiters.append(waiter)
+        group.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=group.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued: hand back a slot granted meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release(group, waiter.result())
+            else:
+                self._abandon(group, waiter)
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000
+        group.wait_ms_total += waited_ms
+        group.wait_ms_max = max(group.wait_ms_max, waited_ms)
+        if not waiter.done():
+            self._abandon(group, waiter)
+            group.shed_timeout += 1
+            return None
+        group.admitted += 1
+        return waiter.result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "max_concurrency": self.shared + sum(g.reserved for g in self.groups.values() if g.name != PUBLIC),
+            "public_slots": self.groups[PUBLIC].reserved,
+            "shared_slots": self.shared,
+            "shared_in_use": self.shared_active,
+            "public_clients_tracked": len(self.public_buckets),
+            "groups": {name: group.stats() for name, group in self.groups.items()},
+        }
+
+
+_controller = Controller()
+
+
+def admission_stats() -> Dict[str, Any]:
+    return _controller.stats()
+
+
+def _client_ip(scope) -> str:
+    if ADMISSION_TRUST_FORWARDED_FOR:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send, status: int, retry_after: float, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; add it inside CORS so rejections carry CORS headers."""
+
+    def __init__(self, app, controller: Controller = _controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            return await self.app(scope, receive, send)
+        name = route_group(scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+        group = self.controller.groups[name]
+
+        if name == PUBLIC:
+            wait = self.controller.public_buckets.take(_client_ip(scope), time.monotonic())
+            if wait:
+                group.rate_limited += 1
+                return await _reject(send, 429, wait, "Too many requests")
+
+        slot = await self.controller.acquire(group)
+        if slot is None:
+            return await _reject(send, 503, ADMISSION_RETRY_AFTER_SECONDS, "Server busy, retry shortly")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(group, slot)
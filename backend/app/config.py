@@ -13,11 +13,24 @@ load_dotenv(dotenv_path=ENV_PATH, override=True)
 SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_change_me")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "480"))
+# Verified token → principal cache (saves the users lookup on every request)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# bcrypt cost; existing hashes are upgraded on the next successful login when this changes
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Dedicated hashing processes (0 = hash on the default threadpool) and how many
+# hash/verify calls may wait for them before login/register return 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "2"))
 
 # --------------------
 # OpenAI
 # --------------------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# Any OpenAI-compatible server (a proxy, or the benchmark stub); empty = api.openai.com
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
 # --------------------
 # ElevenLabs (canonical) — accept either ELEVENLABS_* or ELEVEN_LABS_* env names
@@ -25,9 +38,163 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 # Prefer the canonical name but fall back to the older underscore style if present.
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "") or os.getenv("ELEVEN_LABS_API_KEY", "")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "") or os.getenv("ELEVEN_LABS_VOICE_ID", "")
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io/v1").rstrip("/")
 
 # --------------------
 # ElevenLabs (backward-compatible aliases)
 # --------------------
 ELEVEN_LABS_API_KEY = os.getenv("ELEVEN_LABS_API_KEY", "") or ELEVENLABS_API_KEY
-ELEVEN_LABS_VOICE_ID = os.getenv("ELEVEN_LABS_VOICE_ID", "") or ELEVENLABS_VOICE_ID
\ No newline at end of file
+ELEVEN_LABS_VOICE_ID = os.getenv("ELEVEN_LABS_VOICE_ID", "") or ELEVENLABS_VOICE_ID
+
+# --------------------
+# AI / voice providers
+# --------------------
+# openai | local and elevenlabs | local; "local" is offline and deterministic (benchmarks, CI)
+AI_PROVIDER = os.getenv("AI_PROVIDER", "openai").lower()
+TTS_PROVIDER = os.getenv("TTS_PROVIDER", "elevenlabs").lower()
+# Local provider latency: base + per output token (chat) or character (TTS), ± jitter.
+# LOCAL_LATENCY_SCALE multiplies all of it (0 = answer immediately)
+LOCAL_AI_LATENCY_MS = float(os.getenv("LOCAL_AI_LATENCY_MS", "800"))
+LOCAL_AI_MS_PER_TOKEN = float(os.getenv("LOCAL_AI_MS_PER_TOKEN", "10"))
+LOCAL_TTS_LATENCY_MS = float(os.getenv("LOCAL_TTS_LATENCY_MS", "300"))
+LOCAL_TTS_MS_PER_CHAR = float(os.getenv("LOCAL_TTS_MS_PER_CHAR", "1.5"))
+LOCAL_LATENCY_JITTER = float(os.getenv("LOCAL_LATENCY_JITTER", "0.2"))
+LOCAL_LATENCY_SCALE = float(os.getenv("LOCAL_LATENCY_SCALE", "1"))
+# silence | tone (a steady beep); MP3 either way, as long as the text takes to say
+LOCAL_TTS_AUDIO = os.getenv("LOCAL_TTS_AUDIO", "silence").lower()
+
+# --------------------
+# Emergency readiness
+# --------------------
+# Warm-standby Red Alert plans are rebuilt after roster changes and at least this often
+STANDBY_REFRESH_SECONDS = float(os.getenv("STANDBY_REFRESH_SECONDS", "120"))
+
+# --------------------
+# Audit log writer
+# --------------------
+# Non-critical audit rows are queued and inserted in batches every
+# AUDIT_FLUSH_INTERVAL_MS or AUDIT_BATCH_SIZE rows, whichever comes first
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+# Beyond this many queued rows, callers write inline instead of queueing
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+
+# --------------------
+# Archival
+# --------------------
+# Shifts (with their assignments) that ended, and audit rows written, more than
+# ARCHIVE_HORIZON_DAYS ago move to gzip JSONL files under ARCHIVE_DIR
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "180"))
+
+# --------------------
+# Notifications
+# --------------------
+# Comma-separated delivery channels: log, file, webhook
+NOTIFY_CHANNELS = [c.strip() for c in os.getenv("NOTIFY_CHANNELS", "log").split(",") if c.strip()]
+NOTIFY_FILE_PATH = os.getenv("NOTIFY_FILE_PATH", "./notifications.jsonl")
+NOTIFY_WEBHOOK_URL = os.getenv("NOTIFY_WEBHOOK_URL", "")
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "2"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "0.5"))
+# Identical notices to the same recipient within this window are sent once
+NOTIFY_DEDUP_SECONDS = float(os.getenv("NOTIFY_DEDUP_SECONDS", "300"))
+
+# --------------------
+# Live updates (WebSocket)
+# --------------------
+# Events buffered per connection; when full the oldest is dropped and the
+# client gets a `lagged` notice. After this many drops in a row it is disconnected.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_DROPS = int(os.getenv("WS_SLOW_CONSUMER_DROPS", "1024"))
+
+# --------------------
+# Public kiosk read path
+# --------------------
+# The public snapshot (departments, coverage, wait-time transcripts) is rebuilt
+# after roster writes and at least this often, since its 24h window slides
+PUBLIC_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("PUBLIC_SNAPSHOT_MAX_AGE_SECONDS", "60"))
+# Cache-Control for public responses: a caching proxy in front of the kiosks
+# may serve a copy this fresh, and a stale one while it revalidates
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "5"))
+PUBLIC_CACHE_STALE_SECONDS = int(os.getenv("PUBLIC_CACHE_STALE_SECONDS", "30"))
+
+# --------------------
+# Admission control
+# --------------------
+# Requests admitted at once. Keep it at or below the DB connection pool (5 + 10
+# overflow) so admitted requests never queue for a connection; beyond that,
+# extra concurrency only splits the CPU further (on a single core, 8 keeps Red
+# Alert latency under a dashboard flood far lower). Emergency and auth routes have
+# reserved slots the others cannot take. /public/* (served from memory) has its
+# own slots on top, and is rate-limited per client IP.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "15"))
+ADMISSION_RESERVED_EMERGENCY = int(os.getenv("ADMISSION_RESERVED_EMERGENCY", "4"))
+ADMISSION_RESERVED_AUTH = int(os.getenv("ADMISSION_RESERVED_AUTH", "2"))
+ADMISSION_PUBLIC_MAX_CONCURRENCY = int(os.getenv("ADMISSION_PUBLIC_MAX_CONCURRENCY", "4"))
+# Requests wait this long for a slot (at most ADMISSION_MAX_QUEUE per group) before a 503
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_EMERGENCY_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_EMERGENCY_QUEUE_TIMEOUT_SECONDS", "15"))
+ADMISSION_PUBLIC_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_PUBLIC_QUEUE_TIMEOUT_SECONDS", "0.5"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+# Token bucket per client IP on /public/*
+PUBLIC_RATE_PER_SECOND = float(os.getenv("PUBLIC_RATE_PER_SECOND", "5"))
+PUBLIC_RATE_BURST = int(os.getenv("PUBLIC_RATE_BURST", "20"))
+# Behind a proxy, take the client IP from the last X-Forwarded-For hop
+ADMISSION_TRUST_FORWARDED_FOR = os.getenv("ADMISSION_TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+# --------------------
+# Idempotency keys
+# --------------------
+# POSTs to the routes in app.idempotency carrying an Idempotency-Key header
+# run once per key and caller; retries get the stored response. Keys are kept
+# IDEMPOTENCY_TTL_HOURS, and at most IDEMPOTENCY_MAX_KEYS of them.
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# A duplicate arriving while the first request runs waits this long for its response (then 409)
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# A key claimed longer ago than this with no response (worker died) may be claimed again
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+
+# --------------------
+# Metrics
+# --------------------
+# Prometheus text format at GET /metrics. With METRICS_TOKEN set, scrapers
+# must send it as a bearer token.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# --------------------
+# Tracing
+# --------------------
+# Red Alert stages are recorded as spans (stored with the audit record and
+# returned in the response). With TRACE_EXPORT_PATH set, traces are also
+# appended there as OTLP/JSON lines, for an OpenTelemetry Collector
+# otlpjsonfile receiver or any OTLP/JSON consumer.
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "medroster-api")
+
+# --------------------
+# SQL trace (development)
+# --------------------
+# Records every statement per request with the app line that ran it; a
+# statement shape repeated SQL_TRACE_N_PLUS_ONE_THRESHOLD times in one request
+# is logged as an N+1 suspect (with SQL_TRACE_STRICT, it fails the request).
+# Walks the stack per statement: keep it off in production.
+SQL_TRACE_ENABLED = os.getenv("SQL_TRACE_ENABLED", "false").lower() == "true"
+SQL_TRACE_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_TRACE_N_PLUS_ONE_THRESHOLD", "10"))
+SQL_TRACE_STRICT = os.getenv("SQL_TRACE_STRICT", "false").lower() == "true"
+SQL_TRACE_KEEP = int(os.getenv("SQL_TRACE_KEEP", "50"))
+
+# --------------------
+# Request profiler
+# --------------------
+# Admins arm sessions at /admin/profiles/ to sample the next N matching
+# requests. Stacks are read every PROFILER_INTERVAL_MS while one runs;
+# sessions not filled within PROFILER_SESSION_TTL_MINUTES expire.
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_REQUESTS = int(os.getenv("PROFILER_MAX_REQUESTS", "100"))
+PROFILER_SESSION_TTL_MINUTES = float(os.getenv("PROFILER_SESSION_TTL_MINUTES", "60"))
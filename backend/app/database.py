@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///./medroster.db"
@@ -19,3 +19,33 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def upsert_insert(db):
+    """The dialect's insert() construct, which has on_conflict_do_update (PostgreSQL or SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+# ── Post-commit callbacks ─────────────────────────────────────────────────────
+def on_commit(db, fn) -> None:
+    """Run fn() once the session's current transaction commits (dropped on rollback)."""
+    db.info.setdefault("after_commit", []).append(fn)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_after_commit(session):
+    callbacks = session.info.pop("after_commit", [])
+    for fn in callbacks:
+        try:
+            fn()
+        except Exception as e:
+            print(f"[DB] after-commit callback failed: {e}")
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_after_commit(session):
+    session.info.pop("after_commit", None)
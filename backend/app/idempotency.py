@@ -0,0 +1,174 @@
+"""
+Idempotency-Key support for retry-prone POSTs.
+
+A POST to one of IDEMPOTENT_ROUTES carrying an `Idempotency-Key` header
+(and a valid bearer token; keys are per caller) runs at most once: a retry
+with the same key gets the stored response back, marked
+`Idempotent-Replayed: true`, without re-running the handler. A duplicate
+arriving while the first is still running waits for it (up to
+IDEMPOTENCY_WAIT_SECONDS, then 409). Reusing a key with a different body
+is a 422. Responses of 5xx are not stored: the key is released and a retry
+runs again. Storage lives in services/idempotency_service.
+
+Requests without the header are untouched.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import IDEMPOTENCY_WAIT_SECONDS
+from app.security import token_subject
+from app.services import idempotency_service
+
+IDEMPOTENT_ROUTES = {
+    ("POST", "/assignments/"),
+    ("POST", "/shifts/"),
+    ("POST", "/emergency/red-alert"),
+    ("POST", "/emergency/broadcast"),
+}
+MAX_KEY_LENGTH = 255
+
+# Requests running under a claimed key in this process: duplicates wait on these
+_running: Dict[Tuple[str, str], asyncio.Event] = {}
+_stats = {"executed_total": 0, "replayed_total": 0, "waited_total": 0, "conflicts_total": 0, "mismatches_total": 0,
+          "released_total": 0}
+
+
+def idempotency_stats() -> Dict[str, int]:
+    return {**_stats, "running": len(_running)}
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _respond(send, status: int, headers: List[List[str]], body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _error(send, status: int, detail: str, retry_after: Optional[int] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    headers = [["content-type", "application/json"], ["content-length", str(len(body))]]
+    if retry_after is not None:
+        headers.append(["retry-after", str(retry_after)])
+    await _respond(send, status, headers, body)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; add it outside admission control so waiting duplicates hold no slot."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in IDEMPOTENT_ROUTES:
+            return await self.app(scope, receive, send)
+        key = _header(scope, b"idempotency-key")
+        authorization = _header(scope, b"authorization") or ""
+        principal = token_subject(authorization[7:]) if authorization.lower().startswith("bearer ") else None
+        if key is None or principal is None:
+            # No key, or the app will answer 401 anyway
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _error(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        body = await _read_body(receive)
+        request_hash = hashlib.sha256(body).hexdigest()
+        claim = (key, principal, scope["method"], scope["path"], request_hash)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        poll = 0.05
+        waited = False
+
+        while True:
+            outcome, stored = await run_in_threadpool(idempotency_service.claim, *claim)
+            if outcome == idempotency_service.CLAIMED:
+                break
+            if outcome == idempotency_service.REPLAY:
+                _stats["replayed_total"] += 1
+                return await _respond(send, stored["status"], stored["headers"] + [["idempotent-replayed", "true"]],
+                                      stored["body"])
+            if outcome == idempotency_service.MISMATCH:
+                _stats["mismatches_total"] += 1
+                return await _error(send, 422, "Idempotency-Key was already used for a different request")
+            # Busy: wait for the request holding the key, then look again
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _stats["conflicts_total"] += 1
+                return await _error(send, 409, "A request with this Idempotency-Key is still in progress",
+                                    retry_after=1)
+            if not waited:
+                _stats["waited_total"] += 1
+                waited = True
+            running = _running.get((key, principal))
+            if running is not None:
+                try:
+                    await asyncio.wait_for(running.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # Held by another worker: poll the store
+                await asyncio.sleep(min(poll, remaining))
+                poll = min(poll * 2, 1.0)
+
+        done = _running[(key, principal)] = asyncio.Event()
+        replayed_body = False
+
+        async def replay_receive():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start: Optional[dict] = None
+        chunks: List[bytes] = []
+
+        async def capture_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored_ok = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if start is not None and start["status"] < 500:
+                headers = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in start.get("headers", [])]
+                await run_in_threadpool(
+                    idempotency_service.complete, key, principal, start["status"], headers, b"".join(chunks),
+                )
+                stored_ok = True
+                _stats["executed_total"] += 1
+        finally:
+            if not stored_ok:
+                _stats["released_total"] += 1
+                await run_in_threadpool(idempotency_service.release, key, principal)
+            _running.pop((key, principal), None)
+            done.set()
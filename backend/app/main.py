@@ -1,8 +1,18 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import Base, engine
-from app.models import User, Department, Shift, Assignment, AuditLog
+from app.admission import AdmissionMiddleware
+from app.database import Base, engine, SessionLocal
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import MetricsMiddleware
+from app.profiler import ProfilerMiddleware
+from app.sqltrace import SQLTraceMiddleware
+from app.models import (
+    User, Department, Shift, Assignment, AuditLog, UserWeeklyLoad, SafetyPolicy, ShiftCoverage,
+    Broadcast, BroadcastReceipt, ChangeLog, IdempotencyKey, ProfileSession,
+)
 
 from app.routers import (
     auth_router,
@@ -14,15 +24,44 @@ from app.routers import (
     ai_router,
     broadcast_router,
     safety_mode_router,
+    history_router,
+    events_router,
+    sync_router,
+    metrics_router,
+    profiler_router,
 )
 
 from app.routers.public_router import router as public_router
 
+from app.services.roster_hooks import backfill_if_missing
+from app.services import audit_service, notification_dispatcher, standby_service
+from app.security import start_hashing_pool, shutdown_hashing_pool
+
 # ── Create all DB tables ──────────────────────────────────────────────────────
 Base.metadata.create_all(bind=engine)
+audit_service.migrate_structured_columns(engine)
+
+with SessionLocal() as _db:
+    backfill_if_missing(_db)
+    audit_service.backfill_structured(_db)
+
+# ── Background workers ────────────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_hashing_pool()
+    standby_service.start()
+    audit_service.start()
+    notification_dispatcher.start()
+    yield
+    standby_service.stop()
+    notification_dispatcher.stop()
+    audit_service.stop()
+    shutdown_hashing_pool()
+
 
 # ── App instance ──────────────────────────────────────────────────────────────
 app = FastAPI(
+    lifespan=lifespan,
     title="MedRoster API",
     description="""
 ## MedRoster — AI-Powered Hospital Staff Coordination
@@ -42,6 +81,15 @@ Built for the **Columbia AI for Good Hackathon** 🏥
     version="1.0.0",
 )
 
+# ── Admission control, idempotency keys, metrics (CORS wraps all three) ───────
+# Added innermost first: a duplicate waiting on its Idempotency-Key, or
+# replayed, never holds an admission slot; metrics see every response.
+app.add_middleware(ProfilerMiddleware)  # no-op unless an admin armed a profiling session
+app.add_middleware(SQLTraceMiddleware)  # no-op unless SQL_TRACE_ENABLED; traces the handler only
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # ── CORS (allow all for development) ─────────────────────────────────────────
 app.add_middleware(
     CORSMiddleware,
@@ -62,6 +110,11 @@ app.include_router(ai_router.router)
 app.include_router(emergency_router.router)
 app.include_router(broadcast_router.router)
 app.include_router(safety_mode_router.router)
+app.include_router(history_router.router)
+app.include_router(events_router.router)
+app.include_router(sync_router.router)
+app.include_router(metrics_router.router)
+app.include_router(profiler_router.router)
 
 # Public patient/family updates (no auth)
 app.include_router(public_router)
@@ -0,0 +1,295 @@
+"""
+Prometheus metrics, rendered in the text exposition format at GET /metrics.
+
+- HTTP: request count and latency histogram per route template
+  (MetricsMiddleware), plus DB statements and rows per request.
+- DB: SQLAlchemy cursor events count and time every statement, attributed
+  to the request that ran it (a contextvar; background workers count as
+  "background"). Rows are counted as SQLite hands them over
+  (connection row_factory); other databases report statements only.
+- Providers: provider_call() times AI/voice provider calls (app.services.providers) and counts
+  outcomes and tokens (characters for TTS).
+- The *_stats() of the background workers are exported as gauges and
+  counters when scraped (registered by the metrics router).
+
+Recording is a lock and a few integer bumps; nothing is formatted until
+someone scrapes.
+"""
+
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app import tracing
+from app.config import METRICS_ENABLED
+from app.database import engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+PROVIDER_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+# Span attribute names for provider token counts (OpenTelemetry GenAI conventions)
+TOKEN_ATTRIBUTES = {"prompt": "gen_ai.usage.input_tokens", "completion": "gen_ai.usage.output_tokens"}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple, List] = {}  # labels → [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+_REGISTRY: List[Any] = []
+_collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+HTTP_REQUESTS = Counter("medroster_http_requests_total", "HTTP requests by route and status.",
+                        ("method", "route", "status"))
+HTTP_LATENCY = Histogram("medroster_http_request_duration_seconds", "HTTP request latency by route.",
+                         ("method", "route"))
+DB_QUERIES_PER_REQUEST = Histogram("medroster_db_queries_per_request", "SQL statements run per request.",
+                                   ("method", "route"), COUNT_BUCKETS)
+DB_ROWS_PER_REQUEST = Histogram("medroster_db_rows_per_request", "Rows fetched from the database per request.",
+                                ("method", "route"), ROW_BUCKETS)
+DB_QUERIES = Counter("medroster_db_queries_total", "SQL statements by origin (request or background).", ("origin",))
+DB_QUERY_LATENCY = Histogram("medroster_db_query_duration_seconds", "SQL statement execution time.",
+                             (), QUERY_BUCKETS)
+PROVIDER_CALLS = Counter("medroster_provider_calls_total", "Upstream AI/voice provider calls by outcome.",
+                         ("provider", "operation", "outcome"))
+PROVIDER_LATENCY = Histogram("medroster_provider_call_duration_seconds", "Upstream AI/voice provider call latency.",
+                             ("provider", "operation"), PROVIDER_BUCKETS)
+PROVIDER_TOKENS = Counter("medroster_provider_tokens_total",
+                          "Tokens (prompt/completion) or characters (tts) sent to providers.",
+                          ("provider", "kind"))
+
+
+# ── Per-request DB accounting ─────────────────────────────────────────────
+
+class RequestStats:
+    __slots__ = ("queries", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+
+# Sync handlers run in the threadpool with a copy of the context: they share this object
+_current: ContextVar[Optional[RequestStats]] = ContextVar("medroster_request_stats", default=None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if METRICS_ENABLED and context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    DB_QUERY_LATENCY.observe(time.perf_counter() - started)
+    stats = _current.get()
+    if stats is None:
+        DB_QUERIES.inc("background")
+    else:
+        stats.queries += 1
+        DB_QUERIES.inc("request")
+
+
+def _count_row(cursor, row):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+    return row
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    # On checkout rather than connect: pooled connections may predate this module
+    if METRICS_ENABLED and isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.row_factory = _count_row
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Pure ASGI middleware; outermost after CORS so shed and replayed requests are counted too."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unrouted requests (404s, shed) share one
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, path)
+            HTTP_REQUESTS.inc(method, path, status)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, method, path)
+            DB_ROWS_PER_REQUEST.observe(stats.rows, method, path)
+
+
+# ── Providers ─────────────────────────────────────────────────────────────
+
+class ProviderCall:
+    __slots__ = ("tokens",)
+
+    def __init__(self):
+        self.tokens: Dict[str, int] = {}
+
+    def add_tokens(self, kind: str, count: Optional[int]) -> None:
+        if count:
+            self.tokens[kind] = self.tokens.get(kind, 0) + int(count)
+
+
+@contextmanager
+def provider_call(provider: str, operation: str) -> Iterator[ProviderCall]:
+    """
+    Time one upstream call; an exception counts it as an error (and
+    propagates). Inside a trace (app.tracing) the call is also a span
+    carrying its token counts.
+    """
+    call = ProviderCall()
+    started = time.perf_counter()
+    outcome = "error"
+    with tracing.span(f"{provider}.{operation}", provider=provider) as span:
+        try:
+            yield call
+            outcome = "ok"
+        finally:
+            PROVIDER_LATENCY.observe(time.perf_counter() - started, provider, operation)
+            PROVIDER_CALLS.inc(provider, operation, outcome)
+            for kind, count in call.tokens.items():
+                PROVIDER_TOKENS.inc(provider, kind, amount=count)
+                span.set(**{TOKEN_ATTRIBUTES.get(kind, f"{provider}.{kind}"): count})
+
+
+# ── Worker stats ──────────────────────────────────────────────────────────
+
+def register_stats(prefix: str, fn: Callable[[], Dict[str, Any]]) -> None:
+    """Export a *_stats() dict at scrape time: numbers become samples (`*_total` keys as counters)."""
+    _collectors.append((prefix, fn))
+
+
+def _flatten(prefix: str, stats: Dict[str, Any], labels: str = "") -> Iterator[Tuple[str, str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, bool) or isinstance(value, (int, float)):
+            yield name, labels, float(value)
+        elif isinstance(value, dict) and value and all(isinstance(v, dict) for v in value.values()):
+            # e.g. admission groups: {"emergency": {...}, ...} → {group="emergency"}
+            label = key[:-1] if key.endswith("s") else key
+            for child, child_stats in value.items():
+                yield from _flatten(prefix, child_stats, f'{label}="{_escape(child)}"')
+        elif isinstance(value, dict):
+            yield from _flatten(name, value, labels)
+
+
+def _render_collectors() -> List[str]:
+    series: Dict[str, List[Tuple[str, float]]] = {}
+    for prefix, fn in _collectors:
+        try:
+            for name, labels, value in _flatten(f"medroster_{prefix}", fn()):
+                series.setdefault(name, []).append((labels, value))
+        except Exception as e:
+            print(f"[Metrics] {prefix} stats failed: {e}")
+    lines = []
+    for name, samples in series.items():
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        lines += [f"{name}{{{labels}}} {_number(value)}" if labels else f"{name} {_number(value)}"
+                  for labels, value in samples]
+    return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines += metric.render()
+    lines += _render_collectors()
+    return "\n".join(lines) + "\n"
@@ -4,3 +4,11 @@ from app.models.department import Department
 from app.models.shift import Shift
 from app.models.assignment import Assignment
 from app.models.audit_log import AuditLog
+from app.models.user_weekly_load import UserWeeklyLoad
+from app.models.safety_policy import SafetyPolicy
+from app.models.shift_coverage import ShiftCoverage
+from app.models.broadcast import Broadcast
+from app.models.broadcast_receipt import BroadcastReceipt
+from app.models.change_log import ChangeLog
+from app.models.idempotency_key import IdempotencyKey
+from app.models.profile_session import ProfileSession
@@ -1,12 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
 from datetime import datetime
 from app.database import Base
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # Keyset pagination runs newest-first on (timestamp, id) within each filter
+    __table_args__ = (
+        Index("ix_audit_logs_ts_id", "timestamp", "id"),
+        Index("ix_audit_logs_event_ts_id", "event_type", "timestamp", "id"),
+        Index("ix_audit_logs_dept_ts_id", "department_id", "timestamp", "id"),
+        Index("ix_audit_logs_target_ts_id", "target_user_id", "timestamp", "id"),
+        Index("ix_audit_logs_actor_ts_id", "performed_by", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     action = Column(String, nullable=False)
     performed_by = Column(String, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+    # Structured form of `action`; no foreign keys so history outlives deletions
+    event_type = Column(String, nullable=True)
+    department_id = Column(Integer, nullable=True)
+    target_user_id = Column(Integer, nullable=True)
+    details = Column(JSON, nullable=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from datetime import datetime
+from app.database import Base
+
+
+class Broadcast(Base):
+    """An emergency voice/text broadcast; one BroadcastReceipt per targeted staff member."""
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    target_roles = Column(JSON, nullable=False)
+    auto_repeat = Column(Boolean, default=False)
+    created_by = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    recipient_count = Column(Integer, nullable=False, default=0)
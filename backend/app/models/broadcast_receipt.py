@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class BroadcastReceipt(Base):
+    """Per-recipient delivery/acknowledgement of a broadcast (NULL until it happens)."""
+    __tablename__ = "broadcast_receipts"
+    __table_args__ = (
+        Index("ix_broadcast_receipts_user", "user_id", "broadcast_id"),
+    )
+
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    delivered_at = Column(DateTime, nullable=True)
+    acknowledged_at = Column(DateTime, nullable=True)
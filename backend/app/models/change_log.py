@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class ChangeLog(Base):
+    """One row per shift/assignment write, in commit order; `seq` is the delta-sync cursor."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_dept_seq", "department_id", "seq"),
+        Index("ix_change_log_changed_at", "changed_at"),
+        # Never reuse a seq, even after the newest rows are pruned
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)      # "shift" | "assignment"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)          # "upsert" | "delete"
+    department_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
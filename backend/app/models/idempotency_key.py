@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary, Index
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """A client's Idempotency-Key for a POST and the response first returned for it."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    key = Column(String, primary_key=True)
+    principal = Column(String, primary_key=True)     # token subject: keys are per caller
+    method = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)    # sha256 of the request body
+    status = Column(String, nullable=False, default="in_progress")  # in_progress | completed
+    response_status = Column(Integer, nullable=True)
+    response_headers = Column(JSON, nullable=True)   # [[name, value], ...]
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
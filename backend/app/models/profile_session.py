@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON, Text
+from datetime import datetime
+from app.database import Base
+
+
+class ProfileSession(Base):
+    """An admin-armed profiling session: which requests to sample, and the collapsed stacks collected."""
+    __tablename__ = "profile_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    route_pattern = Column(String, nullable=False)   # fnmatch on route template or path
+    method = Column(String, nullable=True)           # None = any method
+    requested_by = Column(String, nullable=False)
+    target_requests = Column(Integer, nullable=False)
+    interval_ms = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default="armed")  # armed | completed | cancelled | expired
+    profiled_requests = Column(Integer, nullable=False, default=0)
+    samples = Column(Integer, nullable=False, default=0)
+    requests = Column(JSON, nullable=True)           # [{method, path, route, status, duration_ms, samples}, ...]
+    collapsed = Column(Text, nullable=True)          # "frame;frame;frame count" per line
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Boolean, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class SafetyPolicy(Base):
+    """Hospital-wide Safety Mode policy (single row, id=1)."""
+    __tablename__ = "safety_policy"
+
+    id = Column(Integer, primary_key=True, index=True)
+    enabled = Column(Boolean, default=False)
+    # 0-100 burnout score above which an assignment is critical
+    burnout_threshold = Column(Integer, nullable=False, default=70)
+    block_critical = Column(Boolean, default=False)
+    updated_by = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class ShiftCoverage(Base):
+    """Required vs. assigned staff per shift, kept in step with assignment writes."""
+    __tablename__ = "shift_coverage"
+    __table_args__ = (
+        Index("ix_shift_coverage_dept_start", "department_id", "start_time"),
+    )
+
+    shift_id = Column(Integer, ForeignKey("shifts.id"), primary_key=True)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    required_role = Column(String, nullable=False)
+    required_count = Column(Integer, nullable=False, default=1)
+    assigned_count = Column(Integer, nullable=False, default=0)
+    # required_count - assigned_count (negative when over-staffed)
+    open_slots = Column(Integer, nullable=False, default=1)
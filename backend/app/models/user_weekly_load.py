@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, UniqueConstraint
+from app.database import Base
+
+
+class UserWeeklyLoad(Base):
+    """Per-user, per-ISO-week rollup of assigned shifts (keyed on shift start)."""
+    __tablename__ = "user_weekly_load"
+    __table_args__ = (
+        UniqueConstraint("user_id", "iso_year", "iso_week", name="uq_user_weekly_load"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    iso_year = Column(Integer, nullable=False)
+    iso_week = Column(Integer, nullable=False)
+    hours = Column(Float, nullable=False, default=0.0)
+    shift_count = Column(Integer, nullable=False, default=0)
+    night_count = Column(Integer, nullable=False, default=0)
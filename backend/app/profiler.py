@@ -0,0 +1,309 @@
+"""
+On-demand request profiler.
+
+An admin arms a session (POST /admin/profiles/): the next N requests whose
+route template or path matches a pattern (fnmatch: "/users/*",
+"/shifts/{shift_id}") are profiled by sampling. While one is in flight a
+background thread reads every thread's stack each interval and keeps the
+stacks that belong to it: on the event loop, those running under this
+middleware's frame for that request (dependencies, serialization, async
+handlers); on worker threads, those inside the route's endpoint (sync
+handler bodies) when the call came from that request: the threadpool runs
+it in a copy of the request's context, which carries the run, and the
+worker's ident is recorded the first time it is seen. Each stack counts
+for at most one request. Samples are wall-clock, so time blocked in
+SQLite or an upstream call shows up too.
+
+Each session aggregates its samples as collapsed stacks (`a;b;c 42` per
+line, the input of flamegraph.pl, speedscope and inferno); results are
+saved through profile_service after every profiled request.
+
+Sessions are armed in this process. With none armed the middleware costs
+one check per request and no sampler thread runs.
+"""
+
+import contextvars
+import inspect
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+
+from app.config import PROFILER_SESSION_TTL_MINUTES
+from app.services import profile_service
+
+ARMED = "armed"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+# Profiling the profiler's own endpoints would only record downloads
+_OWN_PREFIX = "/admin/profiles"
+_BACKEND_DIR = __file__.rsplit("/app/", 1)[0] + "/"
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("/site-packages/", "/lib/python"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename[len(_BACKEND_DIR):] if filename.startswith(_BACKEND_DIR) else filename
+
+
+_labels: Dict[Tuple[Any, int], str] = {}
+
+
+def _label(frame) -> str:
+    key = (frame.f_code, frame.f_lineno)
+    label = _labels.get(key)
+    if label is None:
+        code = frame.f_code
+        label = _labels[key] = f"{code.co_qualname} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+    return label
+
+
+class _Run:
+    """One profiled request."""
+
+    def __init__(self, session: "_Session", anchor, endpoint_code, scope, route_path: Optional[str]):
+        self.session = session
+        self.anchor = anchor
+        self.endpoint_code = endpoint_code
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route = route_path or scope["path"]
+        self.started = time.perf_counter()
+        self.samples = 0
+        # The worker thread and frame running this request's sync endpoint, once seen
+        self.thread: Optional[int] = None
+        self.endpoint_frame = None
+
+    def record(self, stack: List[Any], where: str) -> None:
+        """`stack` is innermost-first and ends at this request's outermost frame."""
+        key = (f"{self.method} {self.route}", where) + tuple(_label(f) for f in reversed(stack))
+        self.samples += 1
+        with self.session.lock:
+            self.session.stacks[key] += 1
+
+
+# The run of the request being served; copied into threadpool calls with the rest of the context
+_current_run: contextvars.ContextVar[Optional[_Run]] = contextvars.ContextVar("profiled_run", default=None)
+
+
+def _caller_run(frame) -> Optional[_Run]:
+    """The run whose context a worker thread entered to call `frame` (the executor keeps it in a local)."""
+    frame = frame.f_back
+    while frame is not None:
+        for value in frame.f_locals.values():
+            if isinstance(value, contextvars.Context):
+                return value.get(_current_run)
+        frame = frame.f_back
+    return None
+
+
+def _attribute(ident: int, stack: List[Any], runs: List[_Run]) -> Tuple[Optional[_Run], int, str]:
+    """The one run a thread's stack belongs to, the index of its outermost frame there, and where it ran."""
+    for run in runs:
+        cut = next((i for i, f in enumerate(stack) if f is run.anchor), None)
+        if cut is not None:
+            return run, cut, "event loop"
+    codes = {run.endpoint_code for run in runs if run.endpoint_code is not None}
+    cut = next((i for i, f in enumerate(stack) if f.f_code in codes), None)
+    if cut is None:
+        return None, 0, ""
+    endpoint = stack[cut]
+    for run in runs:
+        if run.thread == ident and run.endpoint_frame is endpoint:
+            return run, cut, "threadpool"
+    # First sight of this call: claim the thread for the request that made it, if profiled
+    owner = _caller_run(endpoint)
+    if owner is not None and owner.thread is None and any(run is owner for run in runs):
+        owner.thread, owner.endpoint_frame = ident, endpoint
+        return owner, cut, "threadpool"
+    return None, 0, ""
+
+
+class _Session:
+    def __init__(self, session_id: int, pattern: str, method: Optional[str], requests: int, interval_ms: float):
+        self.id = session_id
+        self.pattern = pattern
+        self.method = method.upper() if method else None
+        self.target = requests
+        self.remaining = requests
+        self.interval = interval_ms / 1000
+        self.expires_at = datetime.utcnow() + timedelta(minutes=PROFILER_SESSION_TTL_MINUTES)
+        self.status = ARMED
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.stacks: Counter = Counter()
+        self.requests: List[Dict[str, Any]] = []
+
+    def matches(self, scope, route_path: Optional[str]) -> bool:
+        if self.method and scope["method"] != self.method:
+            return False
+        return fnmatchcase(scope["path"], self.pattern) or (
+            route_path is not None and fnmatchcase(route_path, self.pattern)
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The session's results so far, in the shape profile_service.save() stores."""
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+            requests = list(self.requests)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "profiled_requests": len(requests),
+            "samples": sum(count for _, count in stacks),
+            "requests": requests,
+            "collapsed": "".join(f"{';'.join(key)} {count}\n" for key, count in stacks),
+        }
+
+
+_lock = threading.Lock()
+_sessions: Dict[int, _Session] = {}
+_running: List[_Run] = []
+_sampler: Optional[threading.Thread] = None
+
+
+def arm(session_id: int, pattern: str, method: Optional[str], requests: int, interval_ms: float) -> None:
+    with _lock:
+        _sessions[session_id] = _Session(session_id, pattern, method, requests, interval_ms)
+
+
+def armed(session_id: int) -> Optional[_Session]:
+    return _sessions.get(session_id)
+
+
+def cancel(session_id: int) -> Optional[Dict[str, Any]]:
+    """Stop collecting for a session; returns its final snapshot (None if not armed here)."""
+    with _lock:
+        session = _sessions.pop(session_id, None)
+    if session is None:
+        return None
+    session.status = CANCELLED
+    return session.snapshot()
+
+
+def _route(scope) -> Tuple[Optional[str], Any]:
+    """Template and endpoint code of the route that will serve this request."""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint else None
+            return getattr(route, "path", None), code
+    return None, None
+
+
+def _claim(scope) -> Tuple[Optional[_Session], Optional[str], Any, List[_Session]]:
+    """The session that takes this request, if any, plus sessions that expired meanwhile."""
+    route_path, code = _route(scope)
+    now = datetime.utcnow()
+    expired = []
+    with _lock:
+        for session in list(_sessions.values()):
+            if now > session.expires_at:
+                del _sessions[session.id]
+                session.status = EXPIRED
+                expired.append(session)
+            elif session.remaining > 0 and session.matches(scope, route_path):
+                session.remaining -= 1
+                session.in_flight += 1
+                return session, route_path, code, expired
+    return None, None, None, expired
+
+
+def _sample_loop() -> None:
+    global _sampler
+    own = threading.get_ident()
+    while True:
+        with _lock:
+            runs = list(_running)
+            if not runs:
+                _sampler = None
+                return
+        interval = min(run.session.interval for run in runs)
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            run, cut, where = _attribute(ident, stack, runs)
+            if run is not None:
+                run.record(stack[:cut + 1], where)
+        stack = frame = None  # drop frame references while sleeping
+        time.sleep(interval)
+
+
+def _start(run: _Run) -> None:
+    global _sampler
+    with _lock:
+        _running.append(run)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profiler", daemon=True)
+            _sampler.start()
+
+
+def _finish(run: _Run, status: int) -> Optional[Dict[str, Any]]:
+    session = run.session
+    run.endpoint_frame = None
+    with _lock:
+        _running.remove(run)
+        session.in_flight -= 1
+        done = session.remaining == 0 and session.in_flight == 0 and _sessions.pop(session.id, None) is not None
+    with session.lock:
+        session.requests.append({
+            "method": run.method,
+            "path": run.path,
+            "route": run.route,
+            "status": status,
+            "duration_ms": round((time.perf_counter() - run.started) * 1000, 3),
+            "samples": run.samples,
+        })
+    if done:
+        session.status = COMPLETED
+    return session.snapshot()
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware; innermost, so queueing for admission is not profiled."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _sessions or scope["type"] != "http" or scope["path"].startswith(_OWN_PREFIX):
+            return await self.app(scope, receive, send)
+        session, route_path, code, expired = _claim(scope)
+        for gone in expired:
+            await run_in_threadpool(profile_service.save, gone.snapshot())
+        if session is None:
+            return await self.app(scope, receive, send)
+
+        # This coroutine's frame: event-loop stacks passing through it belong to this request
+        run = _Run(session, sys._getframe(), code, scope, route_path)
+        status = 500
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        _start(run)
+        token = _current_run.set(run)
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            _current_run.reset(token)
+            snapshot = _finish(run, status)
+            await run_in_threadpool(profile_service.save, snapshot)
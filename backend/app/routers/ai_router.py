@@ -1,17 +1,23 @@
 
 
+from datetime import datetime, timedelta, timezone
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 
-from app.security import get_current_user
+from app.database import get_db
+from app.security import get_current_user, get_token_principal
 from app.models.user import User
+from app.services.workload_service import compute_staff_workload, current_week_window
 from app.services.ai_service import (
     get_scheduling_suggestion,
     analyze_workload_fairness,
     get_scheduling_tip,
     text_to_speech_elevenlabs,   # base64 audio
 )
+from app.services.providers import chat_provider
 
 router = APIRouter(prefix="/ai", tags=["AI Scheduling"])
 
@@ -40,7 +46,11 @@ class ScheduleRequest(BaseModel):
 
 
 class WorkloadRequest(BaseModel):
-    staff_data: List[dict]
+    # Omit staff_data to have the server derive it from assignments
+    staff_data: Optional[List[dict]] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    department_id: Optional[int] = None
 
 
 class TextToSpeechRequest(BaseModel):
@@ -88,6 +98,25 @@ def _normalize_schedule_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     return {"staff": normalized_staff, "shifts": normalized_shifts, "context": context}
 
 
+def _workload_window(start: Optional[datetime], end: Optional[datetime]):
+    # Shift times are stored as naive UTC
+    if start and start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if start is None and end is None:
+        start, end = current_week_window()
+    elif end is None:
+        end = start + timedelta(days=7)
+    elif start is None:
+        start = end - timedelta(days=7)
+
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return start, end
+
+
 # ── Endpoints ───────────────────────────────────────────────────────────────
 
 @router.post("/suggest-schedule")
@@ -107,7 +136,7 @@ def suggest_schedule(
             shift_requirements=[s.model_dump() for s in request.shifts],
             context=request.context
         )
-        return {"ai_suggestion": result, "model": "gpt-4o"}
+        return {"ai_suggestion": result, "model": chat_provider().model}
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
@@ -117,22 +146,55 @@ def suggest_schedule(
 @router.post("/analyze-workload")
 def analyze_workload(
     request: WorkloadRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Burnout/fairness analysis. When staff_data is omitted, per-staff hours,
+    shifts, nights, consecutive days and rest gaps are computed from the DB
+    for the requested window (default: current week).
+    """
     try:
-        result = analyze_workload_fairness(request.staff_data)
-        return {"workload_analysis": result, "model": "gpt-4o"}
+        window = None
+        staff_data = request.staff_data
+        if not staff_data:
+            start, end = _workload_window(request.start, request.end)
+            staff_data = compute_staff_workload(
+                db, start=start, end=end, department_id=request.department_id
+            )
+            window = {"start": start.isoformat(), "end": end.isoformat()}
+
+        result = analyze_workload_fairness(staff_data)
+        return {"workload_analysis": result, "model": chat_provider().model, "window": window}
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
 
+@router.get("/workload")
+def workload_metrics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    department_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Raw per-staff workload metrics for a window (default: current week)."""
+    start, end = _workload_window(start, end)
+    return {
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "staff": compute_staff_workload(db, start=start, end=end, department_id=department_id),
+    }
+
+
 @router.get("/tip")
-def scheduling_tip(current_user: User = Depends(get_current_user)):
+def scheduling_tip(current_user: User = Depends(get_token_principal)):
     try:
         tip = get_scheduling_tip()
-        return {"tip": tip, "model": "gpt-4o"}
+        return {"tip": tip, "model": chat_provider().model}
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
@@ -156,7 +218,7 @@ def schedule_suggestions(
             shift_requirements=[s.model_dump() for s in request.shifts],
             context=request.context
         )
-        return {"ai_suggestion": result, "model": "gpt-4o"}
+        return {"ai_suggestion": result, "model": chat_provider().model}
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
@@ -6,9 +6,10 @@ from app.database import get_db
 from app.models.assignment import Assignment
 from app.models.shift import Shift
 from app.models.user import User
-from app.models.audit_log import AuditLog
 from app.schemas.assignment_schema import AssignmentCreate, AssignmentResponse
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal
+from app.services import audit_service, roster_hooks
+from app.services.safety_service import check_assignment
 
 router = APIRouter(prefix="/assignments", tags=["Assignments"])
 
@@ -50,6 +51,14 @@ def create_assignment(
     if existing:
         raise HTTPException(status_code=400, detail="User already assigned to this shift")
 
+    # Safety Mode (no-op unless enabled)
+    safety = check_assignment(db, assignment.user_id, shift)
+    if safety and safety["blocked"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Blocked by Safety Mode", "safety": safety}
+        )
+
     db_assignment = Assignment(
         user_id=assignment.user_id,
         shift_id=assignment.shift_id,
@@ -57,22 +66,26 @@ def create_assignment(
         notes=assignment.notes
     )
     db.add(db_assignment)
+    roster_hooks.assignment_added(db, db_assignment, shift)
 
-    # Audit log
-    audit = AuditLog(
-        action=f"ASSIGNMENT CREATED | user={user.name} | shift={shift.id} | emergency={assignment.is_emergency}",
-        performed_by=current_user.email
-    )
-    db.add(audit)
     db.commit()
     db.refresh(db_assignment)
+
+    audit_service.record(
+        f"ASSIGNMENT CREATED | user={user.name} | shift={shift.id} | emergency={assignment.is_emergency}",
+        performed_by=current_user.email,
+        event_type="assignment_created",
+        department_id=shift.department_id,
+        target_user_id=user.id,
+        details={"shift_id": shift.id, "assignment_id": db_assignment.id, "emergency": assignment.is_emergency},
+    )
     return db_assignment
 
 
 @router.get("/", response_model=List[AssignmentResponse])
 def get_assignments(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get all assignments."""
     return db.query(Assignment).all()
@@ -81,7 +94,7 @@ def get_assignments(
 @router.get("/my-shifts", response_model=List[AssignmentResponse])
 def get_my_shifts(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get the current user's own assignments."""
     return db.query(Assignment).filter(Assignment.user_id == current_user.id).all()
@@ -101,6 +114,8 @@ def delete_assignment(
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
+    if assignment.shift:
+        roster_hooks.assignment_removed(db, assignment, assignment.shift)
     db.delete(assignment)
     db.commit()
     return {"message": f"Assignment {assignment_id} removed"}
@@ -1,20 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
+from app import versions
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user_schema import UserCreate, UserResponse
 from app.schemas.auth_schema import LoginResponse
-from app.security import hash_password, verify_password, create_access_token
+from app.security import hash_password_async, verify_and_update_password_async, access_token_for
+from app.services.roster_hooks import roster_changed
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+# Each helper ends its transaction so the pooled connection is not held
+# while the request waits for bcrypt.
+
+def _email_taken(db: Session, email: str) -> bool:
+    taken = db.query(User.id).filter(User.email == email).first() is not None
+    db.rollback()
+    return taken
+
+
+def _login_row(db: Session, email: str):
+    row = (
+        db.query(User.id, User.name, User.email, User.role, User.department_id,
+                 User.password, User.is_active)
+        .filter(User.email == email)
+        .first()
+    )
+    db.rollback()
+    return row
+
+
+def _store_rehash(db: Session, user_id: int, new_hash: str) -> None:
+    db.query(User).filter(User.id == user_id).update({"password": new_hash})
+    db.commit()
+
+
 @router.post("/register", response_model=UserResponse, status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user. Roles: admin | manager | doctor | nurse | staff"""
-    existing = db.query(User).filter(User.email == user.email).first()
+    # DB work runs on the threadpool, bcrypt on the hashing pool — the event loop never blocks
+    existing = await run_in_threadpool(_email_taken, db, user.email)
     if existing:
         raise HTTPException(
             status_code=400,
@@ -25,17 +54,23 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         name=user.name,
         email=user.email,
         role=user.role,
-        password=hash_password(user.password),
+        password=await hash_password_async(user.password),
         department_id=user.department_id
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+
+    def save():
+        db.add(db_user)
+        roster_changed(db)
+        versions.bump_on_commit(db, versions.USERS)
+        db.commit()
+        db.refresh(db_user)
+
+    await run_in_threadpool(save)
     return db_user
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -43,9 +78,12 @@ def login(
     Login with email + password.
     Use the returned access_token in the Authorize button (top right in Swagger).
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await run_in_threadpool(_login_row, db, form_data.username)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password_async(form_data.password, user.password)
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -57,7 +95,11 @@ def login(
             detail="Account is inactive"
         )
 
-    token = create_access_token({"sub": str(user.id)})
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made — upgrade it transparently
+        await run_in_threadpool(_store_rehash, db, user.id, new_hash)
+
+    token = access_token_for(user)
 
     return {
         "access_token": token,
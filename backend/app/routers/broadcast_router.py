@@ -1,25 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal
+from app.models.broadcast import Broadcast
 from app.models.user import User
+from app.services import audit_service, broadcast_service
 from app.services.ai_service import text_to_speech_elevenlabs
 
 router = APIRouter(prefix="/emergency", tags=["🚨 Emergency"])
 
+ALLOWED_ROLES = ["admin", "manager"]
+MAX_ACKS_PER_REQUEST = 5000
+
 # --- Emergency Broadcast ---
 class EmergencyBroadcastRequest(BaseModel):
     severity: str
-    target_roles: List[str]
+    target_roles: List[str]  # "all" targets every active staff member
     auto_repeat: bool = False
     message: str
 
 class EmergencyBroadcastResponse(BaseModel):
-    audio_base64: str
-    content_type: str
-    ack_list: List[str] = []  # Placeholder for ACK tracking
+    broadcast_id: int
+    recipient_count: int
+    audio_base64: Optional[str] = None
+    content_type: Optional[str] = None
+    voice_error: Optional[str] = None
+    ack_list: List[str] = []  # names of staff who have acknowledged
+
+# --- Acknowledgements ---
+class AckItem(BaseModel):
+    broadcast_id: int
+    user_id: int
+    status: Literal["delivered", "acknowledged"] = "acknowledged"
+    at: Optional[datetime] = None
+
+class BulkAckRequest(BaseModel):
+    acks: List[AckItem] = Field(..., max_length=MAX_ACKS_PER_REQUEST)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Receipt timestamps are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 
 @router.post("/broadcast", response_model=EmergencyBroadcastResponse)
 def emergency_broadcast(
@@ -29,15 +56,108 @@ def emergency_broadcast(
 ):
     """
     Generate and broadcast an emergency voice message to staff roles. Tracks acknowledgements.
+    The broadcast is registered (and pushed to recipients) even if voice generation fails;
+    any voice error is returned in `voice_error` alongside the broadcast id.
     """
+    if not request.target_roles:
+        raise HTTPException(status_code=400, detail="target_roles is required")
+
+    broadcast, recipients = broadcast_service.create_broadcast(
+        db,
+        message=request.message,
+        severity=request.severity,
+        target_roles=request.target_roles,
+        created_by=current_user.email,
+        auto_repeat=request.auto_repeat,
+    )
+    audit_service.record(
+        f"EMERGENCY BROADCAST | severity={request.severity} | recipients={len(recipients)}",
+        performed_by=current_user.email,
+        event_type="emergency_broadcast",
+        details={"broadcast_id": broadcast.id, "severity": request.severity,
+                 "target_roles": request.target_roles, "recipients": len(recipients)},
+    )
+    response = {"broadcast_id": broadcast.id, "recipient_count": len(recipients), "ack_list": []}
     try:
         tts = text_to_speech_elevenlabs(request.message)
-        # TODO: Implement actual ACK tracking (DB or in-memory)
-        ack_list = []
-        return {
-            "audio_base64": tts["audio_base64"],
-            "content_type": tts["content_type"],
-            "ack_list": ack_list
-        }
+        response["audio_base64"] = tts["audio_base64"]
+        response["content_type"] = tts["content_type"]
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Broadcast error: {str(e)}")
+        # Already committed and pushed: a 500 here would make clients retry into a second broadcast
+        response["voice_error"] = str(e)
+    return response
+
+
+@router.post("/broadcasts/{broadcast_id}/ack")
+def acknowledge_broadcast(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Acknowledge a broadcast as the current user."""
+    result = broadcast_service.record_acks(
+        db, [{"broadcast_id": broadcast_id, "user_id": current_user.id, "status": "acknowledged"}]
+    )
+    if result["rejected"]:
+        reason = result["rejected"][0]["reason"]
+        raise HTTPException(status_code=404, detail=f"Broadcast {broadcast_id}: {reason}")
+    return {"acknowledged": True, "duplicate": bool(result["duplicates"])}
+
+
+@router.post("/broadcasts/acks")
+def bulk_acknowledge(
+    request: BulkAckRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """
+    Record many deliveries/acknowledgements in one upsert (pager gateways,
+    devices flushing offline acks). Staff may only report their own;
+    admins and managers may report anyone's.
+    """
+    if current_user.role not in ALLOWED_ROLES and any(a.user_id != current_user.id for a in request.acks):
+        raise HTTPException(status_code=403, detail="You can only acknowledge for yourself")
+    return broadcast_service.record_acks(
+        db, [{**a.model_dump(), "at": _naive_utc(a.at)} for a in request.acks]
+    )
+
+
+@router.get("/broadcasts/{broadcast_id}")
+def get_broadcast(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Broadcast details with live delivery/ack counts."""
+    broadcast = db.get(Broadcast, broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return {**broadcast_service.as_dict(broadcast), "acks": broadcast_service.ack_counts(db, broadcast_id)}
+
+
+@router.get("/broadcasts/{broadcast_id}/acks")
+def get_broadcast_acks(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Live delivery/ack counts only (cheap enough to poll)."""
+    counts = broadcast_service.ack_counts(db, broadcast_id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return counts
+
+
+@router.get("/broadcasts/{broadcast_id}/receipts")
+def get_broadcast_receipts(
+    broadcast_id: int,
+    status: Optional[Literal["pending", "acknowledged"]] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Per-recipient delivery/ack times. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    if db.get(Broadcast, broadcast_id) is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast_service.list_receipts(db, broadcast_id, status)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app import versions
+from app.database import get_db, on_commit
 from app.models.department import Department
 from app.schemas.department_schema import DepartmentCreate, DepartmentResponse
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal, invalidate_principal
 from app.models.user import User
+from app.services.roster_hooks import roster_changed
 
 router = APIRouter(prefix="/departments", tags=["Departments"])
 
@@ -27,6 +29,8 @@ def create_department(
 
     db_dept = Department(name=department.name, description=department.description)
     db.add(db_dept)
+    roster_changed(db)
+    versions.bump_on_commit(db, versions.DEPARTMENTS)
     db.commit()
     db.refresh(db_dept)
     return db_dept
@@ -34,10 +38,15 @@ def create_department(
 
 @router.get("/", response_model=List[DepartmentResponse])
 def get_departments(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
-    """Get all departments."""
+    """Get all departments. Honours If-None-Match (304 without a query)."""
+    cached = versions.not_modified(request, response, versions.DEPARTMENTS)
+    if cached:
+        return cached
     return db.query(Department).all()
 
 
@@ -45,7 +54,7 @@ def get_departments(
 def get_department(
     dept_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get a specific department by ID."""
     dept = db.query(Department).filter(Department.id == dept_id).first()
@@ -69,5 +78,11 @@ def delete_department(
         raise HTTPException(status_code=404, detail="Department not found")
 
     db.delete(dept)
+    roster_changed(db)
+    # Members and shifts lose their department_id too
+    versions.bump_on_commit(
+        db, versions.DEPARTMENTS, versions.USERS, versions.SHIFTS, versions.SHIFTS_BULK, versions.ASSIGNMENTS,
+    )
+    on_commit(db, invalidate_principal)  # members' department changes
     db.commit()
     return {"message": f"Department '{dept.name}' deleted"}
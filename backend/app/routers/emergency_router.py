@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from datetime import datetime, timezone
 from typing import Optional
 import os
 
+from app import sqltrace
+from app.admission import admission_stats
+from app.config import SQL_TRACE_ENABLED
 from app.database import get_db
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal
 from app.models.user import User
 from app.models.audit_log import AuditLog
+from app.services import audit_service, notification_dispatcher, notification_service
 from app.services.emergency_service import trigger_red_alert, resolve_red_alert
 
 router = APIRouter(prefix="/emergency", tags=["🚨 Emergency"])
@@ -20,12 +25,21 @@ class RedAlertRequest(BaseModel):
     emergency_type: str
     department_id: int
     notes: Optional[str] = ""
+    # False → execute the precomputed standby plan without waiting for GPT-4o
+    refine_with_ai: bool = True
 
 
 class ResolveRequest(BaseModel):
     department_id: int
 
 
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Audit timestamps are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 # ── Endpoints ───────────────────────────────────────────────────────────────
 
 @router.post("/red-alert")
@@ -59,7 +73,8 @@ def activate_red_alert(
         db=db,
         emergency_type=request.emergency_type,
         affected_department_id=request.department_id,
-        triggered_by=current_user.email
+        triggered_by=current_user.email,
+        refine_with_ai=request.refine_with_ai
     )
 
     if "error" in result:
@@ -88,7 +103,7 @@ def resolve_alert(
 @router.get("/voice-alert/{filename}")
 def serve_voice_alert(
     filename: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """
     🔊 Serve the ElevenLabs voice alert MP3.
@@ -102,21 +117,38 @@ def serve_voice_alert(
     if not os.path.exists(path):
         raise HTTPException(
             status_code=404,
-            detail="Audio file not found. ElevenLabs key may not be set."
+            detail="Audio file not found. Check GET /emergency/voice-status/{voice_id}: it may still be rendering, or have failed."
         )
 
     return FileResponse(path, media_type="audio/mpeg", filename=filename)
 
 
+@router.get("/voice-status/{voice_id}")
+def get_voice_status(
+    voice_id: str,
+    current_user: User = Depends(get_token_principal)
+):
+    """
+    Outcome of a Red Alert voice render (the `voice_id` in its broadcast):
+    rendering, ready (fetch `audio_filename` from /emergency/voice-alert/) or
+    failed with `error`.
+    """
+    record = notification_service.voice_status(voice_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown voice render")
+    return record
+
+
 @router.get("/audit-logs")
 def get_audit_logs(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get recent audit logs. Admins and managers only."""
     if current_user.role not in ALLOWED_ROLES:
         raise HTTPException(status_code=403, detail="Admins and managers only")
 
+    audit_service.flush()  # include events still waiting for the batch writer
     logs = (
         db.query(AuditLog)
         .order_by(AuditLog.timestamp.desc())
@@ -124,12 +156,83 @@ def get_audit_logs(
         .all()
     )
 
-    return [
-        {
-            "id": log.id,
-            "action": log.action,
-            "performed_by": log.performed_by,
-            "timestamp": log.timestamp.isoformat()
-        }
-        for log in logs
-    ]
+    return [audit_service.as_dict(log) for log in logs]
+
+
+@router.get("/audit-logs/search")
+def search_audit_logs(
+    event_type: Optional[str] = None,
+    department_id: Optional[int] = None,
+    target_user_id: Optional[int] = None,
+    performed_by: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """
+    Filtered audit history, newest first. Pass next_cursor back as `cursor`
+    for the following page. Admins and managers only.
+    """
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+
+    audit_service.flush()
+    try:
+        return audit_service.search(
+            db,
+            event_type=event_type,
+            department_id=department_id,
+            target_user_id=target_user_id,
+            performed_by=performed_by,
+            since=_naive_utc(since),
+            until=_naive_utc(until),
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/audit-logs/metrics")
+def get_audit_metrics(current_user: User = Depends(get_token_principal)):
+    """Audit writer queue depth and flush latency. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    return audit_service.audit_stats()
+
+
+@router.get("/notifications/metrics")
+def get_notification_metrics(current_user: User = Depends(get_token_principal)):
+    """Notification queue depth, retries, dedup and delivery latency. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    return notification_dispatcher.notification_stats()
+
+
+@router.get("/admission/metrics")
+def get_admission_metrics(current_user: User = Depends(get_token_principal)):
+    """Slots in use, queueing and requests shed (429/503) per route group. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    return admission_stats()
+
+
+@router.get("/sql-traces")
+def get_sql_traces(
+    n_plus_one_only: bool = Query(False, description="Only requests with N+1 suspects"),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_token_principal),
+):
+    """
+    Recent per-request SQL traces, newest first: every statement (normalized)
+    with its duration and originating app line, and N+1 suspects. Needs
+    SQL_TRACE_ENABLED (development). Admins and managers only.
+    """
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    if not SQL_TRACE_ENABLED:
+        raise HTTPException(status_code=404, detail="SQL tracing is disabled (set SQL_TRACE_ENABLED=true)")
+    return sqltrace.recent_traces(n_plus_one_only=n_plus_one_only, limit=limit)
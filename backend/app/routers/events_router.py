@@ -0,0 +1,121 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.security import get_token_principal
+from app.services import event_bus
+
+router = APIRouter(prefix="/ws", tags=["Live Updates"])
+
+ALLOWED_ROLES = ["admin", "manager"]
+
+
+def _authenticate(token: str):
+    with SessionLocal() as db:
+        return get_token_principal(token, db)
+
+
+def _check_topics(principal, topics: List[str]) -> Optional[str]:
+    """Returns an error message, or None if the caller may subscribe to all of them."""
+    for topic in topics:
+        if not event_bus.valid_topic(topic):
+            return f"Unknown topic '{topic}'"
+        if (
+            topic.startswith("user:")
+            and topic != event_bus.user_topic(principal.id)
+            and principal.role not in ALLOWED_ROLES
+        ):
+            return f"Not allowed to subscribe to '{topic}'"
+    return None
+
+
+@router.websocket("/events")
+async def events(websocket: WebSocket, token: Optional[str] = None, topics: Optional[str] = None):
+    """
+    Live roster and emergency events. Authenticate with ?token=<jwt> (or an
+    Authorization header) and pick topics with ?topics=department:3,emergency
+    or by sending {"action": "subscribe" | "unsubscribe", "topics": [...]}.
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    try:
+        principal = await run_in_threadpool(_authenticate, token or "")
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    initial = [t for t in (topics or "").split(",") if t]
+    error = _check_topics(principal, initial)
+    if error:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=error)
+        return
+
+    await websocket.accept()
+    sub = event_bus.Subscription()
+    event_bus.register(sub)
+    event_bus.subscribe(sub, initial)
+    await websocket.send_json({"type": "subscribed", "topics": sorted(sub.topics)})
+
+    async def send_loop():
+        while True:
+            await websocket.send_text(await sub.next_message())
+            sub.sent()
+
+    async def receive_loop():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                action, requested = message["action"], list(message.get("topics", []))
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_json({"type": "error", "detail": "Expected {\"action\": ..., \"topics\": [...]}"})
+                continue
+            if action == "ping":
+                await websocket.send_json({"type": "pong"})
+                continue
+            if action not in ("subscribe", "unsubscribe"):
+                await websocket.send_json({"type": "error", "detail": f"Unknown action '{action}'"})
+                continue
+            error = _check_topics(principal, requested)
+            if error:
+                await websocket.send_json({"type": "error", "detail": error})
+                continue
+            if action == "subscribe":
+                event_bus.subscribe(sub, requested)
+            else:
+                event_bus.unsubscribe(sub, requested)
+            await websocket.send_json({"type": "subscribed", "topics": sorted(sub.topics)})
+
+    tasks = [
+        asyncio.create_task(send_loop()),
+        asyncio.create_task(receive_loop()),
+        asyncio.create_task(sub.evicted.wait()),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        event_bus.unregister(sub)
+
+    if sub.evicted.is_set():
+        # Too slow to keep up: the client should reconnect and refetch
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+    else:
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                if not isinstance(task.exception(), WebSocketDisconnect):
+                    print(f"[Events] Connection closed on error: {task.exception()}")
+
+
+@router.get("/events/metrics")
+def get_event_metrics(current_user: User = Depends(get_token_principal)):
+    """Connections, subscriptions and fan-out/drop counters. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    return event_bus.bus_stats()
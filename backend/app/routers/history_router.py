@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.user import User
+from app.security import get_current_user, get_token_principal
+from app.services import archive_service
+
+router = APIRouter(prefix="/history", tags=["History"])
+
+ALLOWED_ROLES = ["admin", "manager"]
+
+
+def _range(start: datetime, end: datetime):
+    # Stored timestamps are naive UTC
+    if start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end.tzinfo:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return start, end
+
+
+@router.get("/shifts")
+def get_shift_history(
+    start: datetime,
+    end: datetime,
+    department_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Shifts (with assignments) starting in [start, end), including archived ones."""
+    start, end = _range(start, end)
+    return archive_service.history_shifts(db, start, end, department_id)
+
+
+@router.get("/audit-logs")
+def get_audit_history(
+    start: datetime,
+    end: datetime,
+    event_type: Optional[str] = None,
+    department_id: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Audit rows in [start, end), newest first, including archived ones. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    start, end = _range(start, end)
+    return archive_service.history_audit_logs(db, start, end, event_type, department_id, limit)
+
+
+@router.get("/archive")
+def get_archive_status(current_user: User = Depends(get_token_principal)):
+    """Archive watermark and recent runs. Admins and managers only."""
+    if current_user.role not in ALLOWED_ROLES:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+    return archive_service.read_manifest()
+
+
+@router.post("/archive")
+def run_archive(
+    horizon_days: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move history older than the horizon into the archive. Admin only."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return archive_service.run_archival(db, horizon_days=horizon_days)
@@ -0,0 +1,32 @@
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from app import metrics, sqltrace, tracing
+from app.admission import admission_stats
+from app.config import METRICS_TOKEN
+from app.idempotency import idempotency_stats
+from app.security import hashing_stats
+from app.services import audit_service, event_bus, notification_dispatcher, public_snapshot
+
+router = APIRouter(tags=["Health"])
+
+metrics.register_stats("audit", audit_service.audit_stats)
+metrics.register_stats("password_hashing", hashing_stats)
+metrics.register_stats("notifications", notification_dispatcher.notification_stats)
+metrics.register_stats("events", event_bus.bus_stats)
+metrics.register_stats("admission", admission_stats)
+metrics.register_stats("idempotency", idempotency_stats)
+metrics.register_stats("public_snapshot", public_snapshot.snapshot_stats)
+metrics.register_stats("sql_trace", sqltrace.sql_trace_stats)
+metrics.register_stats("tracing", tracing.tracing_stats)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition. Requires `Bearer METRICS_TOKEN` when one is configured."""
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
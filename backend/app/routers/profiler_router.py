@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from app import profiler
+from app.config import PROFILER_INTERVAL_MS, PROFILER_MAX_REQUESTS
+from app.database import get_db
+from app.models.profile_session import ProfileSession
+from app.models.user import User
+from app.security import get_current_user
+from app.services import profile_service
+
+router = APIRouter(prefix="/admin/profiles", tags=["Admin"])
+
+
+class ProfileRequest(BaseModel):
+    # fnmatch against the route template or the request path: "/users/*", "/shifts/{shift_id}"
+    route_pattern: str = Field(..., min_length=1)
+    method: Optional[str] = None
+    requests: int = Field(10, ge=1, le=PROFILER_MAX_REQUESTS)
+    interval_ms: float = Field(PROFILER_INTERVAL_MS, ge=1, le=1000)
+
+
+def _require_admin(user: User) -> None:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+
+def _get(db: Session, profile_id: int) -> ProfileSession:
+    row = db.query(ProfileSession).filter(ProfileSession.id == profile_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Profile session not found")
+    return row
+
+
+@router.post("/", status_code=201)
+def start_profile(
+    request: ProfileRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Profile the next `requests` requests matching `route_pattern` (sampling every `interval_ms`). Admins only."""
+    _require_admin(current_user)
+    row = profile_service.create(db, request.route_pattern, request.method, request.requests,
+                                 request.interval_ms, current_user.email)
+    profiler.arm(row.id, row.route_pattern, row.method, row.target_requests, row.interval_ms)
+    return profile_service.as_dict(row)
+
+
+@router.get("/")
+def list_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Profiling sessions, newest first. Admins only."""
+    _require_admin(current_user)
+    rows = db.query(ProfileSession).order_by(ProfileSession.id.desc()).limit(limit).all()
+    return [profile_service.as_dict(row) for row in rows]
+
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """A session's status and the requests profiled so far. Admins only."""
+    _require_admin(current_user)
+    return profile_service.as_dict(_get(db, profile_id))
+
+
+@router.get("/{profile_id}/collapsed", response_class=PlainTextResponse)
+def download_profile(
+    profile_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Collapsed stacks (`frame;frame;frame samples` per line) for flamegraph.pl,
+    speedscope or inferno. Admins only.
+    """
+    _require_admin(current_user)
+    row = _get(db, profile_id)
+    session = profiler.armed(profile_id)
+    collapsed = session.snapshot()["collapsed"] if session else row.collapsed or ""
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"',
+    })
+
+
+@router.delete("/{profile_id}")
+def cancel_profile(
+    profile_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stop a running session, keeping what it collected. Admins only."""
+    _require_admin(current_user)
+    row = _get(db, profile_id)
+    snapshot = profiler.cancel(profile_id)
+    if snapshot is None:
+        raise HTTPException(status_code=409, detail=f"Profile session is {row.status}, not running")
+    profile_service.save(snapshot)
+    db.refresh(row)
+    return profile_service.as_dict(row)
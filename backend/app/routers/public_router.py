@@ -1,17 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
-from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models.department import Department
-from app.models.shift import Shift
-from app.models.assignment import Assignment
+from app import versions
+from app.config import PUBLIC_CACHE_MAX_AGE, PUBLIC_CACHE_STALE_SECONDS
+from app.services import public_snapshot
 from app.services.ai_service import text_to_speech_elevenlabs
 
 # IMPORTANT: this name must be "router" because app.main imports router as public_router
 router = APIRouter(prefix="/public", tags=["Public Updates"])
 
+# Lets a caching proxy in front of the kiosks absorb the polling
+CACHE_CONTROL = f"public, max-age={PUBLIC_CACHE_MAX_AGE}, stale-while-revalidate={PUBLIC_CACHE_STALE_SECONDS}"
+
 
 class PublicUpdateRequest(BaseModel):
     department_id: int
@@ -20,81 +22,85 @@ class PublicUpdateRequest(BaseModel):
     custom_note: Optional[str] = None
 
 
+async def _snapshot() -> public_snapshot.Snapshot:
+    # Served straight from memory; only a rebuild leaves the event loop
+    return public_snapshot.current() or await run_in_threadpool(public_snapshot.get)
+
+
+def _respond(request: Request, body: public_snapshot.Body) -> Response:
+    headers = {"ETag": body.etag, "Cache-Control": CACHE_CONTROL}
+    match = request.headers.get("if-none-match")
+    if match and versions.etag_matches(match, body.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body.content, media_type="application/json", headers=headers)
+
+
 @router.get("/departments")
-def list_departments(db: Session = Depends(get_db)):
-    deps = db.query(Department).all()
-    return [{"id": d.id, "name": d.name} for d in deps]
+async def list_departments(request: Request):
+    snapshot = await _snapshot()
+    return _respond(request, snapshot.departments_body)
 
 
-@router.post("/voice-update")
-def voice_update(req: PublicUpdateRequest, db: Session = Depends(get_db)):
-    dep = db.query(Department).filter(Department.id == req.department_id).first()
-    if not dep:
+@router.get("/departments/{department_id}/status")
+async def department_status(department_id: int, request: Request, language: str = "en"):
+    """Latest coverage, estimated wait and wait-time transcript (text only; no PHI)."""
+    snapshot = await _snapshot()
+    body = snapshot.status(department_id, language.strip().lower())
+    if body is None:
         raise HTTPException(status_code=404, detail="Department not found")
+    return _respond(request, body)
 
-    # Non-PHI context (simple + demo-ready)
-    total_shifts = db.query(Shift).filter(Shift.department_id == req.department_id).count()
-    total_assignments = (
-        db.query(Assignment)
-        .join(Shift, Assignment.shift_id == Shift.id)
-        .filter(Shift.department_id == req.department_id)
-        .count()
-    )
 
-    coverage_pct = int((total_assignments / total_shifts) * 100) if total_shifts > 0 else 0
+@router.post("/voice-update")
+def voice_update(req: PublicUpdateRequest):
+    dep = public_snapshot.get().departments.get(req.department_id)
+    if not dep:
+        raise HTTPException(status_code=404, detail="Department not found")
 
-    # Simple ETA heuristic for demo
-    est_wait_min = max(10, 60 - int(coverage_pct * 0.5))
+    # Non-PHI context: filled vs. required slots for shifts running now or in the next 24h
+    name = dep["name"]
+    coverage_pct = dep["coverage_pct"]
+    est_wait_min = dep["estimated_wait_min"]
 
     t = (req.update_type or "wait_time").strip().lower()
     lang = (req.language or "en").strip().lower()
 
     if t == "wait_time":
-        if lang == "es":
-            text = (
-                f"Actualización de {dep.name}. "
-                f"Tiempo de espera estimado: {est_wait_min} minutos. "
-                f"Gracias por su paciencia. Si sus síntomas empeoran, avise al personal de inmediato."
-            )
-        else:
-            text = (
-                f"{dep.name} update. Estimated wait time is about {est_wait_min} minutes. "
-                f"Thank you for your patience. If symptoms worsen, alert staff immediately."
-            )
+        text = public_snapshot.wait_time_text(name, est_wait_min, lang)
     elif t == "visiting":
         if lang == "es":
             text = (
-                f"Actualización de visitas para {dep.name}. "
+                f"Actualización de visitas para {name}. "
                 f"Por favor, consulte con la recepción para las pautas de visitantes. "
                 f"Gracias por ayudar a mantener un entorno seguro."
             )
         else:
             text = (
-                f"Visiting update for {dep.name}. Please check with the front desk for visitor guidance. "
+                f"Visiting update for {name}. Please check with the front desk for visitor guidance. "
                 f"Thank you for helping keep a safe environment."
             )
     elif t == "directions":
         if lang == "es":
             text = (
-                f"Indicaciones para {dep.name}. "
+                f"Indicaciones para {name}. "
                 f"Por favor siga las señales y consulte en recepción si necesita ayuda. "
                 f"Estamos aquí para apoyarle."
             )
         else:
             text = (
-                f"Directions for {dep.name}. Please follow posted signs, and ask the front desk if you need help. "
+                f"Directions for {name}. Please follow posted signs, and ask the front desk if you need help. "
                 f"We’re here to support you."
             )
     else:  # safety
         if lang == "es":
             text = (
-                f"Aviso de seguridad para {dep.name}. "
+                f"Aviso de seguridad para {name}. "
                 f"Use mascarilla si se le solicita y lávese las manos con frecuencia. "
                 f"Gracias por proteger a los demás."
             )
         else:
             text = (
-                f"Safety notice for {dep.name}. Wear a mask if requested and wash hands frequently. "
+                f"Safety notice for {name}. Wear a mask if requested and wash hands frequently. "
                 f"Thank you for protecting others."
             )
 
@@ -104,7 +110,7 @@ def voice_update(req: PublicUpdateRequest, db: Session = Depends(get_db)):
     audio = text_to_speech_elevenlabs(text=text)
 
     return {
-        "department": dep.name,
+        "department": name,
         "coverage_pct": coverage_pct,
         "estimated_wait_min": est_wait_min,
         "transcript": text,
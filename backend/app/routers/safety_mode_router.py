@@ -1,24 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal
 from app.models.user import User
 from app.services.ai_service import text_to_speech_elevenlabs
+from app.services.safety_service import get_policy, set_policy, find_blocked_assignments
 
 router = APIRouter(prefix="/ai", tags=["AI Scheduling"])
 
 # --- Safety Mode ---
 class SafetyModeRequest(BaseModel):
-    burnout_threshold: int
+    burnout_threshold: int = Field(..., ge=0, le=100)
     block_critical: bool = False
-    staff_data: Optional[List[dict]] = None  # Optionally pass staff data
+    enabled: bool = True
+    horizon_days: int = Field(14, ge=1, le=90)
+    staff_data: Optional[List[dict]] = None  # Deprecated: load is computed from assignments
 
 class SafetyModeResponse(BaseModel):
     audio_base64: str
     content_type: str
     blocked_assignments: List[dict] = []
+    policy: dict = {}
+
+@router.get("/safety-mode")
+def get_safety_mode(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Current Safety Mode policy."""
+    return get_policy(db)
 
 @router.post("/safety-mode", response_model=SafetyModeResponse)
 def safety_mode(
@@ -27,20 +39,45 @@ def safety_mode(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Analyze burnout risk and generate supervisor audio briefing. Optionally block assignments.
+    Persist the Safety Mode policy, list upcoming assignments that exceed the
+    burnout threshold, and generate a supervisor audio briefing.
+    Once enabled, every new assignment (including Red Alert reallocations)
+    is checked; with block_critical, critical ones are rejected.
     """
+    if current_user.role not in ["admin", "manager"]:
+        raise HTTPException(status_code=403, detail="Admins and managers only")
+
     try:
-        # TODO: Analyze assignments and block if needed
-        blocked_assignments = []
+        policy = set_policy(
+            db,
+            burnout_threshold=request.burnout_threshold,
+            block_critical=request.block_critical,
+            enabled=request.enabled,
+            updated_by=current_user.email,
+        )
+        blocked_assignments = find_blocked_assignments(db, policy, horizon_days=request.horizon_days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Safety mode error: {str(e)}")
+
+    if not request.enabled:
+        briefing_text = "Safety Mode deactivated."
+    else:
         briefing_text = (
             f"Safety Mode activated. Burnout threshold set to {request.burnout_threshold}. "
+            f"{len(blocked_assignments)} upcoming assignments exceed this threshold. "
             + ("Critical assignments will be blocked above this threshold." if request.block_critical else "")
         )
+
+    # The policy is already in force; a missing voice key only loses the audio
+    try:
         tts = text_to_speech_elevenlabs(briefing_text)
-        return {
-            "audio_base64": tts["audio_base64"],
-            "content_type": tts["content_type"],
-            "blocked_assignments": blocked_assignments
-        }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Safety mode error: {str(e)}")
+        print(f"[SafetyMode] Briefing audio unavailable: {e}")
+        tts = {"audio_base64": "", "content_type": "audio/mpeg"}
+
+    return {
+        "audio_base64": tts["audio_base64"],
+        "content_type": tts["content_type"],
+        "blocked_assignments": blocked_assignments,
+        "policy": policy,
+    }
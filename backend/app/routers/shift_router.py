@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+from app import versions
 from app.database import get_db
 from app.models.shift import Shift
 from app.models.department import Department
 from app.models.user import User
 from app.schemas.shift_schema import ShiftCreate, ShiftResponse
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal
+from app.services import roster_hooks
+from app.services.coverage_service import list_open_slots
 
 router = APIRouter(prefix="/shifts", tags=["Shifts"])
 
@@ -37,6 +41,8 @@ def create_shift(
         required_staff_count=shift.required_staff_count
     )
     db.add(db_shift)
+    db.flush()
+    roster_hooks.shift_added(db, db_shift)
     db.commit()
     db.refresh(db_shift)
     return db_shift
@@ -44,20 +50,43 @@ def create_shift(
 
 @router.get("/", response_model=List[ShiftResponse])
 def get_shifts(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
-    """Get all shifts."""
+    """Get all shifts. Honours If-None-Match (304 without a query)."""
+    cached = versions.not_modified(request, response, versions.SHIFTS)
+    if cached:
+        return cached
     return db.query(Shift).all()
 
 
+@router.get("/open-slots")
+def get_open_slots(
+    department_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Under-staffed shifts (required vs. assigned), optionally by department and time window."""
+    return list_open_slots(db, department_id=department_id, start=start, end=end, limit=limit)
+
+
 @router.get("/department/{dept_id}", response_model=List[ShiftResponse])
 def get_shifts_by_department(
     dept_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
-    """Get all shifts for a specific department."""
+    """Get all shifts for a specific department. Honours If-None-Match (304 without a query)."""
+    cached = versions.not_modified(request, response, versions.shifts_of(dept_id), versions.SHIFTS_BULK)
+    if cached:
+        return cached
     return db.query(Shift).filter(Shift.department_id == dept_id).all()
 
 
@@ -65,7 +94,7 @@ def get_shifts_by_department(
 def get_shift(
     shift_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get a specific shift by ID."""
     shift = db.query(Shift).filter(Shift.id == shift_id).first()
@@ -88,6 +117,12 @@ def delete_shift(
     if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
 
+    # Remove the shift's assignments with it (and from everyone's weekly load)
+    for assignment in list(shift.assignments):
+        roster_hooks.assignment_removed(db, assignment, shift)
+        db.delete(assignment)
+    roster_hooks.shift_removed(db, shift)
+
     db.delete(shift)
     db.commit()
     return {"message": f"Shift {shift_id} deleted"}
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.user import User
+from app.security import get_token_principal
+from app.services import sync_service
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("")
+def sync(
+    since: Optional[int] = Query(None, ge=0),
+    department_id: Optional[int] = None,
+    limit: int = Query(sync_service.PAGE_SIZE, ge=1, le=sync_service.PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """
+    Shifts and assignments changed after `since` (the `seq` from your last
+    call), with deleted ids as tombstones. Omit `since` for a full snapshot;
+    `reset: true` means one was returned: replace local state. Call again
+    while `has_more` is true.
+    """
+    return sync_service.changes_since(db, since, department_id, limit)
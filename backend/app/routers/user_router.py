@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app import versions
+from app.database import get_db, on_commit
 from app.models.user import User
 from app.schemas.user_schema import UserResponse, UserUpdate
-from app.security import get_current_user
+from app.security import get_current_user, get_token_principal, invalidate_principal
+from app.services.rollup_service import get_weekly_load
+from app.services.roster_hooks import roster_changed
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
-    """Get all users. Requires authentication."""
+    """Get all users. Requires authentication. Honours If-None-Match (304 without a query)."""
+    cached = versions.not_modified(request, response, versions.USERS)
+    if cached:
+        return cached
     return db.query(User).all()
 
 
@@ -29,7 +38,7 @@ def get_me(current_user: User = Depends(get_current_user)):
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_token_principal)
 ):
     """Get a specific user by ID."""
     user = db.query(User).filter(User.id == user_id).first()
@@ -38,6 +47,17 @@ def get_user(
     return user
 
 
+@router.get("/{user_id}/weekly-load")
+def get_user_weekly_load(
+    user_id: int,
+    week_of: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_principal)
+):
+    """Hours, shifts and night shifts for the ISO week containing week_of (default: now)."""
+    return get_weekly_load(db, user_id, week_of)
+
+
 @router.patch("/{user_id}", response_model=UserResponse)
 def update_user(
     user_id: int,
@@ -57,6 +77,9 @@ def update_user(
     for field, value in update_data.items():
         setattr(user, field, value)
 
+    roster_changed(db)
+    versions.bump_on_commit(db, versions.USERS)
+    on_commit(db, lambda: invalidate_principal(user_id))
     db.commit()
     db.refresh(user)
     return user
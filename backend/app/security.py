@@ -1,13 +1,23 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.config import (
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
+    PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_SIZE, BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
@@ -19,32 +29,241 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses a different cost."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+# ── Password hashing pool ───────────────────────────────────────────────
+# bcrypt is deliberately slow; at shift change a login storm would otherwise
+# occupy every request thread. Hashing runs in its own processes and callers
+# beyond PASSWORD_HASH_MAX_PENDING get a fast 503 instead of queueing.
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_rejected = 0
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        return _pool
+
+
+def start_hashing_pool() -> None:
+    """Fork the hashing workers now (call before starting background threads)."""
+    pool = _get_pool()
+    if pool is not None:
+        pool.submit(int).result()
+
+
+async def _run_hashing(fn, *args):
+    global _pending, _rejected
+    with _pool_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            _rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        with _pool_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_and_update_password_async(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await _run_hashing(verify_and_update_password, plain, hashed)
+
+
+def hashing_stats() -> Dict[str, Any]:
+    with _pool_lock:
+        return {
+            "workers": max(PASSWORD_HASH_WORKERS, 0),
+            "pending": _pending,
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "rejected_total": _rejected,
+        }
+
+
+def shutdown_hashing_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def access_token_for(user) -> str:
+    """Token for a user, carrying role/department claims for get_token_principal."""
+    return create_access_token({
+        "sub": str(user.id),
+        "role": user.role,
+        "dept": user.department_id,
+    })
+
+
+# ── Principal cache ─────────────────────────────────────────────────────
+
+class Principal:
+    """The authenticated caller: the User columns routes read, detached from any session."""
+
+    __slots__ = ("id", "name", "email", "role", "department_id", "is_active")
+
+    def __init__(self, id, name, email, role, department_id, is_active=True):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+        self.department_id = department_id
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.name, user.email, user.role, user.department_id, bool(user.is_active))
+
+
+_cache_lock = threading.Lock()
+_principals: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+# user_id → wall-clock time of the last role/active/department change
+_changed_at: Dict[int, float] = {}
+# Changes are only tracked in memory, so tokens issued before this process
+# started could predate a change it never saw: distrust their claims.
+_all_changed_at = time.time()
+
+
+def _cache_get(token: str) -> Optional[Principal]:
+    with _cache_lock:
+        hit = _principals.get(token)
+        if hit is None:
+            return None
+        principal, expires = hit
+        if time.monotonic() > expires:
+            del _principals[token]
+            return None
+        _principals.move_to_end(token)
+        return principal
+
+
+def _cache_put(token: str, principal: Principal, token_expires: float) -> None:
+    """Cache until PRINCIPAL_CACHE_TTL_SECONDS or the token's own `exp`, whichever comes first."""
+    ttl = min(PRINCIPAL_CACHE_TTL_SECONDS, token_expires - time.time())
+    if ttl <= 0:
+        return
+    with _cache_lock:
+        _principals[token] = (principal, time.monotonic() + ttl)
+        _principals.move_to_end(token)
+        while len(_principals) > PRINCIPAL_CACHE_SIZE:
+            _principals.popitem(last=False)
+
+
+def invalidate_principal(user_id: Optional[int] = None) -> None:
+    """Drop cached principals for a user (or everyone) and distrust their older token claims."""
+    global _all_changed_at
+    with _cache_lock:
+        if user_id is None:
+            _principals.clear()
+            _changed_at.clear()
+            _all_changed_at = time.time()
+            return
+        for token in [t for t, (p, _) in _principals.items() if p.id == user_id]:
+            del _principals[token]
+        _changed_at[user_id] = time.time()
+
+
+def _decode(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def token_subject(token: str) -> Optional[str]:
+    """The subject of a valid, unexpired token, else None (no DB lookup)."""
+    try:
+        return _decode(token)["sub"]
+    except HTTPException:
+        return None
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
+    """
+    The caller as a Principal. Verified tokens are cached for
+    PRINCIPAL_CACHE_TTL_SECONDS, so the users table is read once per token
+    rather than once per request; update_user invalidates the entry.
+    """
     from app.models.user import User
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = _cache_get(token)
+    if principal is None:
+        payload = _decode(token)
+        user = db.query(User).filter(User.id == int(payload["sub"])).first()
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_user(user)
+        _cache_put(token, principal, payload.get("exp", float("inf")))
+
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is inactive")
+    return principal
+
+
+def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    For read-only routes: authorize from the token's role/department claims
+    without touching the database. Falls back to get_current_user for tokens
+    without claims, issued before the user's last role/active change, or
+    issued before this process started. Carries id, role and department_id
+    only; admin-only routes use get_current_user.
+    """
+    principal = _cache_get(token)
+    if principal is not None:
+        if not principal.is_active:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is inactive")
+        return principal
+
+    payload = _decode(token)
+    user_id = int(payload["sub"])
+    issued_at = payload.get("iat", 0)
+    with _cache_lock:
+        changed_at = max(_changed_at.get(user_id, 0.0), _all_changed_at)
+    if "role" not in payload or issued_at <= changed_at:
+        return get_current_user(token, db)
+    return Principal(user_id, None, None, payload["role"], payload.get("dept"))
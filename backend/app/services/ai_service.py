@@ -1,31 +1,29 @@
-
 """
 MedRoster AI Service
-Uses OpenAI GPT-4o for intelligent scheduling, workload analysis,
-and emergency reallocation planning, plus ElevenLabs for voice announcements.
+Intelligent scheduling, workload analysis and emergency reallocation
+planning on the configured chat provider (GPT-4o by default), plus voice
+announcements on the TTS provider (ElevenLabs by default); see
+app.services.providers.
 """
 
 import base64
 import json
 from typing import Any, Dict, List, Optional
 
-import requests
-from openai import OpenAI
-
-from app.config import OPENAI_API_KEY, ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID
+from app.services.providers import chat_provider, tts_provider
+from app.services.workload_service import (
+    MAX_WEEKLY_HOURS,
+    MAX_WEEKLY_SHIFTS,
+    MAX_CONSECUTIVE_DAYS,
+    MIN_REST_HOURS,
+    HIGH_RISK_SCORE,
+    fairness_score,
+)
 
 
 # -----------------------------
 # Helpers
 # -----------------------------
-def _openai_key_present() -> bool:
-    return bool(OPENAI_API_KEY and OPENAI_API_KEY != "your_openai_key_here")
-
-
-def _get_openai_client() -> OpenAI:
-    return OpenAI(api_key=OPENAI_API_KEY)
-
-
 def _is_quota_error(exc: Exception) -> bool:
     msg = str(exc).lower()
     return (
@@ -51,7 +49,11 @@ def _safe_json_loads(s: str) -> Dict[str, Any]:
 # -----------------------------
 # Fallbacks 
 # -----------------------------
-def _fallback_schedule(staff_list: List[Dict[str, Any]], shift_requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _fallback_schedule(
+    staff_list: List[Dict[str, Any]],
+    shift_requirements: List[Dict[str, Any]],
+    reason: str = "Fallback rule-based match (AI unavailable)."
+) -> Dict[str, Any]:
     assignments: List[Dict[str, Any]] = []
     warnings: List[str] = []
 
@@ -69,7 +71,7 @@ def _fallback_schedule(staff_list: List[Dict[str, Any]], shift_requirements: Lis
                 "staff_role": chosen.get("role"),
                 "shift_id": shift.get("shift_id"),
                 "department": shift.get("department"),
-                "reason": "Fallback rule-based match (AI unavailable)."
+                "reason": reason
             })
         else:
             warnings.append(f"No available staff for role {role} (fallback).")
@@ -81,22 +83,41 @@ def _fallback_schedule(staff_list: List[Dict[str, Any]], shift_requirements: Lis
     }
 
 
-def _fallback_workload(staff_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _fallback_workload(
+    staff_data: List[Dict[str, Any]],
+    summary: str = "AI unavailable (quota/key). Returned heuristic workload analysis."
+) -> Dict[str, Any]:
     at_risk = []
     for s in staff_data:
         hours = float(s.get("hours_this_week", 0) or 0)
         shifts = float(s.get("shifts_this_week", 0) or 0)
-        if hours > 48 or shifts > 6:
+        consecutive = int(s.get("consecutive_days", 0) or 0)
+        min_rest = s.get("min_rest_hours")
+        score = s.get("burnout_score")
+
+        concerns = []
+        if hours > MAX_WEEKLY_HOURS or shifts > MAX_WEEKLY_SHIFTS:
+            concerns.append(f"Over guideline limits (hours={hours}, shifts={shifts}).")
+        if consecutive > MAX_CONSECUTIVE_DAYS:
+            concerns.append(f"{consecutive} consecutive working days.")
+        if min_rest is not None and float(min_rest) < MIN_REST_HOURS:
+            concerns.append(f"Only {min_rest}h rest between shifts.")
+        if score is not None and int(score) >= HIGH_RISK_SCORE:
+            concerns.append(f"Burnout score {score}/100.")
+
+        if concerns:
             at_risk.append({
                 "name": s.get("name", "Unknown"),
-                "concern": f"Over guideline limits (hours={hours}, shifts={shifts}).",
+                "concern": " ".join(concerns),
                 "recommended_action": "Reduce next-week load; avoid consecutive nights."
             })
 
+    hours_list = [float(s.get("hours_this_week", 0) or 0) for s in staff_data]
+
     return {
-        "fairness_score": 50,
+        "fairness_score": fairness_score(hours_list),
         "at_risk_staff": at_risk,
-        "overall_summary": "AI unavailable (quota/key). Returned heuristic workload analysis.",
+        "overall_summary": summary,
         "recommendations": [
             "Cap weekly hours to 48 and shifts to 6.",
             "Rotate night duties evenly across staff.",
@@ -124,25 +145,60 @@ def _fallback_tip() -> str:
 
 
 # -----------------------------
-# OpenAI call wrapper
+# Local provider rules
 # -----------------------------
-def _call_openai_json(prompt: str, temperature: float = 0.2) -> Dict[str, Any]:
-    if not _openai_key_present():
-        # No key → do not raise; caller will choose fallback
-        raise ValueError("OPENAI_API_KEY is not set in your .env file")
+# What AI_PROVIDER=local answers: the same heuristics, worded as a plan
+def _hours(staff: Dict[str, Any]) -> float:
+    return float(staff.get("hours_this_week", 0) or 0)
 
-    client = _get_openai_client()
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=temperature,
-        )
-        return _safe_json_loads(resp.choices[0].message.content)
-    except Exception as e:
-        # Let caller decide fallback
-        raise e
+
+def _rule_schedule(staff_list: List[Dict[str, Any]], shift_requirements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    out = _fallback_schedule(sorted(staff_list, key=_hours), shift_requirements,
+                             reason="Role match, fewest hours this week first.")
+    out["summary"] = f"{len(out['assignments'])} of {len(shift_requirements)} shifts covered by role match."
+    return out
+
+
+def _rule_emergency_plan(
+    emergency_type: str,
+    affected_department: str,
+    on_duty_staff: List[Dict[str, Any]],
+    off_duty_staff: List[Dict[str, Any]],
+    needed: int = 3
+) -> Dict[str, Any]:
+    reassign = sorted(on_duty_staff, key=_hours)[:needed]
+    call_in = sorted(off_duty_staff, key=_hours)[:max(needed - len(reassign), 1)]
+    return {
+        "immediate_reassignments": [
+            {
+                "staff_id": s.get("id"),
+                "staff_name": s.get("name"),
+                "from_department": s.get("current_department", "Unknown"),
+                "to_department": affected_department,
+                "urgency": "immediate",
+            }
+            for s in reassign
+        ],
+        "call_in_requests": [
+            {"staff_name": s.get("name"), "role": s.get("role"), "reason": f"{emergency_type} coverage"}
+            for s in call_in
+        ],
+        "estimated_coverage_minutes": 15,
+        "critical_warning": "",
+        "voice_announcement": (
+            f"Attention staff. {emergency_type} in {affected_department}. "
+            "Reassigned staff please report now and check MedRoster for details."
+        ),
+    }
+
+
+# -----------------------------
+# Chat provider call wrapper
+# -----------------------------
+def _call_chat_json(prompt: str, temperature: float = 0.2, rules=None) -> Dict[str, Any]:
+    """Raises ValueError when no provider is configured (caller chooses the fallback)."""
+    content = chat_provider().complete(prompt, json_mode=True, temperature=temperature, rules=rules)
+    return _safe_json_loads(content)
 
 
 # -----------------------------
@@ -184,7 +240,8 @@ Respond ONLY with this exact JSON structure, no extra text:
 }}"""
 
     try:
-        return _call_openai_json(prompt, temperature=0.2)
+        return _call_chat_json(prompt, temperature=0.2,
+                               rules=lambda: _rule_schedule(staff_list, shift_requirements))
     except Exception as e:
         # Key missing or quota error → fallback
         if isinstance(e, ValueError) or _is_quota_error(e):
@@ -201,7 +258,9 @@ def analyze_workload_fairness(staff_data: List[Dict[str, Any]]) -> Dict[str, Any
 Staff Workload Data:
 {json.dumps(staff_data, indent=2)}
 
-Analyze and identify burnout risk. Hospital guidelines: max 48 hours/week, max 6 shifts/week.
+Analyze and identify burnout risk. Hospital guidelines: max 48 hours/week, max 6 shifts/week,
+max 6 consecutive working days, at least 11 hours rest between shifts.
+burnout_score (0-100) and night_shifts, when present, are computed from the live roster.
 
 Respond ONLY with this exact JSON, no extra text:
 {{
@@ -218,7 +277,8 @@ Respond ONLY with this exact JSON, no extra text:
 }}"""
 
     try:
-        return _call_openai_json(prompt, temperature=0.2)
+        return _call_chat_json(prompt, temperature=0.2, rules=lambda: _fallback_workload(
+            staff_data, summary="Heuristic analysis against the hospital guidelines."))
     except Exception as e:
         if isinstance(e, ValueError) or _is_quota_error(e):
             return _fallback_workload(staff_data)
@@ -231,8 +291,14 @@ def generate_emergency_reallocation_plan(
     emergency_type: str,
     affected_department: str,
     on_duty_staff: List[Dict[str, Any]],
-    off_duty_staff: List[Dict[str, Any]]
+    off_duty_staff: List[Dict[str, Any]],
+    fallback_plan: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
+    """
+    fallback_plan (e.g. a precomputed standby plan) is returned instead of
+    the generic manual-reassignment fallback when the AI is unavailable;
+    the local provider plans from it too.
+    """
     prompt = f"""You are MedRoster's Emergency AI. A hospital emergency requires IMMEDIATE action.
 
 Emergency Type: {emergency_type}
@@ -250,6 +316,7 @@ Respond ONLY with this exact JSON, no extra text:
 {{
   "immediate_reassignments": [
     {{
+      "staff_id": 0,
       "staff_name": "string",
       "from_department": "string",
       "to_department": "{affected_department}",
@@ -268,9 +335,18 @@ Respond ONLY with this exact JSON, no extra text:
   "voice_announcement": "A calm, clear 2-sentence voice announcement for hospital intercom about the emergency staffing situation."
 }}"""
 
+    def rules():
+        if fallback_plan is not None:
+            return dict(fallback_plan)
+        return _rule_emergency_plan(emergency_type, affected_department, on_duty_staff, off_duty_staff)
+
     try:
-        return _call_openai_json(prompt, temperature=0.1)
+        return _call_chat_json(prompt, temperature=0.1, rules=rules)
     except Exception as e:
+        if fallback_plan is not None:
+            out = dict(fallback_plan)
+            out["critical_warning"] = "AI unavailable. Executing precomputed standby plan."
+            return out
         if isinstance(e, ValueError) or _is_quota_error(e):
             return _fallback_emergency_plan(emergency_type, affected_department)
         out = _fallback_emergency_plan(emergency_type, affected_department)
@@ -279,41 +355,27 @@ Respond ONLY with this exact JSON, no extra text:
 
 
 def get_scheduling_tip() -> str:
-    if not _openai_key_present():
+    provider = chat_provider()
+    if not provider.available():
         return _fallback_tip()
 
-    client = _get_openai_client()
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{
-                "role": "user",
-                "content": (
-                    "Give one practical, specific scheduling tip for hospital managers "
-                    "focused on staff wellbeing or emergency preparedness. "
-                    "Two sentences max. Be direct and actionable."
-                )
-            }],
-            max_tokens=80,
+        return provider.complete(
+            "Give one practical, specific scheduling tip for hospital managers "
+            "focused on staff wellbeing or emergency preparedness. "
+            "Two sentences max. Be direct and actionable.",
+            json_mode=False,
             temperature=0.7,
+            max_tokens=80,
+            rules=_fallback_tip,
         )
-        return resp.choices[0].message.content
-    except Exception as e:
-        if _is_quota_error(e):
-            return _fallback_tip()
+    except Exception:
         return _fallback_tip()
 
 
 # -----------------------------
-# ElevenLabs (Text-to-Speech)
+# Text-to-Speech
 # -----------------------------
-def _ensure_elevenlabs() -> None:
-    if not ELEVENLABS_API_KEY or ELEVENLABS_API_KEY == "your_elevenlabs_key_here":
-        raise ValueError("ELEVENLABS_API_KEY is not set in your .env file")
-    if not ELEVENLABS_VOICE_ID:
-        raise ValueError("ELEVENLABS_VOICE_ID is not set in your .env file")
-
-
 def text_to_speech_elevenlabs(
     text: str,
     voice_id: Optional[str] = None,
@@ -321,43 +383,22 @@ def text_to_speech_elevenlabs(
     stability: float = 0.4,
     similarity_boost: float = 0.8
 ) -> Dict[str, Any]:
-    _ensure_elevenlabs()
-
+    """Speech on the TTS provider (ElevenLabs unless TTS_PROVIDER says otherwise)."""
     if not text or not text.strip():
         raise ValueError("text is required for text-to-speech")
 
-    vid = voice_id or ELEVENLABS_VOICE_ID
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{vid}"
-
-    headers = {
-        "xi-api-key": ELEVENLABS_API_KEY,
-        "Content-Type": "application/json",
-        "Accept": "audio/mpeg",
-    }
-
-    payload = {
-        "text": text.strip(),
-        "model_id": model_id,
-        "voice_settings": {
-            "stability": float(stability),
-            "similarity_boost": float(similarity_boost),
-        },
-    }
-
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
-
-    if resp.status_code >= 400:
-        try:
-            err = resp.json()
-        except Exception:
-            err = {"message": resp.text}
-        raise RuntimeError(f"ElevenLabs TTS failed ({resp.status_code}): {err}")
-
-    audio_b64 = base64.b64encode(resp.content).decode("utf-8")
+    provider = tts_provider()
+    audio = provider.synthesize(
+        text.strip(),
+        voice_id=voice_id,
+        model_id=model_id,
+        stability=stability,
+        similarity_boost=similarity_boost,
+    )
     return {
-        "audio_base64": audio_b64,
-        "content_type": "audio/mpeg",
-        "voice_id": vid,
+        "audio_base64": base64.b64encode(audio).decode("utf-8"),
+        "content_type": provider.content_type,
+        "voice_id": voice_id or provider.default_voice_id,
         "model_id": model_id,
         "text": text.strip(),
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,315 @@
+"""
+MedRoster Archival
+Moves history out of the hot tables so unfiltered queries stay small:
+shifts that ended before the horizon (with their assignments) and audit rows
+older than it are appended to gzip JSONL files, one per table and month:
+
+    ARCHIVE_DIR/shifts/2025-03.jsonl.gz
+    ARCHIVE_DIR/assignments/2025-03.jsonl.gz     (month of the shift's start)
+    ARCHIVE_DIR/audit_logs/2025-03.jsonl.gz
+
+Files are append-only (each run adds a gzip member). Rows are written and
+fsynced before they are deleted, so a crash can at worst archive a row twice;
+readers dedupe on (id, timestamp), since SQLite may reuse ids once the newest
+rows have been archived. manifest.json records the archive watermark
+(`archived_before`): history reads merge the archive only for ranges before it.
+
+The weekly-load rollup keeps archived weeks; its check/rebuild only cover
+weeks after the watermark. Delta-sync change-log entries older than the
+cutoff are pruned (clients with older cursors get a full snapshot).
+
+Archival runs through POST /history/archive, inside the API process: it
+bumps the in-memory ETag counters (app.versions), which a separate process
+could not reach, so clients would get 304s for shifts it had removed.
+
+CLI (from backend/):
+    python -m app.services.archive_service status   # print the manifest
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import versions
+from app.config import ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS
+from app.models.assignment import Assignment
+from app.models.audit_log import AuditLog
+from app.models.shift import Shift
+from app.models.shift_coverage import ShiftCoverage
+from app.services import sync_service
+
+# Rows per transaction; keeps IN-lists under SQLite's default variable limit
+BATCH_SIZE = 900
+MAX_MANIFEST_RUNS = 50
+
+_lock = threading.Lock()  # one archival run at a time
+
+
+def _root() -> Path:
+    return Path(ARCHIVE_DIR)
+
+
+def _file(table: str, month: str) -> Path:
+    return _root() / table / f"{month}.jsonl.gz"
+
+
+# ── Manifest ──────────────────────────────────────────────────────────────
+
+def read_manifest() -> Dict[str, Any]:
+    path = _root() / "manifest.json"
+    if not path.exists():
+        return {"archived_before": None, "runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    _root().mkdir(parents=True, exist_ok=True)
+    tmp = _root() / "manifest.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _root() / "manifest.json")
+
+
+def archived_before() -> Optional[datetime]:
+    """Everything before this instant may live in the archive (None = nothing archived)."""
+    value = read_manifest().get("archived_before")
+    return datetime.fromisoformat(value) if value else None
+
+
+# ── Writing ───────────────────────────────────────────────────────────────
+
+def _jsonable(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+
+def _append(table: str, rows: List[Dict[str, Any]], time_key: str) -> None:
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_month.setdefault(row[time_key].strftime("%Y-%m"), []).append(row)
+    for month, month_rows in by_month.items():
+        path = _file(table, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                for row in month_rows:
+                    gz.write((json.dumps(_jsonable(row)) + "\n").encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def _archive_shifts(db: Session, cutoff: datetime) -> Dict[str, int]:
+    shifts_t, assignments_t = Shift.__table__, Assignment.__table__
+    counts = {"shifts": 0, "assignments": 0}
+    while True:
+        shifts = [
+            dict(r) for r in db.execute(
+                select(shifts_t).where(shifts_t.c.end_time < cutoff).order_by(shifts_t.c.id).limit(BATCH_SIZE)
+            ).mappings()
+        ]
+        if not shifts:
+            return counts
+        ids = [s["id"] for s in shifts]
+        starts = {s["id"]: s["start_time"] for s in shifts}
+        assignments = [
+            {**dict(r), "shift_start_time": starts[r["shift_id"]]}
+            for r in db.execute(select(assignments_t).where(assignments_t.c.shift_id.in_(ids))).mappings()
+        ]
+
+        _append("shifts", shifts, "start_time")
+        _append("assignments", assignments, "shift_start_time")
+
+        db.execute(delete(ShiftCoverage.__table__).where(ShiftCoverage.__table__.c.shift_id.in_(ids)))
+        db.execute(delete(assignments_t).where(assignments_t.c.shift_id.in_(ids)))
+        db.execute(delete(shifts_t).where(shifts_t.c.id.in_(ids)))
+        db.commit()
+        counts["shifts"] += len(shifts)
+        counts["assignments"] += len(assignments)
+
+
+def _archive_audit(db: Session, cutoff: datetime) -> int:
+    audit_t = AuditLog.__table__
+    count = 0
+    while True:
+        rows = [
+            dict(r) for r in db.execute(
+                select(audit_t).where(audit_t.c.timestamp < cutoff).order_by(audit_t.c.id).limit(BATCH_SIZE)
+            ).mappings()
+        ]
+        if not rows:
+            return count
+        _append("audit_logs", rows, "timestamp")
+        db.execute(delete(audit_t).where(audit_t.c.id.in_([r["id"] for r in rows])))
+        db.commit()
+        count += len(rows)
+
+
+def run_archival(
+    db: Session,
+    now: Optional[datetime] = None,
+    horizon_days: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Archive everything older than the horizon. Returns the counts moved."""
+    horizon = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    cutoff = (now or datetime.utcnow()) - timedelta(days=horizon)
+    with _lock:
+        # Pending audit rows go to the table first so none slip past the cutoff unarchived
+        from app.services import audit_service
+        audit_service.flush()
+
+        # Raise the watermark first: readers must look in the archive as soon as rows may be there
+        manifest = read_manifest()
+        previous = manifest.get("archived_before")
+        if previous is None or datetime.fromisoformat(previous) < cutoff:
+            manifest["archived_before"] = cutoff.isoformat()
+            _write_manifest(manifest)
+
+        counts = _archive_shifts(db, cutoff)
+        counts["audit_logs"] = _archive_audit(db, cutoff)
+        counts["change_log"] = sync_service.prune(db, cutoff)
+        db.commit()
+        versions.bump(versions.SHIFTS, versions.SHIFTS_BULK, versions.ASSIGNMENTS)
+
+        manifest["runs"] = (manifest.get("runs", []) + [
+            {"at": datetime.utcnow().isoformat(), "cutoff": cutoff.isoformat(), **counts}
+        ])[-MAX_MANIFEST_RUNS:]
+        _write_manifest(manifest)
+
+    print(f"[Archive] Archived before {cutoff.isoformat()}: {counts}")
+    return {"cutoff": cutoff.isoformat(), **counts}
+
+
+# ── Reading ───────────────────────────────────────────────────────────────
+
+def _months(start: datetime, end: datetime) -> Iterator[str]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f"{year:04d}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def read_archive(table: str, time_key: str, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+    """Archived rows of `table` with start <= time_key < end (only the overlapping month files are opened)."""
+    seen = set()
+    for month in _months(start, end):
+        path = _file(table, month)
+        if not path.exists():
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                key = (row["id"], row[time_key])
+                if key in seen:
+                    continue
+                if start <= datetime.fromisoformat(row[time_key]) < end:
+                    seen.add(key)
+                    yield row
+
+
+def _needs_archive(start: datetime) -> bool:
+    watermark = archived_before()
+    return watermark is not None and start < watermark
+
+
+def history_shifts(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    department_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Shifts starting in [start, end) with their assignments, from hot tables and the archive."""
+    query = db.query(Shift).filter(Shift.start_time >= start, Shift.start_time < end)
+    if department_id is not None:
+        query = query.filter(Shift.department_id == department_id)
+    shifts: Dict[tuple, Dict[str, Any]] = {}
+    hot_by_id: Dict[int, Dict[str, Any]] = {}
+    for s in query.all():
+        entry = {
+            "id": s.id,
+            "department_id": s.department_id,
+            "start_time": s.start_time.isoformat(),
+            "end_time": s.end_time.isoformat(),
+            "required_role": s.required_role,
+            "required_staff_count": s.required_staff_count,
+            "archived": False,
+            "assignments": [],
+        }
+        shifts[(s.id, entry["start_time"])] = hot_by_id[s.id] = entry
+    if hot_by_id:
+        for a in db.query(Assignment).filter(Assignment.shift_id.in_(hot_by_id.keys())).all():
+            hot_by_id[a.shift_id]["assignments"].append({
+                "id": a.id, "user_id": a.user_id, "is_emergency": a.is_emergency, "notes": a.notes,
+            })
+
+    if _needs_archive(start):
+        archived = {}
+        for row in read_archive("shifts", "start_time", start, end):
+            key = (row["id"], row["start_time"])
+            if key in shifts or (department_id is not None and row["department_id"] != department_id):
+                continue
+            shifts[key] = archived[key] = {**row, "archived": True, "assignments": []}
+        if archived:
+            for a in read_archive("assignments", "shift_start_time", start, end):
+                shift = archived.get((a["shift_id"], a["shift_start_time"]))
+                if shift is not None:
+                    shift["assignments"].append({
+                        "id": a["id"], "user_id": a["user_id"],
+                        "is_emergency": a["is_emergency"], "notes": a["notes"],
+                    })
+
+    return sorted(shifts.values(), key=lambda s: (s["start_time"], s["id"]))
+
+
+def history_audit_logs(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    event_type: Optional[str] = None,
+    department_id: Optional[int] = None,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    """Audit rows in [start, end), newest first, from the hot table and the archive."""
+    from app.services.audit_service import as_dict
+
+    query = db.query(AuditLog).filter(AuditLog.timestamp >= start, AuditLog.timestamp < end)
+    if event_type:
+        query = query.filter(AuditLog.event_type == event_type)
+    if department_id is not None:
+        query = query.filter(AuditLog.department_id == department_id)
+    rows = [
+        {**as_dict(r), "archived": False}
+        for r in query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit).all()
+    ]
+
+    if _needs_archive(start):
+        hot_keys = {(r["id"], r["timestamp"]) for r in rows}
+        for row in read_archive("audit_logs", "timestamp", start, end):
+            if (row["id"], row["timestamp"]) in hot_keys:
+                continue
+            if event_type and row.get("event_type") != event_type:
+                continue
+            if department_id is not None and row.get("department_id") != department_id:
+                continue
+            rows.append({**row, "archived": True})
+        rows.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+
+    return rows[:limit]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "status":
+        print(json.dumps(read_manifest(), indent=2))
+    else:
+        print("Usage: python -m app.services.archive_service status  (archive with POST /history/archive)")
+        sys.exit(2)
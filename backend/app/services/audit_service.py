@@ -0,0 +1,369 @@
+"""
+MedRoster Audit Log Writer
+Routine audit events are queued in-process and inserted by a background
+writer in one transaction per batch (every AUDIT_FLUSH_INTERVAL_MS or
+AUDIT_BATCH_SIZE rows). Compliance-critical events use durable=True and are
+added to the caller's session, so they commit atomically with the change
+they describe.
+
+The queue is flushed on shutdown (lifespan and atexit). If it grows past
+AUDIT_QUEUE_MAX, callers write inline rather than drop rows.
+
+Rows carry structured columns (event_type, department_id, target_user_id,
+details) next to the human-readable `action`. Older free-text rows are
+parsed into them at startup.
+
+CLI (from backend/):
+    python -m app.services.audit_service migrate   # add columns/indexes, parse old rows
+"""
+
+import atexit
+import base64
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, inspect, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL_MS, AUDIT_QUEUE_MAX
+from app.database import SessionLocal
+from app.models.audit_log import AuditLog
+
+_cond = threading.Condition()
+_queue: Deque[Dict[str, Any]] = deque()
+_flush_lock = threading.Lock()  # one writer at a time keeps rows in order
+_start_lock = threading.Lock()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+_stats = {
+    "enqueued_total": 0,
+    "written_total": 0,
+    "durable_total": 0,
+    "inline_total": 0,
+    "batches_total": 0,
+    "failed_batches_total": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "flush_ms_total": 0.0,
+}
+
+
+# ── Structured fields ─────────────────────────────────────────────────────
+
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def _coerce(value: str) -> Any:
+    if value in ("True", "False"):
+        return value == "True"
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_action(action: str) -> Tuple[str, Dict[str, Any]]:
+    """"RED ALERT | type=surge | department=ICU" → ("red_alert", {"type": "surge", "department": "ICU"})."""
+    head, *parts = [p.strip() for p in (action or "").split("|")]
+    event_type = _SLUG.sub("_", head.lower()).strip("_") or "unknown"
+    details = {}
+    for part in parts:
+        key, sep, value = part.partition("=")
+        if sep:
+            details[key.strip()] = _coerce(value.strip())
+    return event_type, details
+
+
+def record(
+    action: str,
+    performed_by: str,
+    db: Optional[Session] = None,
+    durable: bool = False,
+    event_type: Optional[str] = None,
+    department_id: Optional[int] = None,
+    target_user_id: Optional[int] = None,
+    details: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Record an audit event. durable=True adds the row to `db` (committed with
+    the caller's transaction); otherwise it is queued for the batch writer.
+    event_type/details default to what parse_action reads from `action`.
+    """
+    if event_type is None:
+        event_type, parsed = parse_action(action)
+        details = {**parsed, **(details or {})}
+    entry = {
+        "action": action,
+        "performed_by": performed_by,
+        "timestamp": datetime.utcnow(),
+        "event_type": event_type,
+        "department_id": department_id,
+        "target_user_id": target_user_id,
+        "details": details,
+    }
+    if durable:
+        if db is None:
+            raise ValueError("durable audit records need the caller's session")
+        db.add(AuditLog(**entry))
+        with _cond:
+            _stats["durable_total"] += 1
+        return
+
+    _ensure_started()
+    with _cond:
+        if len(_queue) < AUDIT_QUEUE_MAX:
+            _queue.append(entry)
+            _stats["enqueued_total"] += 1
+            if len(_queue) >= AUDIT_BATCH_SIZE:
+                _cond.notify()
+            return
+        _stats["inline_total"] += 1
+
+    # Queue full (writer stalled or falling behind): drain it here, then write ours
+    flush()
+    _write([entry])
+
+
+def _write(batch: List[Dict[str, Any]]) -> None:
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        db.execute(insert(AuditLog), batch)
+        db.commit()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _cond:
+        _stats["written_total"] += len(batch)
+        _stats["batches_total"] += 1
+        _stats["last_flush_ms"] = round(elapsed_ms, 3)
+        _stats["max_flush_ms"] = round(max(_stats["max_flush_ms"], elapsed_ms), 3)
+        _stats["flush_ms_total"] += elapsed_ms
+
+
+def flush() -> int:
+    """Write everything queued so far. Returns rows written; failed batches stay queued."""
+    written = 0
+    with _flush_lock:
+        while True:
+            with _cond:
+                batch = [_queue.popleft() for _ in range(min(len(_queue), AUDIT_BATCH_SIZE))]
+            if not batch:
+                return written
+            try:
+                _write(batch)
+            except Exception as e:
+                print(f"[Audit] Flush of {len(batch)} rows failed, will retry: {e}")
+                with _cond:
+                    _queue.extendleft(reversed(batch))
+                    _stats["failed_batches_total"] += 1
+                return written
+            written += len(batch)
+
+
+def audit_stats() -> Dict[str, Any]:
+    with _cond:
+        stats = dict(_stats)
+        stats["queue_depth"] = len(_queue)
+    total_ms = stats.pop("flush_ms_total")
+    stats["avg_flush_ms"] = round(total_ms / stats["batches_total"], 3) if stats["batches_total"] else 0.0
+    stats["writer_running"] = bool(_thread and _thread.is_alive())
+    return stats
+
+
+def _run() -> None:
+    interval = AUDIT_FLUSH_INTERVAL_MS / 1000.0
+    while not _stop.is_set():
+        with _cond:
+            _cond.wait_for(lambda: len(_queue) >= AUDIT_BATCH_SIZE or _stop.is_set(), timeout=interval)
+        flush()
+
+
+def _ensure_started() -> None:
+    if _thread is None or not _thread.is_alive():
+        start()
+
+
+def start() -> None:
+    global _thread
+    with _start_lock:
+        if _thread and _thread.is_alive():
+            return
+        _stop.clear()
+        _thread = threading.Thread(target=_run, name="audit-writer", daemon=True)
+        _thread.start()
+
+
+def stop() -> None:
+    """Stop the writer and flush whatever is still queued."""
+    _stop.set()
+    with _cond:
+        _cond.notify_all()
+    if _thread:
+        _thread.join(timeout=5)
+    flush()
+
+
+atexit.register(flush)
+
+
+# ── Querying ──────────────────────────────────────────────────────────────
+
+def as_dict(log: AuditLog) -> Dict[str, Any]:
+    return {
+        "id": log.id,
+        "action": log.action,
+        "performed_by": log.performed_by,
+        "timestamp": log.timestamp.isoformat(),
+        "event_type": log.event_type,
+        "department_id": log.department_id,
+        "target_user_id": log.target_user_id,
+        "details": log.details,
+    }
+
+
+def _encode_cursor(log: AuditLog) -> str:
+    raw = json.dumps([log.timestamp.isoformat(), log.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError on anything that is not a cursor we issued."""
+    try:
+        ts, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(ts), int(log_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def search(
+    db: Session,
+    event_type: Optional[str] = None,
+    department_id: Optional[int] = None,
+    target_user_id: Optional[int] = None,
+    performed_by: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Newest-first keyset pagination over (timestamp, id). Each page is one
+    index range scan, however deep into history the cursor is.
+    """
+    query = db.query(AuditLog)
+    if event_type:
+        query = query.filter(AuditLog.event_type == event_type)
+    if department_id is not None:
+        query = query.filter(AuditLog.department_id == department_id)
+    if target_user_id is not None:
+        query = query.filter(AuditLog.target_user_id == target_user_id)
+    if performed_by:
+        query = query.filter(AuditLog.performed_by == performed_by)
+    if since:
+        query = query.filter(AuditLog.timestamp >= since)
+    if until:
+        query = query.filter(AuditLog.timestamp < until)
+    if cursor:
+        query = query.filter(tuple_(AuditLog.timestamp, AuditLog.id) < _decode_cursor(cursor))
+
+    rows = (
+        query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    page = rows[:limit]
+    return {
+        "items": [as_dict(r) for r in page],
+        "next_cursor": _encode_cursor(page[-1]) if len(rows) > limit else None,
+    }
+
+
+# ── Migration of free-text rows ───────────────────────────────────────────
+
+_STRUCTURED_COLUMNS = ("event_type", "department_id", "target_user_id", "details")
+
+
+def migrate_structured_columns(engine: Engine) -> None:
+    """Add the structured columns and indexes to an audit_logs table that predates them."""
+    existing = {c["name"] for c in inspect(engine).get_columns("audit_logs")}
+    table = AuditLog.__table__
+    with engine.begin() as conn:
+        for name in _STRUCTURED_COLUMNS:
+            if name not in existing:
+                col_type = table.c[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE audit_logs ADD COLUMN {name} {col_type}"))
+                print(f"[Audit] Added column audit_logs.{name}")
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def backfill_structured(db: Session, batch_size: int = 5000) -> int:
+    """Parse free-text rows (event_type IS NULL) into the structured columns. Returns rows updated."""
+    from app.models.department import Department
+    from app.models.shift import Shift
+    from app.models.user import User
+
+    # Runs on every start; record() always fills event_type, so this is normally a no-op
+    if db.query(AuditLog.id).filter(AuditLog.event_type.is_(None)).first() is None:
+        return 0
+
+    departments = {name: dept_id for dept_id, name in db.query(Department.id, Department.name)}
+    user_ids: Dict[str, Optional[int]] = {}
+    for user_id, name in db.query(User.id, User.name):
+        user_ids[name] = None if name in user_ids else user_id  # ambiguous names stay unresolved
+    shift_departments = dict(db.query(Shift.id, Shift.department_id))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(AuditLog.id, AuditLog.action)
+            .filter(AuditLog.event_type.is_(None), AuditLog.id > last_id)
+            .order_by(AuditLog.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        changes = []
+        for log_id, action in rows:
+            event_type, details = parse_action(action)
+            dept_id = departments.get(str(details.get("department", "")))
+            if dept_id is None and isinstance(details.get("shift"), int):
+                dept_id = shift_departments.get(details["shift"])
+            changes.append({
+                "id": log_id,
+                "event_type": event_type,
+                "department_id": dept_id,
+                "target_user_id": user_ids.get(str(details.get("user", ""))),
+                "details": details,
+            })
+        db.execute(update(AuditLog), changes)
+        db.commit()
+        updated += len(changes)
+        last_id = rows[-1].id
+    if updated:
+        print(f"[Audit] Parsed {updated} free-text audit rows into structured columns")
+    return updated
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+    import app.models  # noqa: F401  (register tables)
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command != "migrate":
+        print("Usage: python -m app.services.audit_service migrate")
+        sys.exit(2)
+    Base.metadata.create_all(bind=engine)
+    migrate_structured_columns(engine)
+    with SessionLocal() as db:
+        print(f"[Audit] {backfill_structured(db)} rows migrated")
@@ -0,0 +1,269 @@
+"""
+MedRoster Broadcast Acknowledgements
+An emergency broadcast targets staff by role. The recipient set is resolved
+in one query and written as one receipt row per recipient (a single
+executemany); recipients are pushed the broadcast on their live-update
+topic. Devices report delivery and staff acknowledge, singly or in bulk;
+each batch is one upsert statement that keeps the first delivery/ack time.
+
+Ack counts are served from an in-memory tally per broadcast (the ids still
+awaiting delivery and acknowledgement), updated as acks are written, so
+dashboards polling the ack rate never re-count receipt rows. A tally is
+loaded from the receipts once per process when first needed; the most
+recent TALLY_CACHE_SIZE broadcasts are kept.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models.broadcast import Broadcast
+from app.models.broadcast_receipt import BroadcastReceipt
+from app.models.user import User
+from app.services import event_bus
+
+ALL_STAFF = "all"
+STATUSES = ("delivered", "acknowledged")
+TALLY_CACHE_SIZE = 200
+
+
+class _Tally:
+    """Live counts for one broadcast; mutate only under _lock."""
+
+    __slots__ = ("recipients", "total", "undelivered", "unacked", "first_ack_at", "last_ack_at")
+
+    def __init__(self, recipients: Set[int], undelivered: Set[int], unacked: Set[int]):
+        self.recipients = recipients
+        self.total = len(recipients)
+        self.undelivered = undelivered
+        self.unacked = unacked
+        self.first_ack_at: Optional[datetime] = None
+        self.last_ack_at: Optional[datetime] = None
+
+    def counts(self) -> Dict[str, Any]:
+        acknowledged = self.total - len(self.unacked)
+        return {
+            "recipients": self.total,
+            "delivered": self.total - len(self.undelivered),
+            "acknowledged": acknowledged,
+            "pending": len(self.unacked),
+            "ack_rate": round(acknowledged / self.total, 4) if self.total else 0.0,
+            "first_ack_at": self.first_ack_at.isoformat() if self.first_ack_at else None,
+            "last_ack_at": self.last_ack_at.isoformat() if self.last_ack_at else None,
+        }
+
+
+_lock = threading.Lock()
+_tallies: "OrderedDict[int, _Tally]" = OrderedDict()
+
+
+def _remember(broadcast_id: int, tally: _Tally) -> None:
+    """Called with _lock held."""
+    _tallies[broadcast_id] = tally
+    _tallies.move_to_end(broadcast_id)
+    while len(_tallies) > TALLY_CACHE_SIZE:
+        _tallies.popitem(last=False)
+
+
+def _tally(db: Session, broadcast_id: int) -> Optional[_Tally]:
+    with _lock:
+        tally = _tallies.get(broadcast_id)
+        if tally is not None:
+            _tallies.move_to_end(broadcast_id)
+            return tally
+
+    rows = db.execute(
+        select(BroadcastReceipt.user_id, BroadcastReceipt.delivered_at, BroadcastReceipt.acknowledged_at)
+        .where(BroadcastReceipt.broadcast_id == broadcast_id)
+    ).all()
+    if not rows and db.get(Broadcast, broadcast_id) is None:
+        return None
+    tally = _Tally(
+        recipients={r.user_id for r in rows},
+        undelivered={r.user_id for r in rows if r.delivered_at is None},
+        unacked={r.user_id for r in rows if r.acknowledged_at is None},
+    )
+    acked = [r.acknowledged_at for r in rows if r.acknowledged_at is not None]
+    if acked:
+        tally.first_ack_at, tally.last_ack_at = min(acked), max(acked)
+    with _lock:
+        # Another request may have loaded it meanwhile; keep whichever got there first
+        existing = _tallies.get(broadcast_id)
+        if existing is not None:
+            return existing
+        _remember(broadcast_id, tally)
+    return tally
+
+
+# ── Creating ──────────────────────────────────────────────────────────────
+
+def resolve_recipients(db: Session, target_roles: List[str]) -> List[int]:
+    """Active staff holding any of the roles ("all" = every active user), in one query."""
+    query = select(User.id).where(User.is_active == True)  # noqa: E712
+    if ALL_STAFF not in target_roles:
+        query = query.where(User.role.in_(target_roles))
+    return list(db.scalars(query))
+
+
+def create_broadcast(
+    db: Session,
+    message: str,
+    severity: str,
+    target_roles: List[str],
+    created_by: str,
+    auto_repeat: bool = False,
+) -> Tuple[Broadcast, List[int]]:
+    """Register the broadcast with one receipt per recipient. Commits; returns (broadcast, recipient ids)."""
+    recipients = resolve_recipients(db, target_roles)
+    broadcast = Broadcast(
+        message=message,
+        severity=severity,
+        target_roles=target_roles,
+        auto_repeat=auto_repeat,
+        created_by=created_by,
+        recipient_count=len(recipients),
+    )
+    db.add(broadcast)
+    db.flush()
+    if recipients:
+        db.execute(insert(BroadcastReceipt), [
+            {"broadcast_id": broadcast.id, "user_id": user_id} for user_id in recipients
+        ])
+    db.commit()
+
+    with _lock:
+        _remember(broadcast.id, _Tally(set(recipients), set(recipients), set(recipients)))
+
+    event_bus.publish(
+        [event_bus.EMERGENCY] + [event_bus.user_topic(user_id) for user_id in recipients],
+        "broadcast.created",
+        {
+            "broadcast_id": broadcast.id,
+            "severity": severity,
+            "message": message,
+            "target_roles": target_roles,
+            "ack_url": f"/emergency/broadcasts/{broadcast.id}/ack",
+        },
+    )
+    return broadcast, recipients
+
+
+# ── Acknowledging ─────────────────────────────────────────────────────────
+
+def record_acks(db: Session, acks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Write a batch of {"broadcast_id", "user_id", "status", "at"?} in one
+    upsert (first delivery/ack time wins; an ack implies delivery). Acks for
+    unknown broadcasts or non-recipients are rejected; repeats are no-ops.
+    Commits. Returns accepted/duplicate/rejected counts.
+    """
+    now = datetime.utcnow()
+    rows: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    rejected: List[Dict[str, Any]] = []
+    duplicates = 0
+    tallies: Dict[int, Optional[_Tally]] = {}
+
+    for ack in acks:
+        broadcast_id, user_id, status = ack["broadcast_id"], ack["user_id"], ack["status"]
+        at = ack.get("at") or now
+        if broadcast_id not in tallies:
+            tallies[broadcast_id] = _tally(db, broadcast_id)
+        tally = tallies[broadcast_id]
+        if tally is None:
+            rejected.append({**ack, "reason": "unknown broadcast"})
+            continue
+        with _lock:
+            is_recipient = user_id in tally.recipients
+            pending = user_id in (tally.unacked if status == "acknowledged" else tally.undelivered)
+        if not is_recipient:
+            rejected.append({**ack, "reason": "not a recipient"})
+            continue
+        if not pending:
+            duplicates += 1
+            continue
+        row = rows.setdefault((broadcast_id, user_id), {
+            "broadcast_id": broadcast_id, "user_id": user_id, "delivered_at": None, "acknowledged_at": None,
+        })
+        row["delivered_at"] = min(filter(None, [row["delivered_at"], at]))
+        if status == "acknowledged":
+            row["acknowledged_at"] = min(filter(None, [row["acknowledged_at"], at]))
+
+    if rows:
+        stmt = upsert_insert(db)(BroadcastReceipt)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["broadcast_id", "user_id"],
+            set_={
+                "delivered_at": func.coalesce(BroadcastReceipt.delivered_at, stmt.excluded.delivered_at),
+                "acknowledged_at": func.coalesce(BroadcastReceipt.acknowledged_at, stmt.excluded.acknowledged_at),
+            },
+        )
+        db.execute(stmt, list(rows.values()))
+        db.commit()
+
+        # Counts move only after the rows are durable
+        with _lock:
+            for (broadcast_id, user_id), row in rows.items():
+                tally = tallies[broadcast_id]
+                tally.undelivered.discard(user_id)
+                if row["acknowledged_at"] is not None and user_id in tally.unacked:
+                    tally.unacked.discard(user_id)
+                    at = row["acknowledged_at"]
+                    if tally.first_ack_at is None or at < tally.first_ack_at:
+                        tally.first_ack_at = at
+                    if tally.last_ack_at is None or at > tally.last_ack_at:
+                        tally.last_ack_at = at
+
+    return {"accepted": len(rows), "duplicates": duplicates, "rejected": rejected}
+
+
+# ── Reading ───────────────────────────────────────────────────────────────
+
+def ack_counts(db: Session, broadcast_id: int) -> Optional[Dict[str, Any]]:
+    """Live counts from the in-memory tally (None if the broadcast does not exist)."""
+    tally = _tally(db, broadcast_id)
+    if tally is None:
+        return None
+    with _lock:
+        return tally.counts()
+
+
+def as_dict(broadcast: Broadcast) -> Dict[str, Any]:
+    return {
+        "id": broadcast.id,
+        "message": broadcast.message,
+        "severity": broadcast.severity,
+        "target_roles": broadcast.target_roles,
+        "auto_repeat": broadcast.auto_repeat,
+        "created_by": broadcast.created_by,
+        "created_at": broadcast.created_at.isoformat(),
+        "recipient_count": broadcast.recipient_count,
+    }
+
+
+def list_receipts(db: Session, broadcast_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Recipients with names and delivery/ack times; status = pending | acknowledged."""
+    query = (
+        select(User.id, User.name, User.role, BroadcastReceipt.delivered_at, BroadcastReceipt.acknowledged_at)
+        .join(User, User.id == BroadcastReceipt.user_id)
+        .where(BroadcastReceipt.broadcast_id == broadcast_id)
+        .order_by(User.name)
+    )
+    if status == "pending":
+        query = query.where(BroadcastReceipt.acknowledged_at.is_(None))
+    elif status == "acknowledged":
+        query = query.where(BroadcastReceipt.acknowledged_at.is_not(None))
+    return [
+        {
+            "user_id": r.id,
+            "name": r.name,
+            "role": r.role,
+            "delivered_at": r.delivered_at.isoformat() if r.delivered_at else None,
+            "acknowledged_at": r.acknowledged_at.isoformat() if r.acknowledged_at else None,
+        }
+        for r in db.execute(query)
+    ]
@@ -0,0 +1,276 @@
+"""
+MedRoster Coverage-Gap Index
+`shift_coverage` mirrors every shift with its required and assigned staff
+counts, updated in the same transaction as each assignment write, so
+under-staffed shifts can be listed per department and time window with one
+indexed query instead of joining and counting assignments.
+
+CLI (from backend/):
+    python -m app.services.coverage_service rebuild
+    python -m app.services.coverage_service check
+"""
+
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, case, func
+from sqlalchemy.orm import Session
+
+from app.models.assignment import Assignment
+from app.models.shift import Shift
+from app.models.shift_coverage import ShiftCoverage
+
+# Red Alert looks this far ahead for the shift to reinforce
+IMMINENT_HOURS = 12
+
+
+def add_shift(db: Session, shift: Shift) -> None:
+    """Index a new shift (must be flushed so it has an id)."""
+    required = shift.required_staff_count or 1
+    db.add(ShiftCoverage(
+        shift_id=shift.id,
+        department_id=shift.department_id,
+        start_time=shift.start_time,
+        end_time=shift.end_time,
+        required_role=shift.required_role,
+        required_count=required,
+        assigned_count=0,
+        open_slots=required,
+    ))
+
+
+def remove_shift(db: Session, shift_id: int) -> None:
+    db.query(ShiftCoverage).filter(ShiftCoverage.shift_id == shift_id).delete(synchronize_session=False)
+
+
+_coverage = ShiftCoverage.__table__
+_APPLY_DELTA = (
+    _coverage.update()
+    .where(_coverage.c.shift_id == bindparam("b_shift_id"))
+    .values(
+        assigned_count=_coverage.c.assigned_count + bindparam("b_delta"),
+        open_slots=_coverage.c.open_slots - bindparam("b_delta"),
+    )
+)
+
+
+def apply_assignment(db: Session, shift_id: int, delta: int = 1) -> None:
+    """Atomic +/- on the shift's assigned count; no commit."""
+    apply_assignments(db, [shift_id], delta)
+
+
+def apply_assignments(db: Session, shift_ids: List[int], delta: int = 1) -> None:
+    """Batch form: one executemany UPDATE covering every affected shift."""
+    counts = Counter(shift_ids)
+    if counts:
+        db.execute(_APPLY_DELTA, [
+            {"b_shift_id": shift_id, "b_delta": n * delta} for shift_id, n in counts.items()
+        ])
+
+
+def list_target_shifts(
+    db: Session,
+    department_id: int,
+    now: Optional[datetime] = None,
+    horizon_hours: int = IMMINENT_HOURS,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Imminent under-staffed shifts of a department, most open slots first (one query)."""
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(ShiftCoverage)
+        .filter(
+            ShiftCoverage.department_id == department_id,
+            ShiftCoverage.end_time >= now,
+            ShiftCoverage.start_time <= now + timedelta(hours=horizon_hours),
+            ShiftCoverage.open_slots > 0,
+        )
+        .order_by(ShiftCoverage.open_slots.desc(), ShiftCoverage.start_time)
+        .limit(limit)
+        .all()
+    )
+    return [_as_dict(r) for r in rows]
+
+
+def _as_dict(row: ShiftCoverage) -> Dict[str, Any]:
+    return {
+        "shift_id": row.shift_id,
+        "department_id": row.department_id,
+        "start_time": row.start_time.isoformat(),
+        "end_time": row.end_time.isoformat(),
+        "required_role": row.required_role,
+        "required_count": row.required_count,
+        "assigned_count": row.assigned_count,
+        "open_slots": max(row.open_slots, 0),
+    }
+
+
+def list_open_slots(
+    db: Session,
+    department_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 200,
+) -> List[Dict[str, Any]]:
+    """Under-staffed shifts overlapping [start, end), earliest first."""
+    q = db.query(ShiftCoverage).filter(ShiftCoverage.open_slots > 0)
+    if department_id is not None:
+        q = q.filter(ShiftCoverage.department_id == department_id)
+    if start is not None:
+        q = q.filter(ShiftCoverage.end_time > start)
+    if end is not None:
+        q = q.filter(ShiftCoverage.start_time < end)
+    rows = q.order_by(ShiftCoverage.start_time, ShiftCoverage.shift_id).limit(limit).all()
+    return [_as_dict(r) for r in rows]
+
+
+def pick_target_shift(
+    db: Session,
+    department_id: int,
+    now: Optional[datetime] = None,
+    horizon_hours: int = IMMINENT_HOURS,
+) -> Optional[int]:
+    """
+    Shift id for Red Alert to reinforce: the most under-staffed shift that is
+    running now or starts within horizon_hours (ties → earliest). Falls back
+    to the next current/upcoming shift when nothing imminent has open slots.
+    """
+    now = now or datetime.utcnow()
+    base = db.query(ShiftCoverage.shift_id).filter(
+        ShiftCoverage.department_id == department_id,
+        ShiftCoverage.end_time >= now,
+    )
+    row = (
+        base.filter(
+            ShiftCoverage.start_time <= now + timedelta(hours=horizon_hours),
+            ShiftCoverage.open_slots > 0,
+        )
+        .order_by(ShiftCoverage.open_slots.desc(), ShiftCoverage.start_time)
+        .first()
+    )
+    if row is None:
+        row = base.order_by(ShiftCoverage.start_time).first()
+    return row[0] if row else None
+
+
+def _coverage_columns():
+    filled = case(
+        (ShiftCoverage.assigned_count < ShiftCoverage.required_count, ShiftCoverage.assigned_count),
+        else_=ShiftCoverage.required_count,
+    )
+    open_slots = case((ShiftCoverage.open_slots > 0, ShiftCoverage.open_slots), else_=0)
+    return (
+        func.coalesce(func.sum(ShiftCoverage.required_count), 0),
+        func.coalesce(func.sum(filled), 0),
+        func.coalesce(func.sum(open_slots), 0),
+    )
+
+
+def _window(q, start: Optional[datetime], end: Optional[datetime]):
+    if start is not None:
+        q = q.filter(ShiftCoverage.end_time > start)
+    if end is not None:
+        q = q.filter(ShiftCoverage.start_time < end)
+    return q
+
+
+def _coverage_dict(required, filled, open_slots) -> Dict[str, int]:
+    pct = int(filled * 100 / required) if required else 0
+    return {"required": int(required), "filled": int(filled), "open_slots": int(open_slots), "coverage_pct": pct}
+
+
+def department_coverage(
+    db: Session,
+    department_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Filled vs. required slots for a department's shifts in a window (one aggregate)."""
+    q = db.query(*_coverage_columns()).filter(ShiftCoverage.department_id == department_id)
+    return _coverage_dict(*_window(q, start, end).one())
+
+
+def coverage_by_department(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[int, Dict[str, int]]:
+    """department_coverage for every department with shifts in the window, in one GROUP BY."""
+    q = db.query(ShiftCoverage.department_id, *_coverage_columns()).group_by(ShiftCoverage.department_id)
+    return {row[0]: _coverage_dict(*row[1:]) for row in _window(q, start, end).all()}
+
+
+def rebuild_coverage(db: Session) -> int:
+    """Backfill the index from shifts + assignments in one transaction."""
+    counts = dict(
+        db.query(Assignment.shift_id, func.count(Assignment.id))
+        .group_by(Assignment.shift_id)
+        .all()
+    )
+    db.query(ShiftCoverage).delete(synchronize_session=False)
+    rows = []
+    for shift in db.query(Shift).yield_per(5000):
+        required = shift.required_staff_count or 1
+        assigned = counts.get(shift.id, 0)
+        rows.append({
+            "shift_id": shift.id,
+            "department_id": shift.department_id,
+            "start_time": shift.start_time,
+            "end_time": shift.end_time,
+            "required_role": shift.required_role,
+            "required_count": required,
+            "assigned_count": assigned,
+            "open_slots": required - assigned,
+        })
+    db.bulk_insert_mappings(ShiftCoverage, rows)
+    db.commit()
+    return len(rows)
+
+
+def check_coverage(db: Session) -> List[Dict[str, Any]]:
+    """Shifts whose indexed counts disagree with the base tables. Empty list = consistent."""
+    counts = dict(
+        db.query(Assignment.shift_id, func.count(Assignment.id))
+        .group_by(Assignment.shift_id)
+        .all()
+    )
+    indexed = {r.shift_id: r for r in db.query(ShiftCoverage).all()}
+    mismatches = []
+    for shift in db.query(Shift).yield_per(5000):
+        row = indexed.pop(shift.id, None)
+        expected = counts.get(shift.id, 0)
+        required = shift.required_staff_count or 1
+        if row is None or row.assigned_count != expected or row.open_slots != required - expected:
+            mismatches.append({
+                "shift_id": shift.id,
+                "expected_assigned": expected,
+                "indexed_assigned": row.assigned_count if row else None,
+            })
+    for shift_id, row in indexed.items():
+        mismatches.append({"shift_id": shift_id, "expected_assigned": None, "indexed_assigned": row.assigned_count})
+    return mismatches
+
+
+if __name__ == "__main__":
+    from app.database import Base, SessionLocal, engine
+    import app.models  # noqa: F401  (register tables)
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"[Coverage] Indexed {rebuild_coverage(db)} shifts")
+        elif command == "check":
+            mismatches = check_coverage(db)
+            for m in mismatches:
+                print(f"[Coverage] Drift: {m}")
+            print(f"[Coverage] {len(mismatches)} mismatched shifts")
+            sys.exit(1 if mismatches else 0)
+        else:
+            print("Usage: python -m app.services.coverage_service [rebuild|check]")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -1,37 +1,226 @@
 """
 MedRoster Emergency Service
 Full Red Alert orchestration:
-  1. Query live staffing state
-  2. Call GPT-4o for reallocation plan
-  3. Broadcast ElevenLabs voice alert
+  1. Read the warm-standby plan (or query live staffing state)
+  2. Call GPT-4o to refine the reallocation plan
+  3. Broadcast ElevenLabs voice alert (rendered in the background)
   4. Update DB assignments
-  5. Notify affected staff
-  6. Write compliance audit log
+  5. Write compliance audit log (same commit as the assignments)
+  6. Queue notifications to affected staff
+
+Each stage is a tracing span (see trigger_red_alert) and is published to
+the `emergency` and department live-update topics.
 
 Target: <3 minutes from trigger to full coverage.
 """
 
 from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app import tracing
 from app.models.user import User
 from app.models.shift import Shift
 from app.models.assignment import Assignment
 from app.models.department import Department
-from app.models.audit_log import AuditLog
 from app.services.ai_service import generate_emergency_reallocation_plan
 from app.services.notification_service import broadcast_emergency_alert, notify_shift_change
+from app.services import audit_service, event_bus, roster_hooks, standby_service
+from app.services.coverage_service import list_target_shifts
+from app.services.safety_service import check_assignments, get_policy
+from app.services.staff_resolver import StaffIndex
+
+
+def build_staffing_snapshot(db: Session, now: datetime) -> tuple:
+    """
+    Split active staff into on-duty (assigned to a shift running at `now`)
+    and off-duty lists. Two queries regardless of staff count.
+    """
+    active_rows = (
+        db.query(Assignment.user_id, Assignment.shift_id, Shift.department_id, Department.name)
+        .join(Shift, Assignment.shift_id == Shift.id)
+        .join(Department, Shift.department_id == Department.id, isouter=True)
+        .filter(Shift.start_time <= now, Shift.end_time >= now)
+        .all()
+    )
+    current = {}
+    for user_id, shift_id, dept_id, dept_name in active_rows:
+        current.setdefault(user_id, (shift_id, dept_id, dept_name or "Unknown"))
+
+    on_duty = []
+    off_duty = []
+    users = (
+        db.query(User.id, User.name, User.role, User.department_id)
+        .filter(User.is_active == True)
+        .order_by(User.id)
+        .all()
+    )
+    for user in users:
+        entry = {
+            "id": user.id,
+            "name": user.name,
+            "role": user.role,
+            "department_id": user.department_id
+        }
+        if user.id in current:
+            (
+                entry["current_shift_id"],
+                entry["current_department_id"],
+                entry["current_department"],
+            ) = current[user.id]
+            on_duty.append(entry)
+        else:
+            off_duty.append(entry)
+    return on_duty, off_duty
+
+
+def execute_reassignments(
+    db: Session,
+    reassignments: List[Dict[str, Any]],
+    on_duty: List[Dict[str, Any]],
+    department_id: int,
+    department_name: str,
+    emergency_type: str,
+    now: datetime,
+    fallback_target_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Turn plan reassignments into emergency assignments with a fixed number of
+    queries: names resolve through in-memory indexes, target shifts and
+    existing assignments are prefetched once, Safety Mode is checked per
+    target shift in one pass and rows are inserted in one batch.
+    Does not commit; notifications are returned for the caller to send after commit.
+    """
+    result = {"created": [], "blocked_by_safety": [], "unresolved": [], "notifications": []}
+
+    # Resolve names → staff (dedupe: the model sometimes repeats people)
+    index = StaffIndex(on_duty)
+    chosen: List[Dict[str, Any]] = []
+    seen = set()
+    for item in reassignments:
+        staff, how = index.resolve(item.get("staff_name"), item.get("staff_id"))
+        if staff is None:
+            result["unresolved"].append({"staff_name": item.get("staff_name"), "reason": how})
+            continue
+        if staff["id"] in seen:
+            continue
+        seen.add(staff["id"])
+        chosen.append({**staff, "matched_by": how})
+    if not chosen:
+        return result
+
+    # Target shifts: imminent under-staffed shifts, most open slots first
+    targets = list_target_shifts(db, department_id, now)
+    if not targets and fallback_target_id:
+        targets = [{"shift_id": fallback_target_id, "open_slots": 0}]
+    if not targets:
+        return result
+    remaining = {t["shift_id"]: t["open_slots"] for t in targets}
+    shifts = {s.id: s for s in db.query(Shift).filter(Shift.id.in_(remaining.keys())).all()}
+    order = [t["shift_id"] for t in targets if t["shift_id"] in shifts]
+    if not order:
+        return result
+
+    existing = set(
+        db.query(Assignment.user_id, Assignment.shift_id)
+        .filter(
+            Assignment.user_id.in_([s["id"] for s in chosen]),
+            Assignment.shift_id.in_(order),
+        )
+        .all()
+    )
+
+    # Fill the biggest gaps first; once every target is full, spread the rest evenly
+    by_shift: Dict[int, List[Dict[str, Any]]] = {}
+    for staff in chosen:
+        options = [sid for sid in order if (staff["id"], sid) not in existing]
+        if not options:
+            continue
+        shift_id = max(options, key=lambda sid: (remaining[sid], -order.index(sid)))
+        remaining[shift_id] -= 1
+        by_shift.setdefault(shift_id, []).append(staff)
+
+    policy = get_policy(db)
+    new_rows = []
+    for shift_id, staff_list in by_shift.items():
+        shift = shifts[shift_id]
+        safety = check_assignments(db, [s["id"] for s in staff_list], shift, policy)
+        for staff in staff_list:
+            verdict = safety.get(staff["id"])
+            if verdict and verdict["blocked"]:
+                result["blocked_by_safety"].append({"staff_name": staff["name"], **verdict})
+                continue
+
+            new_rows.append({
+                "user_id": staff["id"],
+                "shift_id": shift_id,
+                "is_emergency": True,
+                "notes": f"Emergency reallocation: {emergency_type}"
+            })
+            result["notifications"].append({
+                "staff_id": staff["id"],
+                "staff_name": staff["name"],
+                "old_assignment": staff.get("current_department", "Previous assignment"),
+                "new_assignment": department_name,
+                "reason": f"EMERGENCY: {emergency_type}",
+            })
+            result["created"].append({
+                "staff_name": staff["name"],
+                "role": staff["role"],
+                "to_department": department_name,
+                "shift_id": shift_id,
+                "matched_by": staff["matched_by"],
+            })
+
+    if new_rows:
+        # Core executemany: no per-row RETURNING round trips
+        db.execute(insert(Assignment), new_rows)
+        roster_hooks.assignments_added(
+            db, [(r["user_id"], shifts[r["shift_id"]]) for r in new_rows], is_emergency=True
+        )
+    return result
+
+
+def _publish_stage(department_id: int, event: str, data: dict) -> None:
+    event_bus.publish([event_bus.EMERGENCY, event_bus.department_topic(department_id)], event,
+                      {"department_id": department_id, **data})
 
 
 def trigger_red_alert(
     db: Session,
     emergency_type: str,
     affected_department_id: int,
-    triggered_by: str
+    triggered_by: str,
+    refine_with_ai: bool = True
 ) -> dict:
     """
     Main Red Alert pipeline. Called from the emergency router.
+    With refine_with_ai=False the precomputed standby plan is executed as-is.
+    Each stage is a span of one trace (app.tracing): the trace is stored with
+    the audit record, returned as `trace`, and exported if configured.
     """
+    with tracing.start_trace(
+        "red_alert", emergency_type=emergency_type, department_id=affected_department_id,
+        refine_with_ai=refine_with_ai,
+    ) as trace:
+        result = _run_red_alert(db, trace, emergency_type, affected_department_id, triggered_by, refine_with_ai)
+        if "error" in result:
+            trace.root.error = result["error"]
+    if "error" not in result:
+        result["trace"] = trace.summary()
+    return result
+
+
+def _run_red_alert(
+    db: Session,
+    trace: tracing.Trace,
+    emergency_type: str,
+    affected_department_id: int,
+    triggered_by: str,
+    refine_with_ai: bool,
+) -> dict:
     started_at = datetime.utcnow()
 
     # ── 1. Get affected department name ──────────────────────────────────
@@ -39,158 +228,140 @@ def trigger_red_alert(
     if not dept:
         return {"error": f"Department {affected_department_id} not found"}
     dept_name = dept.name
+    trace.root.set(department=dept_name)
+    _publish_stage(affected_department_id, "red_alert.triggered", {
+        "emergency_type": emergency_type,
+        "department": dept_name,
+        "triggered_by": triggered_by,
+    })
 
-    # ── 2. Build staffing snapshot ────────────────────────────────────────
-    now = datetime.utcnow()
-    all_users = db.query(User).filter(User.is_active == True).all()
-
-    on_duty = []
-    off_duty = []
+    # ── 2. Staffing snapshot: warm-standby plan, or build it now ──────────
+    with tracing.span("snapshot") as stage:
+        now = datetime.utcnow()
+        standby = standby_service.get_plan(affected_department_id)
+        plan_source = "standby"
+        if standby is None:
+            plan_source = "live"
+            standby = standby_service.compute_plans(db, now, [affected_department_id])[affected_department_id]
+        on_duty, off_duty = standby["on_duty"], standby["off_duty"]
+        standby_plan = standby_service.reallocation_plan(standby, emergency_type)
+        stage.set(plan_source=plan_source, on_duty_count=len(on_duty), off_duty_count=len(off_duty),
+                  reassignable_count=len(standby["reassignable"]), call_in_count=len(standby["call_in"]))
 
-    for user in all_users:
-        active_assignment = (
-            db.query(Assignment)
-            .join(Shift)
-            .filter(
-                Assignment.user_id == user.id,
-                Shift.start_time <= now,
-                Shift.end_time >= now
-            )
-            .first()
-            
-        )
+    # ── 3. AI refines the reallocation plan ───────────────────────────────
+    with tracing.span("plan", refine_with_ai=refine_with_ai) as stage:
+        try:
+            if refine_with_ai:
+                ai_plan = generate_emergency_reallocation_plan(
+                    emergency_type=emergency_type,
+                    affected_department=dept_name,
+                    on_duty_staff=standby["reassignable"],
+                    off_duty_staff=standby["call_in"],
+                    fallback_plan=standby_plan
+                )
+            else:
+                ai_plan = standby_plan
+        except ValueError as e:
+            # OpenAI key not set — return a mock plan so the app still works
+            stage.set(fallback=str(e))
+            ai_plan = {
+                "immediate_reassignments": [],
+                "call_in_requests": [],
+                "estimated_coverage_minutes": 0,
+                "critical_warning": str(e),
+                "voice_announcement": (
+                    f"Emergency alert for {dept_name}. "
+                    f"This is a {emergency_type} situation. "
+                    f"All available staff please report immediately."
+                )
+            }
+        stage.set(reassignments_planned=len(ai_plan.get("immediate_reassignments", [])),
+                  call_in_requests=len(ai_plan.get("call_in_requests", [])))
 
-    entry = {
-        "id": user.id,
-        "name": user.name,
-        "role": user.role,
-        "department_id": user.department_id
-    }
+    _publish_stage(affected_department_id, "red_alert.plan_ready", {
+        "emergency_type": emergency_type,
+        "plan_source": plan_source,
+        "reassignments_planned": len(ai_plan.get("immediate_reassignments", [])),
+        "call_in_requests": ai_plan.get("call_in_requests", []),
+        "voice_announcement": ai_plan.get("voice_announcement", ""),
+    })
 
-    if active_assignment:
-        entry["current_shift_id"] = active_assignment.shift_id
-        # Safely get department name
-        try:
-            dept = db.query(Department).filter(
-                Department.id == active_assignment.shift.department_id
-            ).first()
-            entry["current_department"] = dept.name if dept else "Unknown"
-        except Exception:
-            entry["current_department"] = "Unknown"
-        on_duty.append(entry)
-    else:
-        off_duty.append(entry)
-    # ── 3. AI generates reallocation plan ─────────────────────────────────
-    try:
-        ai_plan = generate_emergency_reallocation_plan(
+    # ── 4. ElevenLabs voice broadcast ─────────────────────────────────────
+    voice_text = ai_plan.get("voice_announcement", "")
+    with tracing.span("tts", characters=len(voice_text)) as stage:
+        broadcast = broadcast_emergency_alert(
             emergency_type=emergency_type,
             affected_department=dept_name,
-            on_duty_staff=on_duty,
-            off_duty_staff=off_duty
+            announcement_text=voice_text
         )
-    except ValueError as e:
-        # OpenAI key not set — return a mock plan so the app still works
-        ai_plan = {
-            "immediate_reassignments": [],
-            "call_in_requests": [],
-            "estimated_coverage_minutes": 0,
-            "critical_warning": str(e),
-            "voice_announcement": (
-                f"Emergency alert for {dept_name}. "
-                f"This is a {emergency_type} situation. "
-                f"All available staff please report immediately."
-            )
-        }
-
-    # ── 4. ElevenLabs voice broadcast ─────────────────────────────────────
-    voice_text = ai_plan.get("voice_announcement", "")
-    broadcast = broadcast_emergency_alert(
-        emergency_type=emergency_type,
-        affected_department=dept_name,
-        announcement_text=voice_text
-    )
+        stage.set(voice_status=broadcast.get("status"))
 
     # ── 5. Create emergency assignments in DB ─────────────────────────────
-    assignments_created = []
-
-    for reassignment in ai_plan.get("immediate_reassignments", []):
-        staff_name = reassignment.get("staff_name", "")
-        matched_staff = next(
-            (s for s in on_duty if s["name"].lower() == staff_name.lower()), None
-        )
-        if not matched_staff:
-            continue
-
-        # Find the next open shift in the affected department
-        target_shift = (
-            db.query(Shift)
-            .filter(
-                Shift.department_id == affected_department_id,
-                Shift.end_time >= now
-            )
-            .first()
-        )
-
-        if not target_shift:
-            continue
-
-        # Avoid duplicate assignments
-        already_assigned = (
-            db.query(Assignment)
-            .filter(
-                Assignment.user_id == matched_staff["id"],
-                Assignment.shift_id == target_shift.id
-            )
-            .first()
-        )
-        if already_assigned:
-            continue
-
-        new_assignment = Assignment(
-            user_id=matched_staff["id"],
-            shift_id=target_shift.id,
-            is_emergency=True,
-            notes=f"Emergency reallocation: {emergency_type}"
-        )
-        db.add(new_assignment)
-
-        notify_shift_change(
-            staff_name=matched_staff["name"],
-            old_assignment=matched_staff.get("current_department", "Previous assignment"),
-            new_assignment=dept_name,
-            reason=f"EMERGENCY: {emergency_type}"
+    with tracing.span("db_writes") as stage:
+        execution = execute_reassignments(
+            db,
+            reassignments=ai_plan.get("immediate_reassignments", []),
+            on_duty=on_duty,
+            department_id=affected_department_id,
+            department_name=dept_name,
+            emergency_type=emergency_type,
+            now=now,
+            fallback_target_id=standby["target_shift_id"],
         )
+        assignments_created = execution["created"]
+        stage.set(assignments_created=len(assignments_created), unresolved=len(execution["unresolved"]),
+                  blocked_by_safety=len(execution["blocked_by_safety"]))
 
-        assignments_created.append({
-            "staff_name": matched_staff["name"],
-            "role": matched_staff["role"],
-            "to_department": dept_name
-        })
-
-    db.commit()
-
-    # ── 6. Audit log ──────────────────────────────────────────────────────
+    # ── 6. Audit log (durable: commits with the assignments) ─────────────
     elapsed = round((datetime.utcnow() - started_at).total_seconds(), 1)
-
-    audit = AuditLog(
-        action=(
+    with tracing.span("audit"):
+        audit_service.record(
             f"RED ALERT | type={emergency_type} | department={dept_name} | "
-            f"reassignments={len(assignments_created)} | response_time={elapsed}s"
-        ),
-        performed_by=triggered_by
-    )
-    db.add(audit)
-    db.commit()
+            f"reassignments={len(assignments_created)} | response_time={elapsed}s",
+            performed_by=triggered_by,
+            db=db,
+            durable=True,
+            event_type="red_alert",
+            department_id=affected_department_id,
+            details={
+                "emergency_type": emergency_type,
+                "department": dept_name,
+                "reassignments": len(assignments_created),
+                "response_time_seconds": elapsed,
+                "plan_source": plan_source,
+                # Stages up to here; commit and notifications are in the exported trace
+                "trace": trace.summary(),
+            },
+        )
+    with tracing.span("commit"):
+        db.commit()
+    _publish_stage(affected_department_id, "red_alert.executed", {
+        "emergency_type": emergency_type,
+        "assignments_created": assignments_created,
+        "unresolved_reassignments": execution["unresolved"],
+        "response_time_seconds": elapsed,
+        "voice_status": broadcast.get("status"),
+        "audio_filename": broadcast.get("audio_filename"),
+    })
+
+    # Queued for the dispatcher; delivery happens off the request path
+    with tracing.span("notifications", queued=len(execution["notifications"])):
+        for notice in execution["notifications"]:
+            notify_shift_change(**notice)
 
     return {
         "status": "red_alert_active",
         "emergency_type": emergency_type,
         "affected_department": dept_name,
         "response_time_seconds": elapsed,
+        "plan_source": plan_source,
+        "plan_computed_at": standby["computed_at"],
         "staff_on_duty_count": len(on_duty),
         "staff_off_duty_count": len(off_duty),
         "ai_plan": ai_plan,
         "assignments_created": assignments_created,
+        "blocked_by_safety_mode": execution["blocked_by_safety"],
+        "unresolved_reassignments": execution["unresolved"],
         "voice_broadcast": broadcast,
         "timestamp": started_at.isoformat()
     }
@@ -205,12 +376,17 @@ def resolve_red_alert(
     dept = db.query(Department).filter(Department.id == department_id).first()
     dept_name = dept.name if dept else f"Dept {department_id}"
 
-    audit = AuditLog(
-        action=f"RED ALERT RESOLVED | department={dept_name}",
-        performed_by=resolved_by
+    audit_service.record(
+        f"RED ALERT RESOLVED | department={dept_name}",
+        performed_by=resolved_by,
+        db=db,
+        durable=True,
+        event_type="red_alert_resolved",
+        department_id=department_id,
+        details={"department": dept_name},
     )
-    db.add(audit)
     db.commit()
+    _publish_stage(department_id, "red_alert.resolved", {"department": dept_name, "resolved_by": resolved_by})
 
     return {
         "status": "resolved",
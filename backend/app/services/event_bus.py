@@ -0,0 +1,208 @@
+"""
+MedRoster Event Bus
+In-process pub/sub behind the /ws/events WebSocket. Roster writes publish
+after they commit (via roster_hooks) and Red Alert publishes each stage, so
+dashboards get pushed changes instead of polling /shifts/ and /assignments/.
+
+Topics:
+    department:{id}   shift and assignment changes in a department
+    user:{id}         assignments of one staff member
+    emergency         Red Alert stages, hospital-wide
+
+publish() is thread-safe and never blocks the caller: each event is encoded
+once, and handed to every event loop holding subscribers with a single
+call_soon_threadsafe. Each connection has a bounded send queue
+(WS_SEND_QUEUE_SIZE). When it is full the oldest event is dropped and the
+client is told how many it missed (a `lagged` message) so it can refetch;
+a connection that keeps dropping (WS_SLOW_CONSUMER_DROPS in a row) is
+disconnected. A connection with several events waiting gets them in one
+`batch` frame, so a burst costs one send per client rather than one per event.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from app.config import WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_DROPS
+
+TOPIC_PREFIXES = ("department:", "user:")
+# Events coalesced into one frame for a connection that has fallen behind
+MAX_BATCH = 64
+EMERGENCY = "emergency"
+
+
+def department_topic(department_id: int) -> str:
+    return f"department:{department_id}"
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def valid_topic(topic: str) -> bool:
+    if topic == EMERGENCY:
+        return True
+    for prefix in TOPIC_PREFIXES:
+        if topic.startswith(prefix):
+            return topic[len(prefix):].isdigit()
+    return False
+
+
+class Subscription:
+    """One connection's topics and send queue. Created on (and owned by) its event loop."""
+
+    def __init__(self, maxsize: int = WS_SEND_QUEUE_SIZE):
+        self.loop = asyncio.get_running_loop()
+        self.maxsize = maxsize
+        self.pending: Deque[str] = deque()
+        self.topics: Set[str] = set()
+        self.dropped = 0          # since the last `lagged` notice
+        self.dropped_in_row = 0   # since the client last kept up
+        self.evicted = asyncio.Event()
+        self._wake = asyncio.Event()
+
+    def offer(self, text: str) -> None:
+        """Runs on self.loop. Never waits: a full queue loses its oldest event."""
+        if self.evicted.is_set():
+            return
+        if len(self.pending) >= self.maxsize:
+            self.pending.popleft()
+            self.dropped += 1
+            self.dropped_in_row += 1
+            _count("dropped_total")
+            if self.dropped_in_row >= WS_SLOW_CONSUMER_DROPS:
+                self.evicted.set()
+                _count("evicted_total")
+                return
+        self.pending.append(text)
+        self._wake.set()
+
+    async def next_message(self) -> str:
+        """The next frame: one event, or everything backed up (up to MAX_BATCH) as a `batch`."""
+        while not self.pending:
+            self._wake.clear()
+            await self._wake.wait()
+        if self.dropped:
+            lagged, self.dropped = self.dropped, 0
+            return json.dumps({"type": "lagged", "dropped": lagged})
+        if len(self.pending) == 1:
+            return self.pending.popleft()
+        events = [self.pending.popleft() for _ in range(min(len(self.pending), MAX_BATCH))]
+        return '{"type": "batch", "events": [' + ", ".join(events) + "]}"
+
+    def sent(self) -> None:
+        self.dropped_in_row = 0
+        _count("frames_total")
+
+
+# ── Registry ──────────────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_topics: Dict[str, Set[Subscription]] = {}
+_connections: Set[Subscription] = set()
+_stats = {
+    "published_total": 0,
+    "delivered_total": 0,
+    "frames_total": 0,
+    "dropped_total": 0,
+    "evicted_total": 0,
+}
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _lock:
+        _stats[key] += n
+
+
+def register(sub: Subscription) -> None:
+    with _lock:
+        _connections.add(sub)
+
+
+def unregister(sub: Subscription) -> None:
+    with _lock:
+        _connections.discard(sub)
+        for topic in sub.topics:
+            subs = _topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del _topics[topic]
+        sub.topics.clear()
+
+
+def subscribe(sub: Subscription, topics: Iterable[str]) -> None:
+    with _lock:
+        for topic in topics:
+            _topics.setdefault(topic, set()).add(sub)
+            sub.topics.add(topic)
+
+
+def unsubscribe(sub: Subscription, topics: Iterable[str]) -> None:
+    with _lock:
+        for topic in topics:
+            subs = _topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del _topics[topic]
+            sub.topics.discard(topic)
+
+
+# ── Publishing ────────────────────────────────────────────────────────────
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _fan_out(subs: List[Subscription], text: str) -> None:
+    for sub in subs:
+        sub.offer(text)
+    _count("delivered_total", len(subs))
+
+
+def publish(topics: Iterable[str], event: str, data: Optional[Dict[str, Any]] = None) -> int:
+    """Push an event to everyone subscribed to any of `topics` (once each). Returns recipients."""
+    topics = list(topics)
+    with _lock:
+        _stats["published_total"] += 1
+        targets: Set[Subscription] = set()
+        for topic in topics:
+            targets.update(_topics.get(topic, ()))
+    if not targets:
+        return 0
+
+    text = json.dumps({
+        "type": "event",
+        "event": event,
+        "topics": topics,
+        "data": data or {},
+        "ts": datetime.utcnow().isoformat(),
+    }, default=_json_default)
+
+    by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription]] = {}
+    for sub in targets:
+        by_loop.setdefault(sub.loop, []).append(sub)
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    for loop, subs in by_loop.items():
+        if loop is running:
+            _fan_out(subs, text)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(_fan_out, subs, text)
+    return len(targets)
+
+
+def bus_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+        stats["connections"] = len(_connections)
+        stats["topics"] = len(_topics)
+        stats["subscriptions"] = sum(len(subs) for subs in _topics.values())
+        stats["queued"] = sum(len(sub.pending) for sub in _connections)
+    return stats
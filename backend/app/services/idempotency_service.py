@@ -0,0 +1,126 @@
+"""
+MedRoster Idempotency Store
+Backs the Idempotency-Key middleware (app.idempotency). The first request
+with a key claims it by inserting its row (the primary key arbitrates
+between concurrent duplicates, across workers too); when it finishes, its
+response is stored on the row and later requests with the key get that
+response back. A failed attempt (5xx or exception) releases the key so a
+retry runs again.
+
+The store is bounded: rows older than IDEMPOTENCY_TTL_HOURS, and the oldest
+beyond IDEMPOTENCY_MAX_KEYS, are pruned every PRUNE_EVERY completions.
+"""
+
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL_HOURS
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# Outcomes of claim()
+CLAIMED = "claimed"
+REPLAY = "replay"
+BUSY = "in_progress"
+MISMATCH = "mismatch"
+
+PRUNE_EVERY = 100
+_completions = itertools.count(1)
+
+
+def claim(key: str, principal: str, method: str, path: str, request_hash: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Claim `key` for this request. Returns (CLAIMED, None) if the caller
+    should run it, (REPLAY, response) if it already completed, (BUSY, None)
+    if another request holds it, or (MISMATCH, None) if the key was used for
+    a different request.
+    """
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for _ in range(2):
+            try:
+                db.execute(insert(IdempotencyKey).values(
+                    key=key, principal=principal, method=method, path=path, request_hash=request_hash,
+                    status=IN_PROGRESS, created_at=now,
+                ))
+                db.commit()
+                return CLAIMED, None
+            except IntegrityError:
+                db.rollback()
+            row = db.get(IdempotencyKey, (key, principal))
+            if row is not None:
+                break
+            # Released or pruned in between: try to claim again
+        else:
+            return BUSY, None
+
+        if (row.method, row.path, row.request_hash) != (method, path, request_hash):
+            return MISMATCH, None
+        if row.status == COMPLETED:
+            return REPLAY, {
+                "status": row.response_status,
+                "headers": row.response_headers or [],
+                "body": row.response_body or b"",
+            }
+        if row.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+            # The worker that claimed it never answered: take the claim over
+            taken = db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.principal == principal,
+                       IdempotencyKey.status == IN_PROGRESS, IdempotencyKey.created_at == row.created_at)
+                .values(created_at=now)
+            ).rowcount
+            db.commit()
+            if taken:
+                return CLAIMED, None
+        return BUSY, None
+
+
+def complete(key: str, principal: str, status: int, headers: List[List[str]], body: bytes) -> None:
+    """Store the response for a claimed key."""
+    with SessionLocal() as db:
+        db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.principal == principal)
+            .values(status=COMPLETED, response_status=status, response_headers=headers,
+                    response_body=body, completed_at=datetime.utcnow())
+        )
+        if next(_completions) % PRUNE_EVERY == 0:
+            prune(db)
+        db.commit()
+
+
+def release(key: str, principal: str) -> None:
+    """Give up a claim without storing a response (the request failed; a retry may run it)."""
+    with SessionLocal() as db:
+        db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.key == key, IdempotencyKey.principal == principal, IdempotencyKey.status == IN_PROGRESS,
+        ))
+        db.commit()
+
+
+def prune(db, now: Optional[datetime] = None) -> int:
+    """Drop expired completed keys and the oldest beyond IDEMPOTENCY_MAX_KEYS. Does not commit."""
+    now = now or datetime.utcnow()
+    removed = db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.status == COMPLETED,
+        IdempotencyKey.created_at < now - timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+    )).rowcount or 0
+    cutoff = db.scalar(
+        select(IdempotencyKey.created_at)
+        .order_by(IdempotencyKey.created_at.desc())
+        .offset(IDEMPOTENCY_MAX_KEYS)
+        .limit(1)
+    )
+    if cutoff is not None:
+        removed += db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.status == COMPLETED, IdempotencyKey.created_at <= cutoff,
+        )).rowcount or 0
+    return removed
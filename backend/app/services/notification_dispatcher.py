@@ -0,0 +1,316 @@
+"""
+MedRoster Notification Dispatcher
+Staff notifications are queued per recipient and delivered by background
+workers in batches through pluggable channels (NOTIFY_CHANNELS):
+
+    log      print to the server log (the old behaviour)
+    file     append JSON lines to NOTIFY_FILE_PATH
+    webhook  POST {"notifications": [...]} to NOTIFY_WEBHOOK_URL
+
+A recipient's notices are delivered in order: while a batch holding them is
+in flight or waiting to retry, their later notices wait. Failed channels
+are retried with exponential backoff up to NOTIFY_MAX_ATTEMPTS; only the
+failed channels are retried. Identical notices to the same recipient within
+NOTIFY_DEDUP_SECONDS are sent once (Red Alert re-runs, AI plans repeating
+people).
+"""
+
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import requests
+
+from app.config import (
+    NOTIFY_BACKOFF_SECONDS,
+    NOTIFY_BATCH_SIZE,
+    NOTIFY_CHANNELS,
+    NOTIFY_DEDUP_SECONDS,
+    NOTIFY_FILE_PATH,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_WEBHOOK_URL,
+    NOTIFY_WORKERS,
+)
+
+
+# ── Channels ──────────────────────────────────────────────────────────────
+
+class Channel(ABC):
+    """Delivers a batch of notices; raises to have the batch retried."""
+
+    name = "channel"
+
+    @abstractmethod
+    def deliver(self, notices: List[Dict[str, Any]]) -> None:
+        ...
+
+
+class LogChannel(Channel):
+    name = "log"
+
+    def deliver(self, notices: List[Dict[str, Any]]) -> None:
+        for notice in notices:
+            print(f"[Notification] {notice['message']}")
+
+
+class FileChannel(Channel):
+    name = "file"
+
+    def __init__(self, path: str = NOTIFY_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def deliver(self, notices: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(n) + "\n" for n in notices)
+        with self._lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+class WebhookChannel(Channel):
+    name = "webhook"
+
+    def __init__(self, url: str = NOTIFY_WEBHOOK_URL, timeout: float = 10.0):
+        if not url:
+            raise ValueError("NOTIFY_WEBHOOK_URL is not set")
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def deliver(self, notices: List[Dict[str, Any]]) -> None:
+        response = self._session.post(self.url, json={"notifications": notices}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+CHANNEL_TYPES = {"log": LogChannel, "file": FileChannel, "webhook": WebhookChannel}
+
+
+def build_channels(names: List[str]) -> List[Channel]:
+    channels = []
+    for name in names:
+        try:
+            channels.append(CHANNEL_TYPES[name]())
+        except KeyError:
+            print(f"[Notify] Unknown channel '{name}' — skipped")
+        except ValueError as e:
+            print(f"[Notify] Channel '{name}' disabled: {e}")
+    return channels
+
+
+# ── Queues ────────────────────────────────────────────────────────────────
+
+_cond = threading.Condition()
+_queues: Dict[str, Deque[Dict[str, Any]]] = {}
+_ready: Deque[str] = deque()          # recipients with queued notices and nothing in flight
+_in_flight: Set[str] = set()
+_retries: List[tuple] = []            # heap of (due_monotonic, seq, job)
+_dedup: Dict[tuple, float] = {}
+_latencies: Deque[float] = deque(maxlen=2000)
+_channels: List[Channel] = []
+_seq = itertools.count(1)
+_stop = threading.Event()
+_start_lock = threading.Lock()
+_threads: List[threading.Thread] = []
+
+_stats = {
+    "enqueued_total": 0,
+    "deduplicated_total": 0,
+    "delivered_total": 0,
+    "batches_total": 0,
+    "retries_total": 0,
+    "failed_total": 0,
+}
+
+
+def enqueue(
+    recipient: str,
+    message: str,
+    kind: str = "notice",
+    payload: Optional[Dict[str, Any]] = None,
+    dedup_key: Optional[str] = None,
+) -> bool:
+    """Queue a notice. Returns False if it duplicates one sent within the dedup window."""
+    now = time.monotonic()
+    key = (recipient, kind, dedup_key if dedup_key is not None else message)
+    with _cond:
+        if _dedup.get(key, 0.0) > now:
+            _stats["deduplicated_total"] += 1
+            return False
+        _dedup[key] = now + NOTIFY_DEDUP_SECONDS
+        if len(_dedup) > 10000:
+            for k in [k for k, expires in _dedup.items() if expires <= now]:
+                del _dedup[k]
+
+        queue = _queues.setdefault(recipient, deque())
+        queue.append({
+            "id": next(_seq),
+            "recipient": recipient,
+            "kind": kind,
+            "message": message,
+            "payload": payload or {},
+            "created_at": datetime.utcnow().isoformat(),
+            "_enqueued": now,
+        })
+        if len(queue) == 1 and recipient not in _in_flight:
+            _ready.append(recipient)
+        _stats["enqueued_total"] += 1
+        _cond.notify()
+    _ensure_started()
+    return True
+
+
+def _take_batch() -> Optional[Dict[str, Any]]:
+    """Called with _cond held: up to NOTIFY_BATCH_SIZE notices, whole recipients at a time."""
+    notices, recipients = [], set()
+    while _ready and len(notices) < NOTIFY_BATCH_SIZE:
+        recipient = _ready.popleft()
+        queue = _queues[recipient]
+        take = min(len(queue), NOTIFY_BATCH_SIZE - len(notices))
+        notices.extend(queue.popleft() for _ in range(take))
+        if not queue:
+            del _queues[recipient]
+        recipients.add(recipient)
+        _in_flight.add(recipient)
+    if not notices:
+        return None
+    return {"notices": notices, "recipients": recipients, "channels": list(_channels), "attempt": 1}
+
+
+def _release(recipients: Set[str]) -> None:
+    with _cond:
+        for recipient in recipients:
+            _in_flight.discard(recipient)
+            if recipient in _queues:
+                _ready.append(recipient)
+        _cond.notify_all()
+
+
+def _deliver(job: Dict[str, Any]) -> None:
+    wire = [{k: v for k, v in n.items() if not k.startswith("_")} for n in job["notices"]]
+    failed = []
+    for channel in job["channels"]:
+        try:
+            channel.deliver(wire)
+        except Exception as e:
+            print(f"[Notify] {channel.name} delivery of {len(wire)} notices failed "
+                  f"(attempt {job['attempt']}): {e}")
+            failed.append(channel)
+
+    if failed and job["attempt"] < NOTIFY_MAX_ATTEMPTS:
+        delay = NOTIFY_BACKOFF_SECONDS * (2 ** (job["attempt"] - 1)) * random.uniform(0.8, 1.2)
+        retry = {**job, "channels": failed, "attempt": job["attempt"] + 1}
+        with _cond:
+            heapq.heappush(_retries, (time.monotonic() + delay, next(_seq), retry))
+            _stats["retries_total"] += 1
+            _cond.notify()
+        return
+
+    done = time.monotonic()
+    with _cond:
+        _stats["batches_total"] += 1
+        if failed:
+            _stats["failed_total"] += len(wire)
+        else:
+            _stats["delivered_total"] += len(wire)
+            _latencies.extend(done - n["_enqueued"] for n in job["notices"])
+    if failed:
+        print(f"[Notify] Gave up on {len(wire)} notices after {job['attempt']} attempts")
+    _release(job["recipients"])
+
+
+def _next_job() -> Optional[Dict[str, Any]]:
+    with _cond:
+        while not _stop.is_set():
+            now = time.monotonic()
+            if _retries and _retries[0][0] <= now:
+                return heapq.heappop(_retries)[2]
+            job = _take_batch()
+            if job:
+                return job
+            wait = min(_retries[0][0] - now, 1.0) if _retries else 1.0
+            _cond.wait(timeout=wait)
+    return None
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        job = _next_job()
+        if job:
+            _deliver(job)
+
+
+def _ensure_started() -> None:
+    if not _threads or not any(t.is_alive() for t in _threads):
+        start()
+
+
+def start(channels: Optional[List[Channel]] = None) -> None:
+    """Start the workers (channels default to NOTIFY_CHANNELS)."""
+    with _start_lock:
+        if channels is not None:
+            _channels[:] = channels
+        elif not _channels:
+            _channels[:] = build_channels(NOTIFY_CHANNELS)
+        if any(t.is_alive() for t in _threads):
+            return
+        _stop.clear()
+        _threads[:] = [
+            threading.Thread(target=_run, name=f"notify-{i}", daemon=True)
+            for i in range(max(NOTIFY_WORKERS, 1))
+        ]
+        for t in _threads:
+            t.start()
+
+
+def drain(timeout: float = 5.0) -> bool:
+    """Wait until nothing is queued, in flight or awaiting retry. Returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    with _cond:
+        while _queues or _in_flight or _retries:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _cond.wait(timeout=min(remaining, 0.1))
+    return True
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Deliver what is queued (up to timeout), then stop the workers."""
+    if not drain(timeout):
+        print(f"[Notify] Shutdown with {queue_depth()} notices undelivered")
+    _stop.set()
+    with _cond:
+        _cond.notify_all()
+    for t in _threads:
+        t.join(timeout=2)
+
+
+def queue_depth() -> int:
+    with _cond:
+        return sum(len(q) for q in _queues.values())
+
+
+def notification_stats() -> Dict[str, Any]:
+    with _cond:
+        stats = dict(_stats)
+        stats["queue_depth"] = sum(len(q) for q in _queues.values())
+        stats["recipients_waiting"] = len(_queues)
+        stats["recipients_in_flight"] = len(_in_flight)
+        stats["batches_awaiting_retry"] = len(_retries)
+        latencies = sorted(_latencies)
+    stats["channels"] = [c.name for c in _channels]
+    if latencies:
+        stats["delivery_latency_ms"] = {
+            "p50": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p95": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        }
+    else:
+        stats["delivery_latency_ms"] = {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return stats
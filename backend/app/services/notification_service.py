@@ -1,60 +1,112 @@
 """
 MedRoster Notification Service
-Uses ElevenLabs REST API for voice alerts.
+Voice alerts on the TTS provider (ElevenLabs by default), generated in the
+background for Red Alert broadcasts, one file per render with a pollable
+status; staff notices go through notification_dispatcher.
 """
 
+import contextvars
 import os
-import requests
-from app.config import ELEVENLABS_API_KEY as ELEVEN_LABS_API_KEY
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.services import notification_dispatcher
+from app.services.providers import tts_provider
+
+# Emergency voice files are rendered off the request path
+_voice_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="voice")
+_voice_lock = threading.Lock()
+# voice_id → render record, oldest first; evicted records take their file with them
+_voice_renders: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_voice_rendering: Dict[tuple, str] = {}  # (department, text) → voice_id still rendering
+MAX_VOICE_RENDERS = 200
 
 DEFAULT_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
-ELEVEN_LABS_BASE_URL = "https://api.elevenlabs.io/v1"
+
+
+def _write_voice(text: str, output_path: str) -> None:
+    provider = tts_provider()
+    # The ElevenLabs voice for alerts; other providers use their own
+    voice_id = DEFAULT_VOICE_ID if provider.name == "elevenlabs" else None
+    audio = provider.synthesize(text, voice_id=voice_id, stability=0.5, similarity_boost=0.75)
+    # Written aside and renamed, so readers never see a partial file
+    partial = f"{output_path}.part"
+    with open(partial, "wb") as f:
+        f.write(audio)
+    os.replace(partial, output_path)
 
 
 def generate_voice_alert(text: str, filename: str = "alert.mp3"):
-    if not ELEVEN_LABS_API_KEY or ELEVEN_LABS_API_KEY == "your_elevenlabs_key_here":
-        print("[ElevenLabs] API key not set — skipping voice generation")
+    provider = tts_provider()
+    if not provider.available():
+        print(f"[Voice] {provider.name} is not configured — skipping voice generation")
         return None
 
     try:
-        url = f"{ELEVEN_LABS_BASE_URL}/text-to-speech/{DEFAULT_VOICE_ID}"
-        
-        headers = {
-            "xi-api-key": ELEVEN_LABS_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "text": text,
-            "model_id": "eleven_multilingual_v2",
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.75
-            }
-        }
-
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-
         output_path = f"/tmp/{filename}"
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-
-        print(f"[ElevenLabs] Voice alert saved: {output_path}")
+        _write_voice(text, output_path)
+        print(f"[Voice] Voice alert saved: {output_path}")
         return output_path
 
     except Exception as e:
-        print(f"[ElevenLabs] Error: {e}")
+        print(f"[Voice] Error: {e}")
         return None
 
 
+def voice_status(voice_id: str) -> Optional[Dict[str, Any]]:
+    """A voice render's record: status rendering, ready or failed (None if unknown or evicted)."""
+    with _voice_lock:
+        record = _voice_renders.get(voice_id)
+        return dict(record) if record else None
+
+
+def _render(voice_id: str, key: tuple, text: str, filename: str) -> None:
+    error = None
+    try:
+        _write_voice(text, f"/tmp/{filename}")
+        print(f"[Voice] Voice alert saved: /tmp/{filename}")
+    except Exception as e:
+        error = str(e)
+        print(f"[Voice] Error: {e}")
+    with _voice_lock:
+        record = _voice_renders.get(voice_id)
+        if record is not None:
+            record.update(status="failed" if error else "ready", error=error,
+                          finished_at=datetime.utcnow().isoformat())
+        if _voice_rendering.get(key) == voice_id:
+            del _voice_rendering[key]
+
+
+def _evict_voice_renders() -> None:
+    """Forget the oldest finished renders beyond MAX_VOICE_RENDERS and delete their files (holds _voice_lock)."""
+    for voice_id in list(_voice_renders):
+        if len(_voice_renders) <= MAX_VOICE_RENDERS:
+            return
+        record = _voice_renders[voice_id]
+        if record["status"] == "rendering":
+            continue
+        del _voice_renders[voice_id]
+        try:
+            os.remove(f"/tmp/{record['audio_filename']}")
+        except OSError:
+            pass
+
+
 def broadcast_emergency_alert(
     emergency_type: str,
     affected_department: str,
     announcement_text: str
 ) -> dict:
+    """
+    Queue the voice render for an alert. Each render gets its own file and
+    a voice_id; poll voice_status (GET /emergency/voice-status/{voice_id})
+    for the outcome before fetching the audio.
+    """
     safe_dept = affected_department.replace(" ", "_").replace("/", "-")
-    filename = f"emergency_{safe_dept}.mp3"
 
     text = announcement_text or (
         f"Attention all staff. Emergency alert for {affected_department}. "
@@ -62,12 +114,42 @@ def broadcast_emergency_alert(
         f"Please check MedRoster for your updated assignment immediately."
     )
 
-    audio_path = generate_voice_alert(text=text, filename=filename)
+    if not tts_provider().available():
+        print("[Voice] TTS provider not configured — skipping voice generation")
+        return {
+            "status": "text_only",
+            "voice_id": None,
+            "audio_filename": None,
+            "announcement_text": text,
+            "affected_department": affected_department
+        }
+
+    # An identical broadcast already rendering is not submitted twice
+    key = (safe_dept, text)
+    with _voice_lock:
+        voice_id = _voice_rendering.get(key)
+        if voice_id is None:
+            voice_id = uuid.uuid4().hex[:12]
+            filename = f"emergency_{safe_dept}_{voice_id}.mp3"
+            _voice_renders[voice_id] = {
+                "voice_id": voice_id,
+                "status": "rendering",
+                "audio_filename": filename,
+                "error": None,
+                "created_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+            }
+            _voice_rendering[key] = voice_id
+            _evict_voice_renders()
+            # Copied context: the render is traced under the caller's span, if any
+            _voice_pool.submit(contextvars.copy_context().run, _render, voice_id, key, text, filename)
+        else:
+            filename = _voice_renders[voice_id]["audio_filename"]
 
     return {
-        "status": "voice_sent" if audio_path else "text_only",
-        "audio_path": audio_path,
-        "audio_filename": filename if audio_path else None,
+        "status": "voice_queued",
+        "voice_id": voice_id,
+        "audio_filename": filename,
         "announcement_text": text,
         "affected_department": affected_department
     }
@@ -77,8 +159,10 @@ def notify_shift_change(
     staff_name: str,
     old_assignment: str,
     new_assignment: str,
-    reason: str = "Schedule update"
+    reason: str = "Schedule update",
+    staff_id: Optional[int] = None
 ) -> dict:
+    """Queue a reassignment notice; repeats within the dedup window are dropped."""
     message = (
         f"Hi {staff_name}, your assignment has been updated.\n"
         f"From: {old_assignment}\n"
@@ -86,5 +170,18 @@ def notify_shift_change(
         f"Reason: {reason}\n"
         f"Please acknowledge in MedRoster."
     )
-    print(f"[Notification] {message}")
-    return {"status": "sent", "recipient": staff_name, "message": message}
\ No newline at end of file
+    recipient = f"user:{staff_id}" if staff_id is not None else f"name:{staff_name}"
+    queued = notification_dispatcher.enqueue(
+        recipient,
+        message,
+        kind="shift_change",
+        payload={
+            "staff_id": staff_id,
+            "staff_name": staff_name,
+            "old_assignment": old_assignment,
+            "new_assignment": new_assignment,
+            "reason": reason,
+        },
+        dedup_key=f"{new_assignment}|{reason}",
+    )
+    return {"status": "queued" if queued else "duplicate", "recipient": staff_name, "message": message}
@@ -0,0 +1,61 @@
+"""
+MedRoster Profile Store
+Persists request-profiler sessions (app.profiler): the admin's request,
+then the collected requests and collapsed stacks, saved after every
+profiled request so progress is visible while the session runs.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.profile_session import ProfileSession
+
+TERMINAL = ("completed", "cancelled", "expired")
+
+
+def create(db: Session, route_pattern: str, method: Optional[str], requests: int, interval_ms: float,
+           requested_by: str) -> ProfileSession:
+    row = ProfileSession(
+        route_pattern=route_pattern, method=method.upper() if method else None, requested_by=requested_by,
+        target_requests=requests, interval_ms=interval_ms, status="armed", requests=[], collapsed="",
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+
+def save(snapshot: Dict[str, Any]) -> None:
+    """Store a profiler snapshot; an older snapshot landing late never overwrites a newer one."""
+    values = {k: snapshot[k] for k in ("status", "profiled_requests", "samples", "requests", "collapsed")}
+    if snapshot["status"] in TERMINAL:
+        values["completed_at"] = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(
+            update(ProfileSession)
+            .where(ProfileSession.id == snapshot["id"],
+                   ProfileSession.profiled_requests <= snapshot["profiled_requests"])
+            .values(**values)
+        )
+        db.commit()
+
+
+def as_dict(row: ProfileSession) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "route_pattern": row.route_pattern,
+        "method": row.method,
+        "requested_by": row.requested_by,
+        "target_requests": row.target_requests,
+        "interval_ms": row.interval_ms,
+        "status": row.status,
+        "profiled_requests": row.profiled_requests,
+        "samples": row.samples,
+        "requests": row.requests or [],
+        "created_at": row.created_at.isoformat(),
+        "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+    }
@@ -0,0 +1,306 @@
+"""
+MedRoster AI / Voice Providers
+Chat completions and text-to-speech behind one interface, chosen by
+AI_PROVIDER and TTS_PROVIDER:
+
+    openai      chat on OPENAI_MODEL (api.openai.com, or OPENAI_BASE_URL)
+    elevenlabs  ElevenLabs text-to-speech (ELEVENLABS_BASE_URL)
+    local       offline and deterministic: chat answers come from the
+                caller's rules, speech is generated MP3 (silence or a
+                tone) as long as the text takes to say; both after a
+                simulated latency (LOCAL_* settings)
+
+Every call is timed and counted through metrics.provider_call under the
+provider's name. A provider that is not configured raises ValueError, so
+callers can fall back.
+"""
+
+import json
+import random
+from abc import ABC, abstractmethod
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Union
+
+import requests
+from openai import OpenAI
+
+from app.config import (
+    AI_PROVIDER,
+    ELEVENLABS_API_KEY,
+    ELEVENLABS_BASE_URL,
+    ELEVENLABS_VOICE_ID,
+    LOCAL_AI_LATENCY_MS,
+    LOCAL_AI_MS_PER_TOKEN,
+    LOCAL_LATENCY_JITTER,
+    LOCAL_LATENCY_SCALE,
+    LOCAL_TTS_AUDIO,
+    LOCAL_TTS_LATENCY_MS,
+    LOCAL_TTS_MS_PER_CHAR,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+    TTS_PROVIDER,
+)
+from app.metrics import provider_call
+
+# The deterministic answer a local provider gives for a prompt (dict = JSON)
+Rules = Callable[[], Union[Dict[str, Any], str]]
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for providers that report none."""
+    return max(1, len(text) // 4)
+
+
+# ── Chat ──────────────────────────────────────────────────────────────────
+
+class ChatProvider(ABC):
+    """Returns the completion's text; JSON mode asks for a single JSON object."""
+
+    name = "chat"
+    model = ""
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def complete(
+        self,
+        prompt: str,
+        json_mode: bool = True,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        rules: Optional[Rules] = None,
+    ) -> str:
+        ...
+
+
+class OpenAIChat(ChatProvider):
+    name = "openai"
+
+    def __init__(self, api_key: str = OPENAI_API_KEY, model: str = OPENAI_MODEL, base_url: str = OPENAI_BASE_URL):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url or None
+        self._client: Optional[OpenAI] = None
+
+    def available(self) -> bool:
+        return bool(self.api_key and self.api_key != "your_openai_key_here")
+
+    def _get_client(self) -> OpenAI:
+        # One client per process: its connection pool is reused across calls
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def complete(self, prompt, json_mode=True, temperature=0.2, max_tokens=None, rules=None) -> str:
+        if not self.available():
+            raise ValueError("OPENAI_API_KEY is not set in your .env file")
+        options: Dict[str, Any] = {"temperature": temperature}
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        with provider_call(self.name, "chat") as call:
+            resp = self._get_client().chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                **options,
+            )
+            usage = getattr(resp, "usage", None)
+            if usage is not None:
+                call.add_tokens("prompt", usage.prompt_tokens)
+                call.add_tokens("completion", usage.completion_tokens)
+        return resp.choices[0].message.content
+
+
+def _simulate_latency(base_ms: float, per_unit_ms: float, units: int, key: str) -> None:
+    """Sleep like a remote provider would; the jitter is seeded by `key`, so reruns match."""
+    if LOCAL_LATENCY_SCALE <= 0:
+        return
+    jitter = random.Random(zlib.crc32(key.encode())).uniform(-LOCAL_LATENCY_JITTER, LOCAL_LATENCY_JITTER)
+    ms = (base_ms + per_unit_ms * units) * (1 + jitter) * LOCAL_LATENCY_SCALE
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+class LocalChat(ChatProvider):
+    name = "local"
+    model = "local-rules"
+
+    def complete(self, prompt, json_mode=True, temperature=0.2, max_tokens=None, rules=None) -> str:
+        if rules is None:
+            raise ValueError("The local AI provider has no rules for this request")
+        with provider_call(self.name, "chat") as call:
+            answer = rules()
+            content = json.dumps(answer) if isinstance(answer, dict) else str(answer)
+            call.add_tokens("prompt", _tokens(prompt))
+            call.add_tokens("completion", _tokens(content))
+            _simulate_latency(LOCAL_AI_LATENCY_MS, LOCAL_AI_MS_PER_TOKEN, _tokens(content), prompt)
+        return content
+
+
+# ── Text-to-speech ────────────────────────────────────────────────────────
+
+class TTSProvider(ABC):
+    """Returns audio bytes of `content_type` for the text."""
+
+    name = "tts"
+    content_type = "audio/mpeg"
+    default_voice_id = ""
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def synthesize(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        model_id: str = "eleven_multilingual_v2",
+        stability: float = 0.5,
+        similarity_boost: float = 0.75,
+    ) -> bytes:
+        ...
+
+
+class ElevenLabsTTS(TTSProvider):
+    name = "elevenlabs"
+
+    def __init__(self, api_key: str = ELEVENLABS_API_KEY, voice_id: str = ELEVENLABS_VOICE_ID,
+                 base_url: str = ELEVENLABS_BASE_URL, timeout: float = 30.0):
+        self.api_key = api_key
+        self.default_voice_id = voice_id
+        self.base_url = base_url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def available(self) -> bool:
+        return bool(self.api_key and self.api_key != "your_elevenlabs_key_here")
+
+    def synthesize(self, text, voice_id=None, model_id="eleven_multilingual_v2", stability=0.5,
+                   similarity_boost=0.75) -> bytes:
+        if not self.available():
+            raise ValueError("ELEVENLABS_API_KEY is not set in your .env file")
+        vid = voice_id or self.default_voice_id
+        if not vid:
+            raise ValueError("ELEVENLABS_VOICE_ID is not set in your .env file")
+
+        payload = {
+            "text": text,
+            "model_id": model_id,
+            "voice_settings": {"stability": float(stability), "similarity_boost": float(similarity_boost)},
+        }
+        with provider_call(self.name, "tts") as call:
+            call.add_tokens("characters", len(text))
+            resp = self._session.post(
+                f"{self.base_url}/text-to-speech/{vid}",
+                headers={"xi-api-key": self.api_key, "Content-Type": "application/json", "Accept": "audio/mpeg"},
+                json=payload,
+                timeout=self.timeout,
+            )
+            if resp.status_code >= 400:
+                try:
+                    err = resp.json()
+                except Exception:
+                    err = {"message": resp.text}
+                raise RuntimeError(f"ElevenLabs TTS failed ({resp.status_code}): {err}")
+        return resp.content
+
+
+# MPEG-1 Layer III, 48 kHz mono, 128 kbit/s: 1152 samples and 384 bytes per frame
+_MP3_HEADER = bytes([0xFF, 0xFB, 0x94, 0xC0])
+_MP3_FRAME_BYTES = 384
+_MP3_FRAMES_PER_SECOND = 48000 / 1152
+# Speaking rate used to size the audio
+CHARACTERS_PER_SECOND = 15
+
+
+def _mp3_frame(tone: bool) -> bytes:
+    """
+    One frame, identical for every position (no bit reservoir). Silence: both
+    granules carry no spectral data. Tone: spectral line 24 (~1 kHz) set to 1
+    in every granule, Huffman table 1: twelve (0,0) pairs, then (1,0) + sign.
+    """
+    part3 = "1" * 12 + "01" + "0" if tone else ""
+    bits = "0" * 9 + "0" * 5 + "0" * 4  # main_data_begin, private bits, scfsi
+    for _ in range(2):  # granules
+        bits += f"{len(part3):012b}"             # part2_3_length (no scalefactor bits)
+        bits += f"{13 if tone else 0:09b}"       # big_values: 13 pairs cover line 24
+        bits += f"{200 if tone else 0:08b}"      # global_gain: 2^((200-210)/4) ≈ -15 dB
+        bits += "0000" + "0"                     # scalefac_compress, window_switching_flag
+        bits += f"{1 if tone else 0:05b}" + "00000" * 2  # table_select
+        bits += "1111" + "111" + "000"           # region0/1 counts (all in region 0), flags
+    bits += part3 * 2
+    bits += "0" * (-len(bits) % 8)
+    body = int(bits, 2).to_bytes(len(bits) // 8, "big")
+    return (_MP3_HEADER + body).ljust(_MP3_FRAME_BYTES, b"\x00")
+
+
+class LocalTTS(TTSProvider):
+    name = "local"
+    default_voice_id = "local"
+
+    def __init__(self, audio: str = LOCAL_TTS_AUDIO):
+        self._frame = _mp3_frame(audio == "tone")
+
+    def synthesize(self, text, voice_id=None, model_id="eleven_multilingual_v2", stability=0.5,
+                   similarity_boost=0.75) -> bytes:
+        with provider_call(self.name, "tts") as call:
+            call.add_tokens("characters", len(text))
+            frames = max(1, round(len(text) / CHARACTERS_PER_SECOND * _MP3_FRAMES_PER_SECOND))
+            audio = self._frame * frames
+            _simulate_latency(LOCAL_TTS_LATENCY_MS, LOCAL_TTS_MS_PER_CHAR, len(text), text)
+        return audio
+
+
+# ── Selection ─────────────────────────────────────────────────────────────
+
+CHAT_PROVIDERS = {"openai": OpenAIChat, "local": LocalChat}
+TTS_PROVIDERS = {"elevenlabs": ElevenLabsTTS, "local": LocalTTS}
+
+_lock = threading.Lock()
+_chat: Optional[ChatProvider] = None
+_tts: Optional[TTSProvider] = None
+
+
+def _build(kind: str, types: Dict[str, type], name: str, default: str):
+    if name not in types:
+        print(f"[Providers] Unknown {kind} provider '{name}' — using '{default}'")
+        name = default
+    return types[name]()
+
+
+def chat_provider() -> ChatProvider:
+    global _chat
+    if _chat is None:
+        with _lock:
+            if _chat is None:
+                _chat = _build("AI", CHAT_PROVIDERS, AI_PROVIDER, "openai")
+    return _chat
+
+
+def tts_provider() -> TTSProvider:
+    global _tts
+    if _tts is None:
+        with _lock:
+            if _tts is None:
+                _tts = _build("TTS", TTS_PROVIDERS, TTS_PROVIDER, "elevenlabs")
+    return _tts
+
+
+def set_providers(chat: Optional[ChatProvider] = None, tts: Optional[TTSProvider] = None) -> None:
+    """Swap providers at runtime (scripts, test suites); None keeps the current one."""
+    global _chat, _tts
+    with _lock:
+        if chat is not None:
+            _chat = chat
+        if tts is not None:
+            _tts = tts
+
+
+def provider_info() -> Dict[str, str]:
+    chat, tts = chat_provider(), tts_provider()
+    return {"ai": chat.name, "model": chat.model, "tts": tts.name}
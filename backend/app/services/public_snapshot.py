@@ -0,0 +1,147 @@
+"""
+MedRoster Public Snapshot
+Everything the unauthenticated kiosk read path shows (the department list,
+each department's staffing coverage over the next 24h, the estimated wait
+and its transcript in every kiosk language) is built in two queries and
+held in memory as pre-encoded JSON with a content ETag. Kiosk polls are
+answered from it without touching the database.
+
+The snapshot is rebuilt by the first read after a department, shift or
+assignment write commits (table versions, see app.versions), and at least
+every PUBLIC_SNAPSHOT_MAX_AGE_SECONDS because the 24h window slides. One
+caller rebuilds at a time; readers keep getting the previous snapshot
+meanwhile.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from app import versions
+from app.config import PUBLIC_SNAPSHOT_MAX_AGE_SECONDS
+from app.database import SessionLocal
+from app.models.department import Department
+from app.services.coverage_service import coverage_by_department
+
+LANGUAGES = ("en", "es")
+WINDOW_HOURS = 24
+_KEYS = (versions.DEPARTMENTS, versions.SHIFTS, versions.SHIFTS_BULK, versions.ASSIGNMENTS)
+
+
+def estimated_wait(coverage_pct: int) -> int:
+    # Simple ETA heuristic for demo
+    return max(10, 60 - int(coverage_pct * 0.5))
+
+
+def wait_time_text(department: str, minutes: int, language: str) -> str:
+    if language == "es":
+        return (
+            f"Actualización de {department}. "
+            f"Tiempo de espera estimado: {minutes} minutos. "
+            f"Gracias por su paciencia. Si sus síntomas empeoran, avise al personal de inmediato."
+        )
+    return (
+        f"{department} update. Estimated wait time is about {minutes} minutes. "
+        f"Thank you for your patience. If symptoms worsen, alert staff immediately."
+    )
+
+
+class Body:
+    """A pre-encoded JSON response body and its (strong) ETag."""
+
+    __slots__ = ("content", "etag")
+
+    def __init__(self, value: Any):
+        self.content = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.blake2b(self.content, digest_size=8).hexdigest()}"'
+
+
+class Snapshot:
+    __slots__ = ("key", "built_at", "departments", "departments_body", "status_bodies")
+
+    def __init__(self, key: Tuple[int, ...], built_at: float):
+        self.key = key
+        self.built_at = built_at
+        self.departments: Dict[int, Dict[str, Any]] = {}
+        self.departments_body: Optional[Body] = None
+        self.status_bodies: Dict[Tuple[int, str], Body] = {}
+
+    def status(self, department_id: int, language: str) -> Optional[Body]:
+        return self.status_bodies.get((department_id, language if language in LANGUAGES else "en"))
+
+
+_snapshot: Optional[Snapshot] = None
+_rebuild_lock = threading.Lock()
+_stats = {"rebuilds_total": 0, "last_rebuild_ms": 0.0}
+
+
+def _fresh(snapshot: Optional[Snapshot]) -> bool:
+    return (
+        snapshot is not None
+        and snapshot.key == versions.current(*_KEYS)
+        and time.monotonic() - snapshot.built_at < PUBLIC_SNAPSHOT_MAX_AGE_SECONDS
+    )
+
+
+def _build() -> Snapshot:
+    # Versions are read before the queries: a write committing meanwhile triggers another rebuild
+    snapshot = Snapshot(versions.current(*_KEYS), time.monotonic())
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        departments = db.query(Department.id, Department.name).order_by(Department.id).all()
+        coverage = coverage_by_department(db, start=now, end=now + timedelta(hours=WINDOW_HOURS))
+
+    snapshot.departments_body = Body([{"id": d.id, "name": d.name} for d in departments])
+    for d in departments:
+        pct = coverage.get(d.id, {}).get("coverage_pct", 0)
+        minutes = estimated_wait(pct)
+        snapshot.departments[d.id] = {"name": d.name, "coverage_pct": pct, "estimated_wait_min": minutes}
+        for language in LANGUAGES:
+            snapshot.status_bodies[(d.id, language)] = Body({
+                "department_id": d.id,
+                "department": d.name,
+                "coverage_pct": pct,
+                "estimated_wait_min": minutes,
+                "language": language,
+                "transcript": wait_time_text(d.name, minutes, language),
+            })
+    return snapshot
+
+
+def current() -> Optional[Snapshot]:
+    """The snapshot if it is up to date, else None (no I/O; safe on the event loop)."""
+    snapshot = _snapshot
+    return snapshot if _fresh(snapshot) else None
+
+
+def get() -> Snapshot:
+    """The up-to-date snapshot, rebuilding it if needed (blocking)."""
+    global _snapshot
+    snapshot = _snapshot
+    if _fresh(snapshot):
+        return snapshot
+    # Someone else is rebuilding: a slightly old snapshot beats queueing behind it
+    if not _rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if not _fresh(_snapshot):
+            t0 = time.perf_counter()
+            _snapshot = _build()
+            _stats["rebuilds_total"] += 1
+            _stats["last_rebuild_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return _snapshot
+    finally:
+        _rebuild_lock.release()
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    snapshot = _snapshot
+    return {
+        **_stats,
+        "departments": len(snapshot.departments) if snapshot else 0,
+        "age_seconds": round(time.monotonic() - snapshot.built_at, 1) if snapshot else None,
+        "fresh": _fresh(snapshot),
+    }
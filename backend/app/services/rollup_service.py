@@ -0,0 +1,207 @@
+"""
+MedRoster Weekly Load Rollup
+Keeps `user_weekly_load` (hours / shifts / night shifts per user per ISO week)
+in step with assignments. Every assignment write reaches `apply_assignment`
+through roster_hooks before its commit, so the rollup lands in the same
+transaction.
+
+A shift is attributed entirely to the ISO week in which it starts.
+Weeks that may hold archived shifts (see archive_service) are kept as-is:
+check and rebuild only cover weeks starting after the archive watermark.
+
+CLI (from backend/):
+    python -m app.services.rollup_service rebuild   # backfill from assignments
+    python -m app.services.rollup_service check     # report drift
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.database import upsert_insert
+from app.models.assignment import Assignment
+from app.models.shift import Shift
+from app.models.user_weekly_load import UserWeeklyLoad
+from app.services.workload_service import is_night_shift
+
+WeekKey = Tuple[int, int, int]  # (user_id, iso_year, iso_week)
+
+
+def _shift_contribution(shift: Shift) -> Tuple[int, int, float, int]:
+    iso_year, iso_week, _ = shift.start_time.isocalendar()
+    hours = (shift.end_time - shift.start_time).total_seconds() / 3600.0
+    return iso_year, iso_week, hours, int(is_night_shift(shift.start_time))
+
+
+def apply_assignment(db: Session, user_id: int, shift: Shift, delta: int = 1) -> None:
+    """
+    Add (delta=1) or remove (delta=-1) one assignment's contribution.
+    Atomic upsert, so concurrent writers to the same week never lose updates.
+    Does not commit — the caller's commit covers both the assignment and the rollup.
+    """
+    apply_assignments(db, [(user_id, shift)], delta)
+
+
+def apply_assignments(db: Session, items: List[Tuple[int, Shift]], delta: int = 1) -> None:
+    """Batch form of apply_assignment: one executemany upsert per call."""
+    totals: Dict[WeekKey, List[float]] = {}
+    for user_id, shift in items:
+        iso_year, iso_week, hours, night = _shift_contribution(shift)
+        acc = totals.setdefault((user_id, iso_year, iso_week), [0.0, 0, 0])
+        acc[0] += hours * delta
+        acc[1] += delta
+        acc[2] += night * delta
+    if not totals:
+        return
+
+    insert = upsert_insert(db)
+    stmt = insert(UserWeeklyLoad.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "iso_year", "iso_week"],
+        set_={
+            "hours": UserWeeklyLoad.hours + stmt.excluded.hours,
+            "shift_count": UserWeeklyLoad.shift_count + stmt.excluded.shift_count,
+            "night_count": UserWeeklyLoad.night_count + stmt.excluded.night_count,
+        },
+    )
+    db.execute(stmt, [
+        {
+            "user_id": user_id,
+            "iso_year": iso_year,
+            "iso_week": iso_week,
+            "hours": hours,
+            "shift_count": shifts,
+            "night_count": nights,
+        }
+        for (user_id, iso_year, iso_week), (hours, shifts, nights) in totals.items()
+    ])
+
+
+def get_weekly_load(db: Session, user_id: int, when: Optional[datetime] = None) -> Dict[str, Any]:
+    """Single indexed lookup of a user's load for the ISO week containing `when`."""
+    iso_year, iso_week, _ = (when or datetime.utcnow()).isocalendar()
+    row = (
+        db.query(UserWeeklyLoad)
+        .filter(
+            UserWeeklyLoad.user_id == user_id,
+            UserWeeklyLoad.iso_year == iso_year,
+            UserWeeklyLoad.iso_week == iso_week,
+        )
+        .first()
+    )
+    return {
+        "user_id": user_id,
+        "iso_year": iso_year,
+        "iso_week": iso_week,
+        "hours": round(row.hours, 2) if row else 0.0,
+        "shift_count": row.shift_count if row else 0,
+        "night_count": row.night_count if row else 0,
+    }
+
+
+def _live_weeks_start() -> Optional[datetime]:
+    """Monday 00:00 of the first ISO week entirely after the archive watermark (None = no archive)."""
+    from app.services.archive_service import archived_before
+
+    watermark = archived_before()
+    if watermark is None:
+        return None
+    monday = datetime.combine(watermark.date() - timedelta(days=watermark.weekday()), datetime.min.time())
+    return monday if monday == watermark else monday + timedelta(days=7)
+
+
+def _expected_rollup(db: Session, since: Optional[datetime] = None) -> Dict[WeekKey, List[float]]:
+    """Recompute the rollup from scratch (one streamed join over assignments)."""
+    totals: Dict[WeekKey, List[float]] = {}
+    rows = db.query(Assignment.user_id, Shift).join(Shift, Assignment.shift_id == Shift.id)
+    if since is not None:
+        rows = rows.filter(Shift.start_time >= since)
+    rows = rows.yield_per(5000)
+    for user_id, shift in rows:
+        iso_year, iso_week, hours, night = _shift_contribution(shift)
+        acc = totals.setdefault((user_id, iso_year, iso_week), [0.0, 0, 0])
+        acc[0] += hours
+        acc[1] += 1
+        acc[2] += night
+    return totals
+
+
+def rebuild_rollup(db: Session) -> int:
+    """Backfill: replace the rollup (post-archive weeks) in one transaction. Returns rows written."""
+    since = _live_weeks_start()
+    totals = _expected_rollup(db, since)
+    stale = db.query(UserWeeklyLoad)
+    if since is not None:
+        stale = stale.filter(
+            tuple_(UserWeeklyLoad.iso_year, UserWeeklyLoad.iso_week) >= tuple(since.isocalendar()[:2])
+        )
+    stale.delete(synchronize_session=False)
+    db.bulk_insert_mappings(UserWeeklyLoad, [
+        {
+            "user_id": user_id,
+            "iso_year": iso_year,
+            "iso_week": iso_week,
+            "hours": hours,
+            "shift_count": shifts,
+            "night_count": nights,
+        }
+        for (user_id, iso_year, iso_week), (hours, shifts, nights) in totals.items()
+    ])
+    db.commit()
+    return len(totals)
+
+
+def check_rollup(db: Session, tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+    """Compare the rollup against the assignments table. Empty list = consistent."""
+    since = _live_weeks_start()
+    expected = _expected_rollup(db, since)
+    live = db.query(UserWeeklyLoad)
+    if since is not None:
+        live = live.filter(
+            tuple_(UserWeeklyLoad.iso_year, UserWeeklyLoad.iso_week) >= tuple(since.isocalendar()[:2])
+        )
+    actual = {
+        (r.user_id, r.iso_year, r.iso_week): [r.hours, r.shift_count, r.night_count]
+        for r in live.all()
+    }
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        exp = expected.get(key, [0.0, 0, 0])
+        act = actual.get(key, [0.0, 0, 0])
+        if abs(exp[0] - act[0]) > tolerance or exp[1] != act[1] or exp[2] != act[2]:
+            user_id, iso_year, iso_week = key
+            mismatches.append({
+                "user_id": user_id,
+                "iso_year": iso_year,
+                "iso_week": iso_week,
+                "expected": {"hours": exp[0], "shift_count": exp[1], "night_count": exp[2]},
+                "actual": {"hours": act[0], "shift_count": act[1], "night_count": act[2]},
+            })
+    return sorted(mismatches, key=lambda m: (m["user_id"], m["iso_year"], m["iso_week"]))
+
+
+if __name__ == "__main__":
+    from app.database import Base, SessionLocal, engine
+    import app.models  # noqa: F401  (register tables)
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"[Rollup] Rebuilt {rebuild_rollup(db)} user-week rows")
+        elif command == "check":
+            mismatches = check_rollup(db)
+            for m in mismatches:
+                print(f"[Rollup] Drift: {m}")
+            print(f"[Rollup] {len(mismatches)} mismatched user-week rows")
+            sys.exit(1 if mismatches else 0)
+        else:
+            print("Usage: python -m app.services.rollup_service [rebuild|check]")
+            sys.exit(2)
+    finally:
+        db.close()
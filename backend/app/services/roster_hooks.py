@@ -0,0 +1,113 @@
+"""
+MedRoster Roster Write Hooks
+Every code path that creates or deletes shifts/assignments calls these before
+its commit, so the derived indexes (weekly load rollup, coverage gaps) change
+in the same transaction as the rows they summarize. Caches built from the
+roster (warm-standby plans) are invalidated, and the change is pushed to
+live subscribers (event_bus), once the transaction commits. Each write is
+also appended to the delta-sync change log (sync_service).
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import versions
+from app.database import on_commit
+from app.models.assignment import Assignment
+from app.models.shift import Shift
+from app.services import coverage_service, event_bus, rollup_service, standby_service, sync_service
+
+
+def roster_changed(db: Session) -> None:
+    """Staff, department or schedule changed: refresh roster-derived caches after commit."""
+    on_commit(db, standby_service.mark_dirty)
+
+
+def _publish(db: Session, topics: List[str], event: str, data: Dict[str, Any]) -> None:
+    # Values are captured now: rows are expired (and may be gone) after commit
+    on_commit(db, lambda: event_bus.publish(topics, event, data))
+
+
+def _shift_data(shift: Shift) -> Dict[str, Any]:
+    return {
+        "shift_id": shift.id,
+        "department_id": shift.department_id,
+        "start_time": shift.start_time,
+        "end_time": shift.end_time,
+        "required_role": shift.required_role,
+        "required_staff_count": shift.required_staff_count,
+    }
+
+
+def _assignment_changed(db: Session, event: str, user_id: int, shift: Shift, extra: Dict[str, Any]) -> None:
+    _publish(
+        db,
+        [event_bus.department_topic(shift.department_id), event_bus.user_topic(user_id)],
+        event,
+        {"user_id": user_id, "shift_id": shift.id, "department_id": shift.department_id,
+         "start_time": shift.start_time, "end_time": shift.end_time, **extra},
+    )
+
+
+def shift_added(db: Session, shift: Shift) -> None:
+    """Call after db.flush() so the shift has an id."""
+    coverage_service.add_shift(db, shift)
+    sync_service.record(db, sync_service.SHIFT, shift.id, sync_service.UPSERT, shift.department_id)
+    versions.bump_on_commit(db, versions.SHIFTS, versions.shifts_of(shift.department_id))
+    roster_changed(db)
+    _publish(db, [event_bus.department_topic(shift.department_id)], "shift.created", _shift_data(shift))
+
+
+def shift_removed(db: Session, shift: Shift) -> None:
+    coverage_service.remove_shift(db, shift.id)
+    sync_service.record(db, sync_service.SHIFT, shift.id, sync_service.DELETE, shift.department_id)
+    versions.bump_on_commit(db, versions.SHIFTS, versions.shifts_of(shift.department_id))
+    roster_changed(db)
+    _publish(db, [event_bus.department_topic(shift.department_id)], "shift.deleted", _shift_data(shift))
+
+
+def assignment_added(db: Session, assignment: Assignment, shift: Shift) -> None:
+    rollup_service.apply_assignment(db, assignment.user_id, shift, +1)
+    coverage_service.apply_assignment(db, shift.id, +1)
+    if assignment.id is None:
+        db.flush()
+    sync_service.record(db, sync_service.ASSIGNMENT, assignment.id, sync_service.UPSERT, shift.department_id)
+    versions.bump_on_commit(db, versions.ASSIGNMENTS)
+    roster_changed(db)
+    _assignment_changed(db, "assignment.created", assignment.user_id, shift,
+                        {"is_emergency": bool(assignment.is_emergency)})
+
+
+def assignments_added(db: Session, items: List[Tuple[int, Shift]], is_emergency: bool = False) -> None:
+    """Batch form of assignment_added over (user_id, shift) pairs: a constant number of statements."""
+    if not items:
+        return
+    rollup_service.apply_assignments(db, items, +1)
+    coverage_service.apply_assignments(db, [shift.id for _, shift in items], +1)
+    sync_service.record_assignment_pairs(db, [(user_id, shift.id) for user_id, shift in items])
+    versions.bump_on_commit(db, versions.ASSIGNMENTS)
+    roster_changed(db)
+    for user_id, shift in items:
+        _assignment_changed(db, "assignment.created", user_id, shift, {"is_emergency": is_emergency})
+
+
+def assignment_removed(db: Session, assignment: Assignment, shift: Shift) -> None:
+    rollup_service.apply_assignment(db, assignment.user_id, shift, -1)
+    coverage_service.apply_assignment(db, shift.id, -1)
+    sync_service.record(db, sync_service.ASSIGNMENT, assignment.id, sync_service.DELETE, shift.department_id)
+    versions.bump_on_commit(db, versions.ASSIGNMENTS)
+    roster_changed(db)
+    _assignment_changed(db, "assignment.deleted", assignment.user_id, shift,
+                        {"assignment_id": assignment.id})
+
+
+def backfill_if_missing(db: Session) -> None:
+    """First start after upgrading: build derived tables that are empty but shouldn't be."""
+    from app.models.shift_coverage import ShiftCoverage
+    from app.models.user_weekly_load import UserWeeklyLoad
+
+    if db.query(ShiftCoverage.shift_id).first() is None and db.query(Shift.id).first() is not None:
+        print(f"[Roster] Indexed coverage for {coverage_service.rebuild_coverage(db)} shifts")
+    if db.query(UserWeeklyLoad.id).first() is None and db.query(Assignment.id).first() is not None:
+        print(f"[Roster] Rebuilt {rollup_service.rebuild_rollup(db)} weekly load rows")
@@ -0,0 +1,320 @@
+"""
+MedRoster Safety Mode
+Persisted burnout policy enforced on every assignment write.
+
+An assignment is "critical" when the staff member's projected burnout score
+(see workload_service.burnout_scores) for the 7 days ending with that shift
+reaches the policy threshold. With block_critical on, critical writes are
+rejected; otherwise they are only reported.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app.models.assignment import Assignment
+from app.models.safety_policy import SafetyPolicy
+from app.models.shift import Shift
+from app.models.user import User
+from app.services.workload_service import (
+    MIN_REST_HOURS,
+    NIGHT_END_HOUR,
+    NIGHT_START_HOUR,
+    burnout_scores,
+)
+
+ROLLING_DAYS = 7
+POLICY_ID = 1
+
+# Policy is read on every assignment write; keep it in memory briefly so
+# enforcement does not add a query. Other workers pick up changes within the TTL.
+POLICY_CACHE_TTL_SECONDS = 5.0
+_policy_cache: Dict[str, Any] = {"policy": None, "loaded_at": 0.0}
+
+
+def _policy_dict(row: Optional[SafetyPolicy]) -> Dict[str, Any]:
+    if row is None:
+        return {"enabled": False, "burnout_threshold": 70, "block_critical": False,
+                "updated_by": None, "updated_at": None}
+    return {
+        "enabled": bool(row.enabled),
+        "burnout_threshold": row.burnout_threshold,
+        "block_critical": bool(row.block_critical),
+        "updated_by": row.updated_by,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def get_policy(db: Session) -> Dict[str, Any]:
+    cached = _policy_cache["policy"]
+    if cached is not None and time.monotonic() - _policy_cache["loaded_at"] < POLICY_CACHE_TTL_SECONDS:
+        return cached
+    policy = _policy_dict(db.query(SafetyPolicy).filter(SafetyPolicy.id == POLICY_ID).first())
+    _policy_cache.update(policy=policy, loaded_at=time.monotonic())
+    return policy
+
+
+def set_policy(
+    db: Session,
+    burnout_threshold: int,
+    block_critical: bool,
+    enabled: bool,
+    updated_by: str,
+) -> Dict[str, Any]:
+    row = db.query(SafetyPolicy).filter(SafetyPolicy.id == POLICY_ID).first()
+    if row is None:
+        row = SafetyPolicy(id=POLICY_ID)
+        db.add(row)
+    row.enabled = enabled
+    row.burnout_threshold = burnout_threshold
+    row.block_critical = block_critical
+    row.updated_by = updated_by
+    row.updated_at = datetime.utcnow()
+    db.commit()
+
+    policy = _policy_dict(row)
+    _policy_cache.update(policy=policy, loaded_at=time.monotonic())
+    return policy
+
+
+# -----------------------------
+# Rolling load (vectorized)
+# -----------------------------
+def _rolling_metrics(uid: np.ndarray, s: np.ndarray, e: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    For every shift (rows sorted by user, start): load over the shifts of the
+    same user starting in the ROLLING_DAYS up to and including it, plus the
+    rest before/after it and the run of consecutive days ending on its day.
+    """
+    n = len(uid)
+    start_s = s.astype(np.int64)
+    end_s = e.astype(np.int64)
+
+    # Offset each user onto its own stretch of the time axis so one global
+    # searchsorted finds window starts without crossing user boundaries.
+    span = int(start_s.max() - start_s.min()) + 10 * 86400 * ROLLING_DAYS
+    keyed = (uid - uid.min()) * span + (start_s - start_s.min())
+    window_lo = np.searchsorted(keyed, keyed - (ROLLING_DAYS * 86400 - 1), side="left")
+    idx = np.arange(n)
+
+    duration_h = (end_s - start_s) / 3600.0
+    hour_of_day = (s.astype("datetime64[h]") - s.astype("datetime64[D]")).astype(np.int64)
+    night = ((hour_of_day >= NIGHT_START_HOUR) | (hour_of_day < NIGHT_END_HOUR)).astype(np.int64)
+
+    cum_hours = np.r_[0.0, np.cumsum(duration_h)]
+    cum_nights = np.r_[0, np.cumsum(night)]
+    hours = cum_hours[idx + 1] - cum_hours[window_lo]
+    shifts = idx + 1 - window_lo
+    nights = cum_nights[idx + 1] - cum_nights[window_lo]
+
+    same_prev = np.r_[False, uid[1:] == uid[:-1]]
+    same_next = np.r_[uid[1:] == uid[:-1], False]
+    rest_before = np.full(n, np.inf)
+    rest_after = np.full(n, np.inf)
+    rest_before[1:] = (start_s[1:] - end_s[:-1]) / 3600.0
+    rest_after[:-1] = (start_s[1:] - end_s[:-1]) / 3600.0
+    rest_before[~same_prev] = np.inf
+    rest_after[~same_next] = np.inf
+
+    # Position within the run of consecutive calendar days, per shift
+    day = s.astype("datetime64[D]").astype(np.int64)
+    new_day = np.r_[True, (uid[1:] != uid[:-1]) | (day[1:] != day[:-1])]
+    d_pos = np.cumsum(new_day) - 1                # shift → distinct (user, day) index
+    d_uid, d_day = uid[new_day], day[new_day]
+    run_break = np.r_[True, (d_uid[1:] != d_uid[:-1]) | (np.diff(d_day) != 1)]
+    run_start = np.maximum.accumulate(np.where(run_break, np.arange(len(d_day)), 0))
+    consecutive = (np.arange(len(d_day)) - run_start + 1)[d_pos]
+
+    min_rest = np.minimum(rest_before, rest_after)
+    scores = burnout_scores(hours, shifts, nights, consecutive, min_rest, window_days=ROLLING_DAYS)
+
+    return {
+        "hours": hours,
+        "shifts": shifts,
+        "nights": nights,
+        "consecutive_days": consecutive,
+        "rest_before": rest_before,
+        "rest_after": rest_after,
+        "burnout_score": scores,
+    }
+
+
+def _hours_or_none(value: float) -> Optional[float]:
+    return round(float(value), 2) if np.isfinite(value) else None
+
+
+def _reasons(m: Dict[str, np.ndarray], i: int) -> List[str]:
+    reasons = []
+    if m["rest_before"][i] < 0 or m["rest_after"][i] < 0:
+        reasons.append("overlaps another assigned shift")
+    elif min(m["rest_before"][i], m["rest_after"][i]) < MIN_REST_HOURS:
+        reasons.append(f"less than {MIN_REST_HOURS}h rest between shifts")
+    reasons.append(f"{round(float(m['hours'][i]), 1)}h over the last {ROLLING_DAYS} days")
+    return reasons
+
+
+def _evaluation(m: Dict[str, np.ndarray], i: int, policy: Dict[str, Any]) -> Dict[str, Any]:
+    score = int(m["burnout_score"][i])
+    critical = policy["enabled"] and score >= policy["burnout_threshold"]
+    return {
+        "burnout_score": score,
+        "rolling_hours": round(float(m["hours"][i]), 2),
+        "rolling_shifts": int(m["shifts"][i]),
+        "rest_before_hours": _hours_or_none(m["rest_before"][i]),
+        "rest_after_hours": _hours_or_none(m["rest_after"][i]),
+        "critical": bool(critical),
+        "blocked": bool(critical and policy["block_critical"]),
+        "reasons": _reasons(m, i) if critical else [],
+    }
+
+
+# -----------------------------
+# Enforcement
+# -----------------------------
+# Prebuilt so the per-write lookup skips ORM query construction (~0.1 ms query)
+_USER_SHIFTS_NEAR = (
+    select(Shift.start_time, Shift.end_time)
+    .join(Assignment, Assignment.shift_id == Shift.id)
+    .where(
+        Assignment.user_id == bindparam("user_id"),
+        Shift.id != bindparam("shift_id"),
+        Shift.start_time < bindparam("hi"),
+        Shift.end_time > bindparam("lo"),
+    )
+)
+
+
+def check_assignment(
+    db: Session,
+    user_id: int,
+    shift: Shift,
+    policy: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Evaluate a prospective assignment against Safety Mode.
+    Returns None when Safety Mode is off (no query is made), otherwise an
+    evaluation dict whose "blocked" flag the caller must honour.
+    """
+    policy = policy or get_policy(db)
+    if not policy["enabled"]:
+        return None
+
+    rows = db.execute(_USER_SHIFTS_NEAR, {
+        "user_id": user_id,
+        "shift_id": shift.id,
+        "lo": shift.start_time - timedelta(days=ROLLING_DAYS),
+        "hi": shift.end_time + timedelta(days=ROLLING_DAYS),
+    }).all()
+
+    intervals = sorted([(r[0], r[1]) for r in rows] + [(shift.start_time, shift.end_time)])
+    candidate = intervals.index((shift.start_time, shift.end_time))
+    uid = np.full(len(intervals), user_id, dtype=np.int64)
+    s = np.array([iv[0] for iv in intervals], dtype="datetime64[s]")
+    e = np.array([iv[1] for iv in intervals], dtype="datetime64[s]")
+
+    evaluation = _evaluation(_rolling_metrics(uid, s, e), candidate, policy)
+    evaluation.update(user_id=user_id, shift_id=shift.id)
+    return evaluation
+
+
+def check_assignments(
+    db: Session,
+    user_ids: List[int],
+    shift: Shift,
+    policy: Optional[Dict[str, Any]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Batch form of check_assignment for many staff joining the same shift:
+    one query and one vectorized pass. Empty dict when Safety Mode is off.
+    """
+    policy = policy or get_policy(db)
+    if not policy["enabled"] or not user_ids:
+        return {}
+
+    rows = (
+        db.query(Assignment.user_id, Shift.start_time, Shift.end_time)
+        .join(Shift, Assignment.shift_id == Shift.id)
+        .filter(
+            Assignment.user_id.in_(set(user_ids)),
+            Shift.id != shift.id,
+            Shift.start_time < shift.end_time + timedelta(days=ROLLING_DAYS),
+            Shift.end_time > shift.start_time - timedelta(days=ROLLING_DAYS),
+        )
+        .all()
+    )
+    # (user, start, end, is_candidate); the candidate sorts after an identical existing interval
+    intervals = [(r[0], r[1], r[2], False) for r in rows]
+    intervals += [(u, shift.start_time, shift.end_time, True) for u in set(user_ids)]
+    intervals.sort()
+
+    uid = np.fromiter((iv[0] for iv in intervals), dtype=np.int64, count=len(intervals))
+    s = np.array([iv[1] for iv in intervals], dtype="datetime64[s]")
+    e = np.array([iv[2] for iv in intervals], dtype="datetime64[s]")
+    m = _rolling_metrics(uid, s, e)
+
+    results = {}
+    for i, iv in enumerate(intervals):
+        if iv[3]:
+            evaluation = _evaluation(m, i, policy)
+            evaluation.update(user_id=iv[0], shift_id=shift.id)
+            results[iv[0]] = evaluation
+    return results
+
+
+def find_blocked_assignments(
+    db: Session,
+    policy: Optional[Dict[str, Any]] = None,
+    horizon_days: int = 14,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Every upcoming assignment (shift starting within horizon_days) that is
+    critical under the policy — one query and one vectorized pass over all staff.
+    """
+    policy = policy or get_policy(db)
+    if not policy["enabled"]:
+        return []
+
+    now = now or datetime.utcnow()
+    lo = now - timedelta(days=ROLLING_DAYS)
+    hi = now + timedelta(days=horizon_days)
+    rows = (
+        db.query(
+            Assignment.id, Assignment.user_id, Assignment.shift_id,
+            Shift.start_time, Shift.end_time, Shift.department_id, User.name,
+        )
+        .join(Shift, Assignment.shift_id == Shift.id)
+        .join(User, Assignment.user_id == User.id)
+        .filter(Shift.start_time < hi, Shift.end_time > lo)
+        .order_by(Assignment.user_id, Shift.start_time)
+        .all()
+    )
+    if not rows:
+        return []
+
+    uid = np.fromiter((r.user_id for r in rows), dtype=np.int64, count=len(rows))
+    s = np.array([r.start_time for r in rows], dtype="datetime64[s]")
+    e = np.array([r.end_time for r in rows], dtype="datetime64[s]")
+    m = _rolling_metrics(uid, s, e)
+
+    upcoming = s >= np.datetime64(now, "s")
+    critical = np.flatnonzero(upcoming & (m["burnout_score"] >= policy["burnout_threshold"]))
+
+    blocked = []
+    for i in critical:
+        r = rows[i]
+        evaluation = _evaluation(m, i, policy)
+        evaluation.update(
+            assignment_id=r.id,
+            user_id=r.user_id,
+            staff_name=r.name,
+            shift_id=r.shift_id,
+            department_id=r.department_id,
+            start_time=r.start_time.isoformat(),
+        )
+        blocked.append(evaluation)
+    return blocked
@@ -0,0 +1,95 @@
+"""
+MedRoster Staff Resolver
+Maps staff references from AI plans ("Dr. Jane Smith", "smith, jane", "Jane Smyth")
+back to roster entries through prebuilt id / normalized-name indexes, with
+a fuzzy fallback for LLM spelling variations.
+"""
+
+import difflib
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Titles the model likes to add or drop
+_HONORIFICS = {"dr", "doctor", "nurse", "rn", "md", "np", "pa", "mr", "mrs", "ms", "miss", "prof"}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+FUZZY_CUTOFF = 0.85
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents, punctuation and titles, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    tokens = [t for t in _NON_ALNUM.sub(" ", text).split() if t not in _HONORIFICS]
+    return " ".join(tokens)
+
+
+def _token_key(normalized: str) -> str:
+    return " ".join(sorted(normalized.split()))
+
+
+class StaffIndex:
+    """Read-only lookup over a staff list (dicts with at least "id" and "name")."""
+
+    def __init__(self, staff: List[Dict[str, Any]]):
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_name: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_tokens: Dict[str, List[Dict[str, Any]]] = {}
+        for s in staff:
+            self.by_id[s["id"]] = s
+            norm = normalize_name(s.get("name", ""))
+            self.by_name.setdefault(norm, []).append(s)
+            self.by_tokens.setdefault(_token_key(norm), []).append(s)
+        # Fuzzy candidates are limited to names sharing at least one token
+        self._keys_by_token: Dict[str, List[str]] = {}
+        for key in self.by_tokens:
+            for token in set(key.split()):
+                self._keys_by_token.setdefault(token, []).append(key)
+        self._all_keys = list(self.by_tokens.keys())
+
+    def _fuzzy_candidates(self, key: str) -> List[str]:
+        candidates = {k for token in key.split() for k in self._keys_by_token.get(token, ())}
+        return list(candidates) if candidates else self._all_keys
+
+    def resolve(
+        self,
+        name: Optional[str],
+        staff_id: Optional[Any] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Returns (staff, how) where how is one of
+        "id", "exact", "token", "fuzzy", "ambiguous", "unmatched".
+        """
+        if staff_id is not None:
+            try:
+                hit = self.by_id.get(int(staff_id))
+            except (TypeError, ValueError):
+                hit = None
+            if hit is not None:
+                return hit, "id"
+
+        norm = normalize_name(name or "")
+        if not norm:
+            return None, "unmatched"
+
+        for index, key, how in (
+            (self.by_name, norm, "exact"),
+            (self.by_tokens, _token_key(norm), "token"),
+        ):
+            hits = index.get(key)
+            if hits:
+                return (hits[0], how) if len(hits) == 1 else (None, "ambiguous")
+
+        key = _token_key(norm)
+        close = difflib.get_close_matches(key, self._fuzzy_candidates(key), n=2, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return None, "unmatched"
+        hits = self.by_tokens[close[0]]
+        if len(hits) > 1 or (len(close) > 1 and _similarity(close[0], norm) == _similarity(close[1], norm)):
+            return None, "ambiguous"
+        return hits[0], "fuzzy"
+
+
+def _similarity(key: str, norm: str) -> float:
+    return difflib.SequenceMatcher(None, key, _token_key(norm)).ratio()
@@ -0,0 +1,219 @@
+"""
+MedRoster Warm-Standby Emergency Plans
+A background refresher keeps a ready-to-execute reallocation plan for every
+department: the shift to reinforce, ranked reassignable on-duty staff,
+a ranked call-in list and the fallback announcement. Red Alert reads the
+plan instead of rebuilding the staffing snapshot and only asks GPT-4o to
+refine it.
+
+Plans are recomputed shortly after any committed roster change and every
+STANDBY_REFRESH_SECONDS regardless (on-duty status changes as shifts start
+and end, without any write).
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import STANDBY_REFRESH_SECONDS
+from app.database import SessionLocal
+from app.models.department import Department
+from app.models.shift import Shift
+from app.models.shift_coverage import ShiftCoverage
+from app.models.user_weekly_load import UserWeeklyLoad
+
+# Coalesce bursts of writes into one recompute
+DEBOUNCE_SECONDS = 0.5
+
+ANNOUNCEMENT_TEMPLATE = (
+    "Attention staff. {emergency_type} reported. "
+    "Additional support is needed in {department}. "
+    "Please check the dashboard for reassignment instructions."
+)
+
+_lock = threading.Lock()
+_plans: Dict[int, Dict[str, Any]] = {}
+_dirty = True
+_wake = threading.Event()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _weekly_hours(db: Session, now: datetime) -> Dict[int, float]:
+    iso_year, iso_week, _ = now.isocalendar()
+    rows = (
+        db.query(UserWeeklyLoad.user_id, UserWeeklyLoad.hours)
+        .filter(UserWeeklyLoad.iso_year == iso_year, UserWeeklyLoad.iso_week == iso_week)
+        .all()
+    )
+    return {user_id: hours for user_id, hours in rows}
+
+
+def compute_plans(
+    db: Session,
+    now: Optional[datetime] = None,
+    department_ids: Optional[List[int]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Build plans for all (or the given) departments from one staffing snapshot."""
+    # Imported here: emergency_service reads plans from this module
+    from app.services.emergency_service import build_staffing_snapshot
+    from app.services.coverage_service import pick_target_shift
+
+    now = now or datetime.utcnow()
+    on_duty, off_duty = build_staffing_snapshot(db, now)
+    hours = _weekly_hours(db, now)
+
+    on_duty_by_dept: Dict[int, List[Dict[str, Any]]] = {}
+    for s in on_duty:
+        on_duty_by_dept.setdefault(s["current_department_id"], []).append(s)
+
+    departments = db.query(Department.id, Department.name)
+    if department_ids is not None:
+        departments = departments.filter(Department.id.in_(department_ids))
+
+    plans = {}
+    for dept_id, dept_name in departments.all():
+        target_id = pick_target_shift(db, dept_id, now)
+        target = None
+        if target_id:
+            target = (
+                db.query(Shift.id, Shift.required_role, ShiftCoverage.open_slots)
+                .join(ShiftCoverage, ShiftCoverage.shift_id == Shift.id)
+                .filter(Shift.id == target_id)
+                .first()
+            )
+        role_needed = target.required_role if target else None
+
+        def rank(s):
+            # Matching role first, then whoever has worked least this week
+            return (s["role"] != role_needed, hours.get(s["id"], 0.0), s["id"])
+
+        # Keep at least one person in every other department
+        reassignable = []
+        for other_dept, staff in on_duty_by_dept.items():
+            if other_dept == dept_id:
+                continue
+            reassignable.extend(sorted(staff, key=rank)[: max(len(staff) - 1, 0)])
+        reassignable.sort(key=rank)
+
+        call_in = sorted(off_duty, key=rank)
+
+        plans[dept_id] = {
+            "department_id": dept_id,
+            "department_name": dept_name,
+            "computed_at": now.isoformat(),
+            "computed_monotonic": time.monotonic(),
+            "target_shift_id": target.id if target else None,
+            "target_role": role_needed,
+            "open_slots": max(target.open_slots, 0) if target else 0,
+            "on_duty": on_duty,
+            "off_duty": off_duty,
+            "reassignable": [
+                {**s, "hours_this_week": round(hours.get(s["id"], 0.0), 2)} for s in reassignable
+            ],
+            "call_in": [
+                {**s, "hours_this_week": round(hours.get(s["id"], 0.0), 2)} for s in call_in
+            ],
+            "announcement_template": ANNOUNCEMENT_TEMPLATE.replace("{department}", dept_name),
+        }
+    return plans
+
+
+def reallocation_plan(plan: Dict[str, Any], emergency_type: str) -> Dict[str, Any]:
+    """Turn a standby plan into an executable plan (same shape as the GPT-4o plan)."""
+    needed = max(plan["open_slots"], 1)
+    return {
+        "immediate_reassignments": [
+            {
+                "staff_id": s["id"],
+                "staff_name": s["name"],
+                "from_department": s.get("current_department", "Unknown"),
+                "to_department": plan["department_name"],
+                "urgency": "immediate",
+            }
+            for s in plan["reassignable"][:needed]
+        ],
+        "call_in_requests": [
+            {
+                "staff_name": s["name"],
+                "role": s["role"],
+                "reason": f"Standby call-in ({s['hours_this_week']}h worked this week)",
+            }
+            for s in plan["call_in"][:needed]
+        ],
+        "estimated_coverage_minutes": 15,
+        "critical_warning": "",
+        "voice_announcement": plan["announcement_template"].replace("{emergency_type}", emergency_type),
+    }
+
+
+def refresh() -> None:
+    """Recompute every department's plan now."""
+    global _dirty
+    with _lock:
+        _dirty = False
+    db = SessionLocal()
+    try:
+        plans = compute_plans(db)
+    except Exception as e:
+        print(f"[Standby] Refresh failed: {e}")
+        with _lock:
+            _dirty = True
+        return
+    finally:
+        db.close()
+    with _lock:
+        _plans.clear()
+        _plans.update(plans)
+
+
+def mark_dirty() -> None:
+    """Roster changed — plans are stale until the refresher catches up."""
+    global _dirty
+    with _lock:
+        _dirty = True
+    _wake.set()
+
+
+def get_plan(department_id: int, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """The current plan for a department, or None if missing or stale."""
+    max_age = STANDBY_REFRESH_SECONDS * 2 if max_age_seconds is None else max_age_seconds
+    with _lock:
+        if _dirty:
+            return None
+        plan = _plans.get(department_id)
+    if plan is None or time.monotonic() - plan["computed_monotonic"] > max_age:
+        return None
+    return plan
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        _wake.wait(timeout=STANDBY_REFRESH_SECONDS)
+        if _stop.is_set():
+            break
+        if _wake.is_set():
+            _wake.clear()
+            time.sleep(DEBOUNCE_SECONDS)
+            _wake.clear()
+        refresh()
+
+
+def start() -> None:
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _wake.set()  # build plans right away
+    _thread = threading.Thread(target=_run, name="standby-plans", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    _stop.set()
+    _wake.set()
+    if _thread:
+        _thread.join(timeout=5)
@@ -0,0 +1,155 @@
+"""
+MedRoster Delta Sync
+Every shift/assignment write appends to change_log in the same transaction
+(via roster_hooks), so `seq` order is commit order: SQLite admits one
+writer at a time, and a transaction's entries become visible together.
+Deletions are logged as tombstones.
+
+GET /sync?since=<seq> replays the log after `since`: the latest op per row
+wins, upserts are returned as current rows (two IN queries), deletions as
+ids. A client without a cursor, or whose cursor predates what the log still
+holds, gets a full snapshot flagged `reset`. seq 0 is a valid cursor ("before
+the first entry"), so a snapshot taken before any write can be followed up.
+
+The log is pruned along with archival (entries older than the archive
+cutoff); the newest entry is always kept so the sequence stays anchored.
+Archived rows leave no tombstones: they ended before the horizon.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.assignment import Assignment
+from app.models.change_log import ChangeLog
+from app.models.shift import Shift
+
+SHIFT = "shift"
+ASSIGNMENT = "assignment"
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Log entries replayed per response; clients follow `has_more`
+PAGE_SIZE = 5000
+
+
+# ── Recording ─────────────────────────────────────────────────────────────
+
+def record(db: Session, entity: str, entity_id: int, op: str, department_id: Optional[int]) -> None:
+    db.execute(insert(ChangeLog), [{
+        "entity": entity,
+        "entity_id": entity_id,
+        "op": op,
+        "department_id": department_id,
+        "changed_at": datetime.utcnow(),
+    }])
+
+
+def record_assignment_pairs(db: Session, pairs: Iterable[Tuple[int, int]]) -> None:
+    """Log upserts for assignments identified by (user_id, shift_id), in one INSERT … SELECT."""
+    pairs = list(pairs)
+    if not pairs:
+        return
+    source = (
+        select(
+            literal(ASSIGNMENT), Assignment.id, literal(UPSERT), Shift.department_id, literal(datetime.utcnow()),
+        )
+        .join(Shift, Shift.id == Assignment.shift_id)
+        .where(tuple_(Assignment.user_id, Assignment.shift_id).in_(pairs))
+        .order_by(Assignment.id)
+    )
+    db.execute(
+        insert(ChangeLog).from_select(["entity", "entity_id", "op", "department_id", "changed_at"], source)
+    )
+
+
+def prune(db: Session, before: datetime) -> int:
+    """Drop entries older than `before`, keeping the newest. Does not commit."""
+    newest = db.scalar(select(func.max(ChangeLog.seq)))
+    if newest is None:
+        return 0
+    result = db.execute(
+        delete(ChangeLog).where(ChangeLog.changed_at < before, ChangeLog.seq < newest)
+    )
+    return result.rowcount or 0
+
+
+# ── Reading ───────────────────────────────────────────────────────────────
+
+def _shift_rows(db: Session, where) -> List[Dict[str, Any]]:
+    return [dict(r) for r in db.execute(select(Shift.__table__).where(where).order_by(Shift.id)).mappings()]
+
+
+def _assignment_rows(db: Session, where) -> List[Dict[str, Any]]:
+    table = Assignment.__table__
+    query = select(table).where(where).order_by(table.c.id)
+    return [dict(r) for r in db.execute(query).mappings()]
+
+
+def _snapshot(db: Session, department_id: Optional[int], seq: int) -> Dict[str, Any]:
+    if department_id is None:
+        shifts = _shift_rows(db, true())
+        assignments = _assignment_rows(db, true())
+    else:
+        shifts = _shift_rows(db, Shift.department_id == department_id)
+        shift_ids = select(Shift.id).where(Shift.department_id == department_id)
+        assignments = _assignment_rows(db, Assignment.shift_id.in_(shift_ids))
+    return {
+        "seq": seq,
+        "reset": True,
+        "has_more": False,
+        "shifts": shifts,
+        "assignments": assignments,
+        "deleted": {"shifts": [], "assignments": []},
+    }
+
+
+def changes_since(
+    db: Session,
+    since: Optional[int],
+    department_id: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+) -> Dict[str, Any]:
+    """Rows changed after `since` (or a full snapshot if there is no cursor, or it is unknown or pruned)."""
+    newest, oldest = db.execute(select(func.max(ChangeLog.seq), func.min(ChangeLog.seq))).one()
+    newest, oldest = newest or 0, oldest or 1
+    if since is None or since > newest or since < oldest - 1:
+        # Read the cursor first: anything committed during the snapshot is replayed next time
+        return _snapshot(db, department_id, newest)
+
+    query = select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op).where(ChangeLog.seq > since)
+    if department_id is not None:
+        query = query.where(ChangeLog.department_id == department_id)
+    entries = db.execute(query.order_by(ChangeLog.seq).limit(limit + 1)).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest: Dict[Tuple[str, int], str] = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry.op
+
+    def ids(entity: str, op: str) -> List[int]:
+        return sorted(eid for (ent, eid), o in latest.items() if ent == entity and o == op)
+
+    shift_ids, assignment_ids = ids(SHIFT, UPSERT), ids(ASSIGNMENT, UPSERT)
+    shifts = _shift_rows(db, Shift.id.in_(shift_ids)) if shift_ids else []
+    assignments = _assignment_rows(db, Assignment.id.in_(assignment_ids)) if assignment_ids else []
+    # A row logged as upserted but gone now was deleted by a later entry not yet replayed
+    deleted_shifts = set(ids(SHIFT, DELETE)) | (set(shift_ids) - {s["id"] for s in shifts})
+    deleted_assignments = set(ids(ASSIGNMENT, DELETE)) | (set(assignment_ids) - {a["id"] for a in assignments})
+
+    if has_more:
+        seq = entries[-1].seq
+    else:
+        # Caught up: every entry up to the head read above was seen (other departments' included)
+        seq = max(entries[-1].seq if entries else 0, newest)
+    return {
+        "seq": seq,
+        "reset": False,
+        "has_more": has_more,
+        "shifts": shifts,
+        "assignments": assignments,
+        "deleted": {"shifts": sorted(deleted_shifts), "assignments": sorted(deleted_assignments)},
+    }
@@ -0,0 +1,231 @@
+"""
+MedRoster Workload Analytics
+Derives per-staff workload metrics straight from Assignment/Shift rows:
+hours, shift count, night shifts, longest run of consecutive days and the
+shortest rest gap between shifts, plus a 0-100 burnout score.
+
+All staff in a window are computed in one pass: a single interval query
+sorted by (user, start) and NumPy group-wise reductions over the result.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.shift import Shift
+from app.models.assignment import Assignment
+
+# Hospital guidelines (also quoted in the LLM prompt)
+MAX_WEEKLY_HOURS = 48
+MAX_WEEKLY_SHIFTS = 6
+MAX_CONSECUTIVE_DAYS = 6
+MIN_REST_HOURS = 11
+
+# A shift starting at or after 19:00 or before 07:00 counts as a night shift
+NIGHT_START_HOUR = 19
+NIGHT_END_HOUR = 7
+
+HIGH_RISK_SCORE = 70
+MODERATE_RISK_SCORE = 40
+
+
+def is_night_shift(start_time: datetime) -> bool:
+    return start_time.hour >= NIGHT_START_HOUR or start_time.hour < NIGHT_END_HOUR
+
+
+def current_week_window(now: Optional[datetime] = None) -> tuple:
+    """Monday 00:00 → next Monday 00:00 (UTC) around `now`."""
+    now = now or datetime.utcnow()
+    monday = datetime(now.year, now.month, now.day) - timedelta(days=now.weekday())
+    return monday, monday + timedelta(days=7)
+
+
+def _load_intervals(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    user_ids: Optional[List[int]] = None,
+):
+    """One query: every assigned shift overlapping [start, end), sorted by user then start."""
+    q = (
+        db.query(Assignment.user_id, Shift.start_time, Shift.end_time)
+        .join(Shift, Assignment.shift_id == Shift.id)
+        .filter(Shift.start_time < end, Shift.end_time > start)
+    )
+    if user_ids is not None:
+        q = q.filter(Assignment.user_id.in_(user_ids))
+    rows = q.order_by(Assignment.user_id, Shift.start_time).all()
+
+    uid = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    s = np.array([r[1] for r in rows], dtype="datetime64[s]")
+    e = np.array([r[2] for r in rows], dtype="datetime64[s]")
+    return uid, s, e
+
+
+def _group_metrics(
+    uid: np.ndarray,
+    s: np.ndarray,
+    e: np.ndarray,
+    start: datetime,
+    end: datetime,
+) -> Dict[int, Dict[str, float]]:
+    """Vectorized per-user reductions over intervals sorted by (uid, start)."""
+    n = len(uid)
+    if n == 0:
+        return {}
+
+    w_start = np.datetime64(start, "s")
+    w_end = np.datetime64(end, "s")
+
+    # Group boundaries (rows are already sorted by user)
+    bounds = np.r_[0, np.flatnonzero(uid[1:] != uid[:-1]) + 1]
+    users = uid[bounds]
+
+    # Hours, clipped to the window
+    clipped = (np.minimum(e, w_end) - np.maximum(s, w_start)).astype(np.int64)
+    hours = np.add.reduceat(np.clip(clipped, 0, None), bounds) / 3600.0
+
+    shift_counts = np.diff(np.r_[bounds, n])
+
+    hour_of_day = (s.astype("datetime64[h]") - s.astype("datetime64[D]")).astype(np.int64)
+    is_night = (hour_of_day >= NIGHT_START_HOUR) | (hour_of_day < NIGHT_END_HOUR)
+    nights = np.add.reduceat(is_night.astype(np.int64), bounds)
+
+    # Rest gap before each shift; +inf at the first shift of every user
+    same_user = np.r_[False, uid[1:] == uid[:-1]]
+    gaps = np.full(n, np.inf)
+    gaps[1:] = (s[1:] - e[:-1]).astype(np.int64) / 3600.0
+    gaps[~same_user] = np.inf
+    min_rest = np.minimum.reduceat(gaps, bounds)
+
+    # Longest run of consecutive calendar days with a shift start
+    day = s.astype("datetime64[D]").astype(np.int64)
+    keep = np.r_[True, (uid[1:] != uid[:-1]) | (day[1:] != day[:-1])]
+    d_uid, d_day = uid[keep], day[keep]
+    run_break = np.r_[True, (d_uid[1:] != d_uid[:-1]) | (np.diff(d_day) != 1)]
+    run_len = np.bincount(np.cumsum(run_break) - 1)
+    run_uid = d_uid[run_break]
+    run_bounds = np.r_[0, np.flatnonzero(run_uid[1:] != run_uid[:-1]) + 1]
+    consecutive = np.maximum.reduceat(run_len, run_bounds)
+
+    return {
+        int(u): {
+            "hours": float(h),
+            "shifts": int(c),
+            "nights": int(nt),
+            "consecutive_days": int(cd),
+            "min_rest_hours": float(mr),
+        }
+        for u, h, c, nt, cd, mr in zip(users, hours, shift_counts, nights, consecutive, min_rest)
+    }
+
+
+def burnout_scores(
+    hours: np.ndarray,
+    shifts: np.ndarray,
+    nights: np.ndarray,
+    consecutive_days: np.ndarray,
+    min_rest_hours: np.ndarray,
+    window_days: float = 7.0,
+) -> np.ndarray:
+    """0-100 burnout score per staff member, normalized to a 7-day week."""
+    per_week = 7.0 / max(window_days, 1.0)
+    hours_ratio = np.clip(hours * per_week / MAX_WEEKLY_HOURS, 0, 1.5) / 1.5
+    shifts_ratio = np.clip(shifts * per_week / MAX_WEEKLY_SHIFTS, 0, 1.5) / 1.5
+    night_ratio = np.divide(nights, shifts, out=np.zeros(len(shifts)), where=shifts > 0)
+    consec_ratio = np.clip(consecutive_days / MAX_CONSECUTIVE_DAYS, 0, 1)
+    rest = np.where(np.isfinite(min_rest_hours), min_rest_hours, MIN_REST_HOURS)
+    rest_penalty = np.clip((MIN_REST_HOURS - rest) / MIN_REST_HOURS, 0, 1)
+
+    score = (
+        0.35 * hours_ratio
+        + 0.20 * shifts_ratio
+        + 0.15 * night_ratio
+        + 0.15 * consec_ratio
+        + 0.15 * rest_penalty
+    )
+    return np.round(np.clip(score, 0, 1) * 100).astype(np.int64)
+
+
+def fairness_score(hours: List[float]) -> int:
+    """100 = hours spread perfectly evenly, 0 = one person carries everything (1 - Gini)."""
+    arr = np.sort(np.asarray(hours, dtype=float))
+    if arr.size == 0 or arr.sum() <= 0:
+        return 100
+    idx = np.arange(1, arr.size + 1)
+    gini = (2 * np.sum(idx * arr) / (arr.size * arr.sum())) - (arr.size + 1) / arr.size
+    return int(round((1 - gini) * 100))
+
+
+def _risk_level(score: int) -> str:
+    if score >= HIGH_RISK_SCORE:
+        return "high"
+    if score >= MODERATE_RISK_SCORE:
+        return "moderate"
+    return "low"
+
+
+def compute_staff_workload(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    department_id: Optional[int] = None,
+    include_inactive: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Workload metrics for every staff member over [start, end).
+    Defaults to the current ISO week. Staff with no shifts are included
+    with zero load so fairness comparisons see the whole roster.
+    """
+    if start is None or end is None:
+        week_start, week_end = current_week_window()
+        start = start or week_start
+        end = end or week_end
+
+    users_q = db.query(User.id, User.name, User.role, User.department_id)
+    if not include_inactive:
+        users_q = users_q.filter(User.is_active == True)
+    if department_id is not None:
+        users_q = users_q.filter(User.department_id == department_id)
+    users = users_q.order_by(User.id).all()
+    if not users:
+        return []
+
+    # Department filter is on the staff member, so only fetch their intervals
+    user_ids = [u.id for u in users] if department_id is not None else None
+    uid, s, e = _load_intervals(db, start, end, user_ids)
+    per_user = _group_metrics(uid, s, e, start, end)
+
+    empty = {"hours": 0.0, "shifts": 0, "nights": 0, "consecutive_days": 0, "min_rest_hours": np.inf}
+    metrics = [per_user.get(u.id, empty) for u in users]
+
+    window_days = (end - start).total_seconds() / 86400.0
+    scores = burnout_scores(
+        np.array([m["hours"] for m in metrics]),
+        np.array([m["shifts"] for m in metrics]),
+        np.array([m["nights"] for m in metrics]),
+        np.array([m["consecutive_days"] for m in metrics]),
+        np.array([m["min_rest_hours"] for m in metrics]),
+        window_days=window_days,
+    )
+
+    out = []
+    for u, m, score in zip(users, metrics, scores):
+        min_rest = m["min_rest_hours"]
+        out.append({
+            "user_id": u.id,
+            "name": u.name,
+            "role": u.role,
+            "department_id": u.department_id,
+            "hours_this_week": round(m["hours"], 2),
+            "shifts_this_week": m["shifts"],
+            "night_shifts": m["nights"],
+            "consecutive_days": m["consecutive_days"],
+            "min_rest_hours": round(min_rest, 2) if np.isfinite(min_rest) else None,
+            "burnout_score": int(score),
+            "risk_level": _risk_level(int(score)),
+        })
+    return out
@@ -0,0 +1,242 @@
+"""
+Per-request SQL trace and N+1 detector (development only).
+
+With SQL_TRACE_ENABLED, every statement a request runs is recorded with
+its duration and the app line that issued it (innermost router/service
+frame, and the frames that called it). Statements are grouped by shape:
+whitespace, literals and IN/VALUES lists are normalized away, so the
+same query for a different id is the same shape. A shape run
+SQL_TRACE_N_PLUS_ONE_THRESHOLD or more times in one request is an N+1
+suspect: it is logged with its call sites, counted, and with
+SQL_TRACE_STRICT the statement that crosses the threshold raises
+NPlusOneError instead (a 500 whose traceback points at the loop).
+
+The last SQL_TRACE_KEEP traces are kept for GET /emergency/sql-traces;
+responses carry X-SQL-Queries / X-SQL-Time-Ms.
+
+Scripts and test suites can trace a block directly, whatever the setting:
+
+    with sqltrace.capture("red alert", strict=True) as trace:
+        trigger_red_alert(db, ...)
+    print(trace.report())
+
+Not for production: it walks the Python stack on every statement.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import SQL_TRACE_ENABLED, SQL_TRACE_KEEP, SQL_TRACE_N_PLUS_ONE_THRESHOLD, SQL_TRACE_STRICT
+from app.database import engine
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+# Frames in these files are plumbing, never the origin of a statement
+_SKIP_FILES = {os.path.join(APP_DIR, name) for name in ("sqltrace.py", "metrics.py", "database.py")}
+MAX_ORIGIN_FRAMES = 3
+# Statements kept in order per trace (shapes are counted past this)
+MAX_STATEMENTS = 500
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+class NPlusOneError(RuntimeError):
+    """A statement shape crossed the N+1 threshold in strict mode."""
+
+
+def normalize(statement: str) -> str:
+    """The shape of a statement: same query, different values → same string."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _PARAM_LIST.sub("(...)", shape)
+    return _ROW_LIST.sub("(...)", shape)
+
+
+def _origin() -> Tuple[str, ...]:
+    """The innermost app frames below the SQLAlchemy call, as 'services/x.py:12 in fn'."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < MAX_ORIGIN_FRAMES:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in _SKIP_FILES:
+            frames.append(f"{filename[len(APP_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return tuple(frames)
+
+
+class _Shape:
+    __slots__ = ("sql", "count", "ms", "origins", "flagged")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.ms = 0.0
+        self.origins: Dict[Tuple[str, ...], int] = {}
+        self.flagged = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.ms, 3),
+            "origins": [{"stack": list(stack), "count": n}
+                        for stack, n in sorted(self.origins.items(), key=lambda item: -item[1])],
+        }
+
+
+class Trace:
+    """Statements run by one request (or capture() block)."""
+
+    def __init__(self, label: str, threshold: int = SQL_TRACE_N_PLUS_ONE_THRESHOLD, strict: bool = SQL_TRACE_STRICT):
+        self.label = label
+        self.threshold = threshold
+        self.strict = strict
+        self.started_at = time.time()
+        self.queries = 0
+        self.ms = 0.0
+        self.statements: List[Tuple[str, float, Tuple[str, ...]]] = []
+        self.shapes: Dict[str, _Shape] = {}
+
+    def record(self, statement: str, ms: float, origin: Tuple[str, ...]) -> None:
+        self.queries += 1
+        self.ms += ms
+        sql = normalize(statement)
+        shape = self.shapes.get(sql)
+        if shape is None:
+            shape = self.shapes[sql] = _Shape(sql)
+        shape.count += 1
+        shape.ms += ms
+        shape.origins[origin] = shape.origins.get(origin, 0) + 1
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((sql, ms, origin))
+        if shape.count >= self.threshold and not shape.flagged:
+            shape.flagged = True
+            if self.strict:
+                raise NPlusOneError(
+                    f"N+1 in {self.label}: {shape.count}× {sql} at {' ← '.join(origin) or 'unknown'}"
+                )
+
+    def n_plus_one(self) -> List[_Shape]:
+        return sorted((s for s in self.shapes.values() if s.flagged), key=lambda s: -s.count)
+
+    def as_dict(self, statements: bool = True) -> Dict[str, Any]:
+        result = {
+            "label": self.label,
+            "started_at": self.started_at,
+            "queries": self.queries,
+            "total_ms": round(self.ms, 3),
+            "distinct_shapes": len(self.shapes),
+            "n_plus_one": [s.as_dict() for s in self.n_plus_one()],
+        }
+        if statements:
+            result["statements"] = [
+                {"sql": sql, "ms": round(ms, 3), "origin": list(origin)} for sql, ms, origin in self.statements
+            ]
+        return result
+
+    def report(self) -> str:
+        lines = [f"{self.label}: {self.queries} statements, {len(self.shapes)} shapes, {self.ms:.1f} ms"]
+        for shape in self.n_plus_one():
+            lines.append(f"  N+1 {shape.count}× ({shape.ms:.1f} ms) {shape.sql[:200]}")
+            for stack, n in shape.origins.items():
+                lines.append(f"      {n}× {' ← '.join(stack) or 'unknown'}")
+        return "\n".join(lines)
+
+
+# Sync handlers run in the threadpool with a copy of the context: they share the Trace
+_current: ContextVar[Optional[Trace]] = ContextVar("medroster_sql_trace", default=None)
+_recent: Deque[Dict[str, Any]] = deque(maxlen=SQL_TRACE_KEEP)
+_recent_lock = threading.Lock()
+_stats = {"requests_traced_total": 0, "statements_total": 0, "n_plus_one_requests_total": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._trace_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_trace_started", None)
+    trace = _current.get()
+    if started is None or trace is None:
+        return
+    trace.record(statement, (time.perf_counter() - started) * 1000, _origin())
+
+
+@contextmanager
+def capture(label: str = "capture", threshold: int = SQL_TRACE_N_PLUS_ONE_THRESHOLD,
+            strict: bool = False) -> Iterator[Trace]:
+    """Trace the statements run inside the block (on this thread/task)."""
+    trace = Trace(label, threshold, strict)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def recent_traces(n_plus_one_only: bool = False, limit: int = SQL_TRACE_KEEP) -> List[Dict[str, Any]]:
+    with _recent_lock:
+        traces = list(_recent)
+    if n_plus_one_only:
+        traces = [t for t in traces if t["n_plus_one"]]
+    return traces[-limit:][::-1]
+
+
+def sql_trace_stats() -> Dict[str, Any]:
+    return {"enabled": SQL_TRACE_ENABLED, **_stats}
+
+
+def _finish(trace: Trace) -> None:
+    _stats["requests_traced_total"] += 1
+    _stats["statements_total"] += trace.queries
+    suspects = trace.n_plus_one()
+    if suspects:
+        _stats["n_plus_one_requests_total"] += 1
+        print(f"[SQLTrace] N+1 suspect in {trace.report()}")
+    with _recent_lock:
+        _recent.append(trace.as_dict())
+
+
+class SQLTraceMiddleware:
+    """Pure ASGI middleware; a no-op unless SQL_TRACE_ENABLED."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_TRACE_ENABLED or _current.get() is not None:
+            # Inside a capture() block the caller's trace keeps the statements
+            return await self.app(scope, receive, send)
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        token = _current.set(trace)
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                # Statements run while streaming the body are traced but not in these headers
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-sql-queries", str(trace.queries).encode()),
+                    (b"x-sql-time-ms", f"{trace.ms:.1f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            _current.reset(token)
+            _finish(trace)
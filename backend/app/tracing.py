@@ -0,0 +1,208 @@
+"""
+Span tracing for multi-stage pipelines (Red Alert).
+
+start_trace() opens a trace and its root span; span() opens a child of the
+current span. The current span is a contextvar, so it follows sync calls
+and contexts copied into worker threads, and span() is a no-op outside a
+trace: shared helpers (metrics.provider_call) open one unconditionally.
+A span records start/end times, attributes, and the error if its block
+raised.
+
+When the root ends, the trace is appended to TRACE_EXPORT_PATH as one line
+of OTLP/JSON (an ExportTraceServiceRequest), the format the OpenTelemetry
+Collector's otlpjsonfile receiver reads. Spans ending after that (the
+background voice render) are appended on a line of their own under the
+same trace id.
+"""
+
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import TRACE_EXPORT_PATH, TRACE_SERVICE_NAME
+
+# OTLP enums
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_ERROR = 2
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.set(**attributes)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+
+    def summary(self) -> Dict[str, Any]:
+        result = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start": datetime.utcfromtimestamp(self.start_ns / 1e9).isoformat(),
+            "duration_ms": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "attributes": dict(self.attributes),
+        }
+        if self.end_ns is None:
+            result["in_progress"] = True
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = secrets.token_hex(16)
+        self._lock = threading.Lock()
+        self._ended: List[Span] = []
+        self._exported = False
+        self.root = Span(self, name, None, attributes)
+
+    def _end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        with self._lock:
+            self._ended.append(span)
+            late = self._exported
+        if late:
+            _export(self, [span])
+
+    def _finish(self) -> None:
+        self._end(self.root)
+        with self._lock:
+            spans, self._exported = list(self._ended), True
+        _stats["traces_total"] += 1
+        _export(self, spans)
+
+    def summary(self) -> Dict[str, Any]:
+        """The spans ended so far (and the root, possibly still running), in start order."""
+        with self._lock:
+            spans = list(self._ended)
+        if self.root not in spans:
+            spans.append(self.root)
+        return {
+            "trace_id": self.trace_id,
+            "spans": [s.summary() for s in sorted(spans, key=lambda s: s.start_ns)],
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("medroster_span", default=None)
+_export_lock = threading.Lock()
+_stats = {"traces_total": 0, "spans_exported_total": 0, "export_errors_total": 0}
+
+
+def tracing_stats() -> Dict[str, Any]:
+    return dict(_stats)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """A new trace whose root span covers the block; exported when it ends."""
+    trace = Trace(name, attributes)
+    token = _current.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        trace._finish()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """A child of the current span for the block (NOOP_SPAN outside a trace)."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        parent.trace._end(child)
+
+
+# ── OTLP/JSON export ──────────────────────────────────────────────────────
+
+def _value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # int64 is a string in OTLP/JSON
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _value(v)} for k, v in attributes.items()]
+
+
+def _otlp_span(trace_id: str, span: Span) -> Dict[str, Any]:
+    result = {
+        "traceId": trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+        "status": {"code": STATUS_CODE_ERROR, "message": span.error} if span.error else {},
+    }
+    if span.parent_id:
+        result["parentSpanId"] = span.parent_id
+    return result
+
+
+def to_otlp(trace: Trace, spans: List[Span]) -> Dict[str, Any]:
+    """An OTLP ExportTraceServiceRequest (JSON encoding) carrying `spans`."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({"service.name": TRACE_SERVICE_NAME})},
+        "scopeSpans": [{
+            "scope": {"name": "app.tracing"},
+            "spans": [_otlp_span(trace.trace_id, s) for s in spans],
+        }],
+    }]}
+
+
+def _export(trace: Trace, spans: List[Span]) -> None:
+    if not TRACE_EXPORT_PATH or not spans:
+        return
+    line = json.dumps(to_otlp(trace, spans), separators=(",", ":"))
+    try:
+        with _export_lock, open(TRACE_EXPORT_PATH, "a") as f:
+            f.write(line + "\n")
+        _stats["spans_exported_total"] += len(spans)
+    except OSError as e:
+        _stats["export_errors_total"] += 1
+        print(f"[Tracing] Export to {TRACE_EXPORT_PATH} failed: {e}")
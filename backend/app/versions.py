@@ -0,0 +1,77 @@
+"""
+Table version counters for conditional GETs.
+
+Writes bump a counter per table (and per department for shifts) once they
+commit; read endpoints derive a weak ETag from the counters they depend on
+and answer If-None-Match with 304 before touching the database. The tag is
+read before the query runs, so a response is never tagged newer than its
+data (a write racing a read costs one extra download, never a stale 304).
+
+Counters live in this process, like the principal cache; ETags carry a
+per-process boot id so tags from before a restart never match.
+"""
+
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.database import on_commit
+
+DEPARTMENTS = "departments"
+USERS = "users"
+SHIFTS = "shifts"
+ASSIGNMENTS = "assignments"
+# Shift writes that can touch any department (archival, department deletion)
+SHIFTS_BULK = "shifts:bulk"
+
+_BOOT = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+
+
+def shifts_of(department_id: Optional[int]) -> str:
+    return f"shifts:{department_id}"
+
+
+def bump(*keys: str) -> None:
+    with _lock:
+        for key in keys:
+            _versions[key] = _versions.get(key, 0) + 1
+
+
+def bump_on_commit(db, *keys: str) -> None:
+    on_commit(db, lambda: bump(*keys))
+
+
+def current(*keys: str) -> Tuple[int, ...]:
+    with _lock:
+        return tuple(_versions.get(key, 0) for key in keys)
+
+
+def etag(*keys: str) -> str:
+    return f'W/"{_BOOT}-{".".join(map(str, current(*keys)))}"'
+
+
+def etag_matches(header: str, tag: str) -> bool:
+    """If-None-Match comparison (weak: W/ prefixes are ignored on both sides)."""
+    if header.strip() == "*":
+        return True
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(request: Request, response: Response, *keys: str, cache_control: str = "private, no-cache") -> Optional[Response]:
+    """
+    Call first thing in a GET handler: returns a 304 to send as-is if the
+    client's copy is current, else sets ETag/Cache-Control on `response`
+    and returns None.
+    """
+    tag = etag(*keys)
+    headers = {"ETag": tag, "Cache-Control": cache_control}
+    header = request.headers.get("if-none-match")
+    if header and etag_matches(header, tag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
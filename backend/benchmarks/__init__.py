@@ -0,0 +1,5 @@
+"""
+MedRoster benchmarks. Run from backend/, e.g.:
+    python -m benchmarks.red_alert_execution
+Each benchmark works on a throwaway SQLite database in a temp directory.
+"""
@@ -0,0 +1,32 @@
+"""Point the app at a throwaway SQLite database before anything imports app.database."""
+
+import os
+import tempfile
+
+INVOKED_FROM = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="medroster-bench-")
+os.chdir(WORKDIR)  # database.py uses sqlite:///./medroster.db
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+import app.models  # noqa: E402,F401
+
+Base.metadata.create_all(bind=engine)
+
+
+class QueryCounter:
+    """Counts statements sent to the engine while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(engine, "before_cursor_execute", self._on_execute)
@@ -0,0 +1,162 @@
+"""
+Overload with and without admission control, on a real uvicorn worker: a
+dashboard flood (many clients polling GET /users/ back to back), kiosks
+polling /public/departments twice a second (one IP each, via
+X-Forwarded-For) plus one IP flooding it, and a probe issuing
+POST /emergency/resolve every 100 ms. Reports throughput, statuses and latency per traffic class;
+the number that matters is the emergency probe's latency. Clients other
+than the flooder honour Retry-After.
+
+    python -m benchmarks.admission [--seconds 8] [--dashboard 150] [--kiosks 60]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+from benchmarks._setup import SessionLocal
+from benchmarks.public_load import _free_port, _pct, serve
+
+from sqlalchemy import insert
+
+from app import admission
+from app.models.department import Department
+from app.models.user import User
+from app.security import access_token_for
+
+
+def seed(users: int) -> str:
+    db = SessionLocal()
+    db.add(Department(name="ICU"))
+    db.execute(insert(User), [
+        {"name": f"Staff {i}", "email": f"s{i}@bench", "role": "manager" if i == 0 else "nurse",
+         "password": "x", "department_id": 1, "is_active": True}
+        for i in range(users)
+    ])
+    db.commit()
+    token = access_token_for(db.query(User).filter(User.role == "manager").first())
+    db.close()
+    return token
+
+
+def _request(method: str, path: str, token: str = "", body: bytes = b"", ip: str = "") -> bytes:
+    headers = f"{method} {path} HTTP/1.1\r\nHost: bench\r\n"
+    if ip:
+        headers += f"X-Forwarded-For: {ip}\r\n"
+    if token:
+        headers += f"Authorization: Bearer {token}\r\n"
+    if body:
+        headers += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    return headers.encode() + b"\r\n" + body
+
+
+async def _read_response(reader) -> tuple:
+    """(status, Retry-After seconds or 0)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    length, retry_after = 0, 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+        elif name.lower() == b"retry-after":
+            retry_after = int(value)
+    if length:
+        await reader.readexactly(length)
+    return int(head[9:12]), retry_after
+
+
+async def _client_worker(port: int, token: str, jobs, results) -> None:
+    while True:
+        job = await asyncio.to_thread(jobs.get)
+        if job is None:
+            return
+        seconds, dashboard, kiosks, probe = job
+        deadline = time.perf_counter() + seconds
+        stats = {kind: {"latencies": [], "statuses": {}} for kind in ("dashboard", "kiosk", "flooder", "emergency")}
+
+        async def client(kind: str, request: bytes, pause: float = 0.0):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                writer.write(request)
+                status, retry_after = await _read_response(reader)
+                stats[kind]["latencies"].append(time.perf_counter() - t0)
+                stats[kind]["statuses"][status] = stats[kind]["statuses"].get(status, 0) + 1
+                # Well-behaved clients back off as told (the flooder does not)
+                wait = retry_after if kind != "flooder" else 0
+                if wait or pause:
+                    await asyncio.sleep(max(wait, pause))
+            writer.close()
+
+        clients = [client("dashboard", _request("GET", "/users/", token)) for _ in range(dashboard)]
+        clients += [client("kiosk", _request("GET", "/public/departments", ip=f"10.{probe:d}.0.{i}"), pause=0.5)
+                    for i in range(kiosks)]
+        if probe:
+            clients.append(client("flooder", _request("GET", "/public/departments", ip="10.99.99.99")))
+            body = json.dumps({"department_id": 1}).encode()
+            clients.append(client("emergency", _request("POST", "/emergency/resolve", token, body), pause=0.1))
+        await asyncio.gather(*clients)
+        results.put(stats)
+
+
+def _client_process(port, token, jobs, results):
+    asyncio.run(_client_worker(port, token, jobs, results))
+
+
+def run(seconds: float, dashboard: int, kiosks: int, processes: int) -> None:
+    token = seed(2000)
+    port = _free_port()
+    ctx = multiprocessing.get_context("fork")
+    jobs, results = ctx.Queue(), ctx.Queue()
+    workers = [ctx.Process(target=_client_process, args=(port, token, jobs, results)) for _ in range(processes)]
+    for w in workers:
+        w.start()
+    server, thread = serve(port)
+    admission.ADMISSION_TRUST_FORWARDED_FOR = True
+    try:
+        for enabled in (False, True):
+            admission.ADMISSION_ENABLED = enabled
+            for i in range(processes):
+                jobs.put((seconds, dashboard // processes, kiosks // processes, i == 0))
+            merged = {}
+            for _ in workers:
+                for kind, s in results.get(timeout=seconds + 120).items():
+                    m = merged.setdefault(kind, {"latencies": [], "statuses": {}})
+                    m["latencies"] += s["latencies"]
+                    for status, n in s["statuses"].items():
+                        m["statuses"][status] = m["statuses"].get(status, 0) + n
+
+            print(f"admission control {'ON' if enabled else 'OFF'}: {dashboard} dashboard clients, "
+                  f"{kiosks} kiosks + 1 flooder, 1 emergency probe, {seconds:.0f}s")
+            for kind, m in merged.items():
+                ok = sum(n for status, n in m["statuses"].items() if status < 400)
+                print(f"  {kind:10} ok/s={ok / seconds:7.1f}  p50={_pct(m['latencies'], 0.5):8.1f} ms  "
+                      f"p99={_pct(m['latencies'], 0.99):8.1f} ms  max={max(m['latencies'], default=0) * 1000:8.1f} ms  "
+                      f"statuses={dict(sorted(m['statuses'].items()))}")
+            time.sleep(1)
+        groups = admission.admission_stats()["groups"]
+        print("  shed (ON run):", {name: {k: v for k, v in g.items() if k.endswith("_total") and v}
+                                   for name, g in groups.items()})
+        for _ in workers:
+            jobs.put(None)
+        for w in workers:
+            w.join(timeout=30)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=8.0)
+    parser.add_argument("--dashboard", type=int, default=150)
+    parser.add_argument("--kiosks", type=int, default=60)
+    parser.add_argument("--processes", type=int, default=2)
+    args = parser.parse_args()
+    run(args.seconds, args.dashboard, args.kiosks, args.processes)
+
+
+if __name__ == "__main__":
+    main()
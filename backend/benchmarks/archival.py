@@ -0,0 +1,133 @@
+"""
+Hot-query latency before and after archival: seeds two years of shifts,
+assignments and audit rows, times the routers' unfiltered reads, archives
+everything past the horizon and times them again, then times a historical
+read served from the archive.
+
+    python -m benchmarks.archival [--days 730] [--departments 10] [--horizon 90]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._setup import SessionLocal, WORKDIR
+
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(WORKDIR, "archive"))
+
+from sqlalchemy import insert  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.assignment import Assignment  # noqa: E402
+from app.models.audit_log import AuditLog  # noqa: E402
+from app.models.department import Department  # noqa: E402
+from app.models.shift import Shift  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.security import access_token_for  # noqa: E402
+from app.services import archive_service  # noqa: E402
+from app.services.coverage_service import rebuild_coverage  # noqa: E402
+from app.services.rollup_service import rebuild_rollup  # noqa: E402
+
+HOT_QUERIES = [
+    "/shifts/",
+    "/shifts/department/1",
+    "/assignments/",
+    "/emergency/audit-logs",
+    "/shifts/open-slots",
+]
+
+
+def seed(days: int, departments: int, rng: random.Random) -> str:
+    db = SessionLocal()
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    db.add_all([Department(name=f"Dept {i}") for i in range(departments)])
+    db.flush()
+    staff = 30 * departments
+    db.bulk_insert_mappings(User, [
+        {"name": f"Staff {i}", "email": f"s{i}@bench", "role": "nurse", "password": "x",
+         "is_active": True, "department_id": 1 + i % departments}
+        for i in range(staff)
+    ] + [{"name": "Admin", "email": "admin@bench", "role": "admin", "password": "x", "is_active": True}])
+    db.commit()
+
+    shift_rows, assignment_rows, audit_rows = [], [], []
+    shift_id = 0
+    for day in range(-days, 14):
+        for dept in range(1, departments + 1):
+            for start_hour in (7, 15, 23):
+                shift_id += 1
+                start = now.replace(hour=0) + timedelta(days=day, hours=start_hour)
+                shift_rows.append({"id": shift_id, "department_id": dept, "start_time": start,
+                                   "end_time": start + timedelta(hours=8), "required_role": "nurse",
+                                   "required_staff_count": 5})
+                for user_id in rng.sample(range(1, staff + 1), 4):
+                    assignment_rows.append({"user_id": user_id, "shift_id": shift_id, "is_emergency": False})
+                    audit_rows.append({"action": f"ASSIGNMENT CREATED | user=Staff {user_id - 1} | shift={shift_id}",
+                                       "performed_by": "admin@bench", "timestamp": start - timedelta(days=3),
+                                       "event_type": "assignment_created", "department_id": dept,
+                                       "target_user_id": user_id, "details": {"shift_id": shift_id}})
+    for table, rows in ((Shift, shift_rows), (Assignment, assignment_rows), (AuditLog, audit_rows)):
+        for i in range(0, len(rows), 20000):
+            db.execute(insert(table), rows[i:i + 20000])
+    db.commit()
+    rebuild_coverage(db)
+    rebuild_rollup(db)
+    token = access_token_for(db.query(User).filter(User.email == "admin@bench").first())
+    print(f"[Bench] Seeded {len(shift_rows)} shifts, {len(assignment_rows)} assignments, {len(audit_rows)} audit rows")
+    db.close()
+    return token
+
+
+def time_queries(client: TestClient, headers, repeats: int):
+    results = {}
+    for path in HOT_QUERIES:
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            r = client.get(path, headers=headers)
+            samples.append(time.perf_counter() - t0)
+            assert r.status_code == 200, (path, r.status_code)
+        results[path] = (statistics.median(samples) * 1000, len(r.content))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--horizon", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    token = seed(args.days, args.departments, random.Random(3))
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+
+    before = time_queries(client, headers, args.repeats)
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        moved = archive_service.run_archival(db, horizon_days=args.horizon)
+    archive_seconds = time.perf_counter() - t0
+    after = time_queries(client, headers, args.repeats)
+
+    print(f"[Bench] Archived in {archive_seconds:.1f}s: {moved}")
+    print(f"        {'query':<24}{'before ms':>12}{'after ms':>12}{'before KB':>12}{'after KB':>12}")
+    for path in HOT_QUERIES:
+        (b_ms, b_size), (a_ms, a_size) = before[path], after[path]
+        print(f"        {path:<24}{b_ms:>12.1f}{a_ms:>12.1f}{b_size / 1024:>12.0f}{a_size / 1024:>12.0f}")
+
+    month_start = (datetime.utcnow() - timedelta(days=365)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    params = {"start": month_start.isoformat(), "end": (month_start + timedelta(days=31)).isoformat(),
+              "department_id": 1}
+    t0 = time.perf_counter()
+    r = client.get("/history/shifts", params=params, headers=headers)
+    print(f"        archived month of shifts for one department: {len(r.json())} shifts "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
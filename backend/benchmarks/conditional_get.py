@@ -0,0 +1,76 @@
+"""
+Polling cost with and without If-None-Match on the rarely-changing lists:
+time per request and SQL statements per request, for a full 200 response
+versus a 304 revalidation.
+
+    python -m benchmarks.conditional_get [--users 2000] [--shifts 5000] [--polls 200]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._setup import QueryCounter, SessionLocal
+
+from sqlalchemy import insert  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.department import Department  # noqa: E402
+from app.models.shift import Shift  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.security import access_token_for  # noqa: E402
+
+ENDPOINTS = ["/departments/", "/public/departments", "/shifts/department/1", "/users/"]
+
+
+def seed(users: int, shifts: int) -> str:
+    db = SessionLocal()
+    db.add_all([Department(name=f"Dept {i}") for i in range(1, 21)])
+    db.execute(insert(User), [
+        {"name": f"Staff {i}", "email": f"s{i}@bench", "role": "nurse", "password": "x",
+         "department_id": 1 + i % 20, "is_active": True}
+        for i in range(users)
+    ])
+    start = datetime.utcnow()
+    db.execute(insert(Shift), [
+        {"department_id": 1 + i % 5, "start_time": start + timedelta(hours=i), "end_time": start + timedelta(hours=i + 8),
+         "required_role": "nurse", "required_staff_count": 2}
+        for i in range(shifts)
+    ])
+    db.commit()
+    token = access_token_for(db.query(User).first())
+    db.close()
+    return token
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--shifts", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed(args.users, args.shifts)}"}
+    client = TestClient(app)
+    print(f"{'endpoint':24} {'200 ms':>8} {'304 ms':>8} {'200 SQL':>8} {'304 SQL':>8} {'bytes':>9}")
+    for path in ENDPOINTS:
+        first = client.get(path, headers=headers)
+        tag = first.headers["etag"]
+
+        with QueryCounter() as full_q:
+            t0 = time.perf_counter()
+            for _ in range(args.polls):
+                client.get(path, headers=headers)
+            full_ms = (time.perf_counter() - t0) * 1000 / args.polls
+        with QueryCounter() as cond_q:
+            t0 = time.perf_counter()
+            for _ in range(args.polls):
+                assert client.get(path, headers={**headers, "If-None-Match": tag}).status_code == 304
+            cond_ms = (time.perf_counter() - t0) * 1000 / args.polls
+        print(f"{path:24} {full_ms:8.2f} {cond_ms:8.2f} {full_q.count / args.polls:8.1f} "
+              f"{cond_q.count / args.polls:8.1f} {len(first.content):9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Dashboard reconnect cost: seeds a roster, takes a /sync snapshot, makes a
+minute's worth of edits through the API, then compares what a reconnecting
+client downloads with full-list polling (/shifts/ + /assignments/) versus
+GET /sync?since=<seq>.
+
+    python -m benchmarks.delta_sync [--shifts 5000] [--per-shift 4] [--edits 20]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._setup import SessionLocal
+
+from sqlalchemy import insert  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.assignment import Assignment  # noqa: E402
+from app.models.department import Department  # noqa: E402
+from app.models.shift import Shift  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.security import access_token_for  # noqa: E402
+from app.services.coverage_service import rebuild_coverage  # noqa: E402
+from app.services.rollup_service import rebuild_rollup  # noqa: E402
+
+
+def seed(shifts: int, per_shift: int) -> str:
+    rng = random.Random(7)
+    db = SessionLocal()
+    db.add_all([Department(name=f"Dept {i}") for i in range(1, 11)])
+    db.execute(insert(User), [
+        {"name": f"Nurse {i}", "email": f"n{i}@bench", "role": "nurse", "password": "x",
+         "department_id": 1 + i % 10, "is_active": True}
+        for i in range(500)
+    ])
+    admin = User(name="Admin", email="admin@bench", role="admin", password="x", is_active=True)
+    db.add(admin)
+    start = datetime.utcnow() - timedelta(days=shifts // 40)
+    db.execute(insert(Shift), [
+        {"department_id": 1 + i % 10, "start_time": start + timedelta(hours=6 * (i // 10)),
+         "end_time": start + timedelta(hours=6 * (i // 10) + 8), "required_role": "nurse",
+         "required_staff_count": per_shift + 1}
+        for i in range(shifts)
+    ])
+    db.execute(insert(Assignment), [
+        {"user_id": user_id, "shift_id": shift_id, "is_emergency": False}
+        for shift_id in range(1, shifts + 1)
+        for user_id in rng.sample(range(1, 501), per_shift)
+    ])
+    db.commit()
+    rebuild_coverage(db)
+    rebuild_rollup(db)
+    token = access_token_for(admin)
+    db.close()
+    return token
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shifts", type=int, default=5000)
+    parser.add_argument("--per-shift", type=int, default=4)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed(args.shifts, args.per_shift)}"}
+    client = TestClient(app)
+    seq = client.get("/sync", headers=headers).json()["seq"]
+
+    # A minute of edits: new shifts, new assignments, a few removals
+    now = datetime.utcnow()
+    for i in range(args.edits):
+        if i % 4 == 0:
+            client.post("/shifts/", headers=headers, json={
+                "department_id": 1 + i % 10, "start_time": (now + timedelta(days=1, hours=i)).isoformat(),
+                "end_time": (now + timedelta(days=1, hours=i + 8)).isoformat(), "required_role": "nurse",
+                "required_staff_count": 2,
+            })
+        elif i % 4 == 3:
+            client.delete(f"/assignments/{i}", headers=headers)
+        else:
+            client.post("/assignments/", headers=headers, json={"user_id": 1 + i, "shift_id": args.shifts - i})
+
+    t0 = time.perf_counter()
+    full = len(client.get("/shifts/", headers=headers).content) + len(client.get("/assignments/", headers=headers).content)
+    full_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    delta = client.get(f"/sync?since={seq}", headers=headers)
+    delta_ms = (time.perf_counter() - t0) * 1000
+    body = delta.json()
+
+    print(f"roster: {args.shifts} shifts, {args.shifts * args.per_shift} assignments; {args.edits} edits since seq {seq}")
+    print(f"full lists:  {full / 1024:9.1f} KiB  {full_ms:7.1f} ms")
+    print(f"delta sync:  {len(delta.content) / 1024:9.1f} KiB  {delta_ms:7.1f} ms  "
+          f"({len(body['shifts'])} shifts, {len(body['assignments'])} assignments, "
+          f"{len(body['deleted']['assignments'])} tombstones)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+End-to-end load suite: a synthetic hospital (benchmarks.hospital) served by
+a real uvicorn worker, with OpenAI and ElevenLabs replaced by local stubs
+(benchmarks.stubs), driven by scripted workloads from forked client
+processes:
+
+- dashboard: managers' dashboards polling their department's shifts
+  (If-None-Match), open slots and /sync deltas
+- kiosk: lobby screens polling public department status, one IP each
+- assignments: bursts of concurrent POST /assignments/ (with
+  Idempotency-Key) by managers, undone by DELETE after each burst
+- red_alert: Red Alert with AI refinement, then resolve
+- mixed: all of the above at once
+
+Each phase runs for --seconds. The report gives, per phase and route,
+request count, throughput, p50/p95/p99/max latency, statuses and errors
+(connection failures and 5xx; 429/503 are counted as shed). --out writes
+it as JSON; --compare checks it against an earlier report and exits 1 on
+a regression beyond --tolerance. --providers local swaps the stubs for
+the in-process local providers (app.services.providers; LOCAL_* latency
+settings).
+
+    python -m benchmarks.e2e [--seconds 10] [--phases dashboard,kiosk,mixed] [--out e2e.json]
+    python -m benchmarks.e2e --compare e2e.json [--tolerance 0.25]
+
+On a single core the clients and stubs share the CPU with the server;
+compare reports from the same machine.
+"""
+
+import os
+
+from benchmarks import stubs
+
+# The app reads provider URLs and keys at import: start the stubs first
+PROVIDERS = stubs.Providers(openai_latency_ms=800, elevenlabs_latency_ms=400)
+os.environ.update(PROVIDERS.env())
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import multiprocessing  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import uuid  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+
+from benchmarks._setup import INVOKED_FROM, SessionLocal  # noqa: E402
+from benchmarks.hospital import generate  # noqa: E402
+from benchmarks.public_load import _free_port, _pct, serve  # noqa: E402
+
+from app import admission  # noqa: E402
+from app.models.assignment import Assignment  # noqa: E402
+from app.models.shift import Shift  # noqa: E402
+from app.models.shift_coverage import ShiftCoverage  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.security import access_token_for  # noqa: E402
+from app.services import providers  # noqa: E402
+
+PHASES = ("dashboard", "kiosk", "assignments", "red_alert", "mixed")
+EMERGENCIES = ["ICU surge", "mass casualty event", "staff no-show - 3 nurses", "flu season overflow"]
+REQUEST_TIMEOUT = 60
+# Statuses that mean "come back later", not failure
+SHED = (429, 503)
+
+
+def seed(args) -> dict:
+    """Generate the hospital; return what the clients need (tokens, ids, assignable pairs)."""
+    db = SessionLocal()
+    hospital = generate(db, args.departments, {"doctor": args.doctors, "nurse": args.nurses, "staff": args.staff},
+                        args.weeks, seed=args.seed)
+    admin = db.query(User).filter(User.id == hospital["admin_id"]).one()
+    managers = {dept_id: access_token_for(db.query(User).filter(User.id == uid).one())
+                for dept_id, uid in hospital["managers"].items()}
+
+    # (user, shift) pairs a manager could legitimately add: upcoming, under-staffed, same department and role
+    now = datetime.utcnow()
+    assigned = set(db.query(Assignment.user_id, Assignment.shift_id))
+    pool = {}
+    for uid, role, dept_id in db.query(User.id, User.role, User.department_id):
+        pool.setdefault((dept_id, role), []).append(uid)
+    candidates = []
+    rng = random.Random(args.seed)
+    open_shifts = (
+        db.query(Shift.id, Shift.department_id, Shift.required_role)
+        .join(ShiftCoverage, ShiftCoverage.shift_id == Shift.id)
+        .filter(Shift.start_time > now + timedelta(hours=12), ShiftCoverage.open_slots > 0)
+        .all()
+    )
+    for shift_id, dept_id, role in open_shifts:
+        free = [uid for uid in pool.get((dept_id, role), []) if (uid, shift_id) not in assigned]
+        if free:
+            candidates.append({"user_id": rng.choice(free), "shift_id": shift_id, "department_id": dept_id})
+    rng.shuffle(candidates)
+    db.close()
+
+    users = sum(len(ids) for ids in hospital["users"].values()) + 1
+    return {
+        "admin_token": access_token_for(admin),
+        "manager_tokens": managers,
+        "departments": hospital["departments"],
+        "candidates": candidates,
+        "summary": {"departments": len(hospital["departments"]), "users": users, "shifts": hospital["shifts"],
+                    "assignments": hospital["assignments"], "weeks": hospital["weeks"]},
+    }
+
+
+# ── Client side (forked processes) ────────────────────────────────────────
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects after a failure."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.reader = self.writer = None
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, headers: dict, body) -> tuple:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = b"" if body is None else json.dumps(body).encode()
+        head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + data)
+
+        lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0][9:12])
+        response_headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                response_headers[name.strip().lower()] = value.strip()
+        if "content-length" in response_headers:
+            payload = await self.reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding") == "chunked":
+            payload = b""
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                payload += (await self.reader.readexactly(size + 2))[:size]
+                if size == 0:
+                    break
+        else:
+            payload = b""
+        if response_headers.get("connection") == "close":
+            self.close()
+        return status, response_headers, payload
+
+
+class _Recorder:
+    def __init__(self, port: int, seconds: float):
+        self.port = port
+        self.deadline = time.perf_counter() + seconds
+        self.stats = {}
+
+    def running(self) -> bool:
+        return time.perf_counter() < self.deadline
+
+    async def pause(self, seconds: float) -> None:
+        await asyncio.sleep(max(0.0, min(seconds, self.deadline - time.perf_counter())))
+
+    async def call(self, conn: _Connection, label: str, method: str, path: str, headers: dict, body=None) -> tuple:
+        """Time one request under `label` (the route template); (status, headers, JSON or None)."""
+        started = time.perf_counter()
+        try:
+            status, response_headers, payload = await asyncio.wait_for(
+                conn.request(method, path, headers, body), REQUEST_TIMEOUT)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            conn.close()
+            status, response_headers, payload = 0, {}, b""
+        entry = self.stats.setdefault(label, {"latencies": [], "statuses": {}})
+        entry["latencies"].append(time.perf_counter() - started)
+        entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+        if status in SHED:
+            # Well-behaved clients back off as told
+            await self.pause(float(response_headers.get("retry-after") or 1))
+        try:
+            data = json.loads(payload) if payload else None
+        except ValueError:
+            data = None
+        return status, response_headers, data
+
+
+async def _dashboard(rec: _Recorder, token: str, dept_id: int, interval: float) -> None:
+    conn = _Connection(rec.port)
+    auth = {"Authorization": f"Bearer {token}"}
+    etag, seq = None, None
+    await rec.pause(random.random() * interval)
+    while rec.running():
+        headers = {**auth, "If-None-Match": etag} if etag else auth
+        status, response_headers, _ = await rec.call(
+            conn, "GET /shifts/department/{dept_id}", "GET", f"/shifts/department/{dept_id}", headers)
+        etag = response_headers.get("etag", etag)
+        await rec.call(conn, "GET /shifts/open-slots", "GET", f"/shifts/open-slots?department_id={dept_id}", auth)
+        since = f"&since={seq}" if seq is not None else ""
+        status, _, data = await rec.call(conn, "GET /sync", "GET", f"/sync?department_id={dept_id}{since}", auth)
+        if status == 200 and data:
+            seq = data.get("seq", seq)
+        await rec.pause(interval)
+    conn.close()
+
+
+async def _kiosk(rec: _Recorder, ip: str, departments: list, interval: float) -> None:
+    conn = _Connection(rec.port)
+    etags = {}
+    await rec.pause(random.random() * interval)
+    polls = 0
+    while rec.running():
+        dept_id = departments[polls % len(departments)]
+        headers = {"X-Forwarded-For": ip}
+        if dept_id in etags:
+            headers["If-None-Match"] = etags[dept_id]
+        _, response_headers, _ = await rec.call(
+            conn, "GET /public/departments/{department_id}/status", "GET",
+            f"/public/departments/{dept_id}/status", headers)
+        if "etag" in response_headers:
+            etags[dept_id] = response_headers["etag"]
+        if polls % 10 == 0:
+            await rec.call(conn, "GET /public/departments", "GET", "/public/departments", {"X-Forwarded-For": ip})
+        polls += 1
+        await rec.pause(interval)
+    conn.close()
+
+
+async def _assignment_bursts(rec: _Recorder, plan: dict, size: int, interval: float) -> None:
+    conns = [_Connection(rec.port) for _ in range(size)]
+    candidates = plan["candidates"]
+    cursor = 0
+
+    async def add(conn, pair):
+        headers = {"Authorization": f"Bearer {plan['manager_tokens'][pair['department_id']]}",
+                   "Idempotency-Key": uuid.uuid4().hex}
+        body = {"user_id": pair["user_id"], "shift_id": pair["shift_id"]}
+        status, _, data = await rec.call(conn, "POST /assignments/", "POST", "/assignments/", headers, body)
+        return pair, (data or {}).get("id") if status == 201 else None
+
+    while rec.running() and candidates:
+        burst = [candidates[(cursor + i) % len(candidates)] for i in range(size)]
+        cursor += size
+        created = await asyncio.gather(*(add(conn, pair) for conn, pair in zip(conns, burst)))
+        # Undo the burst so the roster (and the next lap over the candidates) stays the same
+        for conn, (pair, assignment_id) in zip(conns, created):
+            if assignment_id:
+                headers = {"Authorization": f"Bearer {plan['manager_tokens'][pair['department_id']]}"}
+                await rec.call(conn, "DELETE /assignments/{assignment_id}", "DELETE",
+                               f"/assignments/{assignment_id}", headers)
+        await rec.pause(interval)
+    for conn in conns:
+        conn.close()
+
+
+async def _red_alert(rec: _Recorder, plan: dict, interval: float) -> None:
+    conn = _Connection(rec.port)
+    auth = {"Authorization": f"Bearer {plan['admin_token']}"}
+    rng = random.Random()
+    while rec.running():
+        dept_id = rng.choice(plan["departments"])
+        body = {"emergency_type": rng.choice(EMERGENCIES), "department_id": dept_id, "refine_with_ai": True}
+        await rec.call(conn, "POST /emergency/red-alert", "POST", "/emergency/red-alert", auth, body)
+        await rec.pause(min(2.0, interval))
+        await rec.call(conn, "POST /emergency/resolve", "POST", "/emergency/resolve", auth,
+                       {"department_id": dept_id})
+        await rec.pause(interval)
+    conn.close()
+
+
+async def _run_phase(port: int, plan: dict, job: dict, index: int, processes: int) -> dict:
+    rec = _Recorder(port, job["seconds"])
+    departments = plan["departments"]
+    tasks = []
+    for i in range(index, job["dashboards"], processes):
+        dept_id = departments[i % len(departments)]
+        tasks.append(_dashboard(rec, plan["manager_tokens"][dept_id], dept_id, job["dashboard_interval"]))
+    for i in range(index, job["kiosks"], processes):
+        kiosk_departments = departments[i % len(departments):] + departments[:i % len(departments)]
+        tasks.append(_kiosk(rec, f"10.{i // 250}.{i % 250}.1", kiosk_departments, job["kiosk_interval"]))
+    if index == 0 and job["burst_size"]:
+        tasks.append(_assignment_bursts(rec, plan, job["burst_size"], job["burst_interval"]))
+    if index == processes - 1 and job["red_alert_interval"]:
+        tasks.append(_red_alert(rec, plan, job["red_alert_interval"]))
+    await asyncio.gather(*tasks)
+    return rec.stats
+
+
+def _client_process(port, plan, index, processes, jobs, results):
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        results.put(asyncio.run(_run_phase(port, plan, job, index, processes)))
+
+
+# ── Phases and report ─────────────────────────────────────────────────────
+
+def _job(phase: str, args) -> dict:
+    everything = phase == "mixed"
+    return {
+        "seconds": args.seconds,
+        "dashboards": args.dashboards if everything or phase == "dashboard" else 0,
+        "dashboard_interval": args.dashboard_interval,
+        "kiosks": args.kiosks if everything or phase == "kiosk" else 0,
+        "kiosk_interval": args.kiosk_interval,
+        "burst_size": args.burst_size if everything or phase == "assignments" else 0,
+        "burst_interval": args.burst_interval,
+        "red_alert_interval": args.red_alert_interval if everything or phase == "red_alert" else 0,
+    }
+
+
+def _summarize(merged: dict, seconds: float) -> dict:
+    routes = {}
+    for label, m in sorted(merged.items()):
+        latencies, statuses = m["latencies"], m["statuses"]
+        total = len(latencies)
+        routes[label] = {
+            "requests": total,
+            "throughput_rps": round(total / seconds, 2),
+            "p50_ms": round(_pct(latencies, 0.50), 2),
+            "p95_ms": round(_pct(latencies, 0.95), 2),
+            "p99_ms": round(_pct(latencies, 0.99), 2),
+            "max_ms": round(max(latencies, default=0) * 1000, 2),
+            "errors": sum(n for status, n in statuses.items() if status == 0 or status >= 500 and status not in SHED),
+            "shed": sum(n for status, n in statuses.items() if status in SHED),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        }
+    return routes
+
+
+def _print_phase(phase: str, seconds: float, routes: dict) -> None:
+    print(f"\n{phase} ({seconds:.0f}s)")
+    print(f"  {'route':48} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>5} {'shed':>5}  statuses")
+    for label, r in routes.items():
+        print(f"  {label:48} {r['throughput_rps']:8.1f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} "
+              f"{r['errors']:>5} {r['shed']:>5}  {r['statuses']}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__),
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_ms: float) -> list:
+    """Regressions of `report` against `baseline`: slower p95/p99, lower throughput, new errors."""
+    regressions = []
+    for phase, current in report["phases"].items():
+        before = baseline.get("phases", {}).get(phase)
+        if not before:
+            continue
+        for label, r in current["routes"].items():
+            b = before["routes"].get(label)
+            if not b or not b["requests"]:
+                continue
+            for key in ("p95_ms", "p99_ms"):
+                if r[key] > b[key] * (1 + tolerance) and r[key] - b[key] > min_ms:
+                    regressions.append(f"{phase} {label}: {key} {b[key]:.1f} → {r[key]:.1f}")
+            if r["throughput_rps"] < b["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{phase} {label}: throughput {b['throughput_rps']:.1f} → "
+                                   f"{r['throughput_rps']:.1f} req/s")
+            if r["errors"] / max(r["requests"], 1) > b["errors"] / b["requests"] + 0.01:
+                regressions.append(f"{phase} {label}: errors {b['errors']}/{b['requests']} → "
+                                   f"{r['errors']}/{r['requests']}")
+    return regressions
+
+
+def run(args) -> dict:
+    plan = seed(args)
+    if args.providers == "local":
+        providers.set_providers(providers.LocalChat(), providers.LocalTTS())
+    PROVIDERS.openai.latency = args.openai_latency_ms / 1000
+    PROVIDERS.elevenlabs.latency = args.elevenlabs_latency_ms / 1000
+    port = _free_port()
+    ctx = multiprocessing.get_context("fork")
+    jobs = [ctx.Queue() for _ in range(args.processes)]
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_client_process, args=(port, plan, i, args.processes, jobs[i], results))
+               for i in range(args.processes)]
+    for w in workers:
+        w.start()
+
+    server, thread = serve(port)
+    # Kiosks are told apart by X-Forwarded-For (the public rate limit is per IP)
+    admission.ADMISSION_TRUST_FORWARDED_FOR = True
+    print(f"Hospital: {plan['summary']}; {len(plan['candidates'])} assignable (user, shift) pairs")
+    report = {
+        "benchmark": "e2e",
+        "created_at": datetime.utcnow().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "hospital": plan["summary"],
+        "phases": {},
+    }
+    try:
+        for phase in args.phases.split(","):
+            job = _job(phase, args)
+            for q in jobs:
+                q.put(job)
+            merged = {}
+            for _ in workers:
+                for label, s in results.get(timeout=args.seconds + REQUEST_TIMEOUT + 60).items():
+                    m = merged.setdefault(label, {"latencies": [], "statuses": {}})
+                    m["latencies"] += s["latencies"]
+                    for status, n in s["statuses"].items():
+                        m["statuses"][status] = m["statuses"].get(status, 0) + n
+            routes = _summarize(merged, args.seconds)
+            report["phases"][phase] = {"seconds": args.seconds, "routes": routes}
+            _print_phase(phase, args.seconds, routes)
+            time.sleep(1)
+        for q in jobs:
+            q.put(None)
+        for w in workers:
+            w.join(timeout=30)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    report["providers"] = PROVIDERS.calls() if args.providers == "stubs" else providers.provider_info()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    parser.add_argument("--phases", default=",".join(PHASES))
+    parser.add_argument("--processes", type=int, default=2, help="client processes")
+    parser.add_argument("--departments", type=int, default=12)
+    parser.add_argument("--doctors", type=int, default=8, help="per department")
+    parser.add_argument("--nurses", type=int, default=24, help="per department")
+    parser.add_argument("--staff", type=int, default=10, help="per department")
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dashboards", type=int, default=24)
+    parser.add_argument("--dashboard-interval", type=float, default=2.0)
+    parser.add_argument("--kiosks", type=int, default=60)
+    parser.add_argument("--kiosk-interval", type=float, default=2.0)
+    parser.add_argument("--burst-size", type=int, default=10)
+    parser.add_argument("--burst-interval", type=float, default=2.0)
+    parser.add_argument("--red-alert-interval", type=float, default=5.0)
+    parser.add_argument("--providers", choices=("stubs", "local"), default="stubs")
+    parser.add_argument("--openai-latency-ms", type=float, default=800)
+    parser.add_argument("--elevenlabs-latency-ms", type=float, default=400)
+    parser.add_argument("--out", default="", help="write the report as JSON")
+    parser.add_argument("--compare", default="", help="baseline report to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+    unknown = set(args.phases.split(",")) - set(PHASES)
+    if unknown:
+        parser.error(f"unknown phase(s): {', '.join(sorted(unknown))}")
+
+    report = run(args)
+    print(f"\nProviders: {report['providers']}")
+    if args.out:
+        path = os.path.join(INVOKED_FROM, args.out)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {path}")
+    if args.compare:
+        with open(os.path.join(INVOKED_FROM, args.compare)) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_ms)
+        print(f"\nAgainst {args.compare} ({baseline.get('git_commit') or 'unknown commit'}, "
+              f"tolerance {args.tolerance:.0%}): {len(regressions)} regression(s)")
+        for line in regressions:
+            print(f"  {line}")
+        PROVIDERS.close()
+        sys.exit(1 if regressions else 0)
+    PROVIDERS.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Synthetic hospital generator: departments, staff per role, and weeks of
+three-shift rotas with assignments, bulk-inserted straight into the
+database, then the coverage and weekly-load tables rebuilt from them.
+
+Staff work at most one shift a day and five a week, so rotas look like a
+real roster (and Safety Mode / fatigue checks see plausible loads); `fill`
+is the share of required seats that get someone. Same seed, same hospital.
+
+    python -m benchmarks.hospital [--departments 12] [--weeks 4] [--out hospital.db]
+"""
+
+import argparse
+import os
+import random
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from benchmarks._setup import INVOKED_FROM, WORKDIR, SessionLocal
+
+from sqlalchemy import func, insert
+
+from app.models.assignment import Assignment
+from app.models.department import Department
+from app.models.shift import Shift
+from app.models.user import User
+from app.security import hash_password
+from app.services.coverage_service import rebuild_coverage
+from app.services.rollup_service import rebuild_rollup
+
+PASSWORD = "benchmark"
+DEPARTMENT_NAMES = [
+    "Emergency", "ICU", "Cardiology", "Pediatrics", "Oncology", "Surgery", "Neurology", "Maternity",
+    "Orthopedics", "Radiology", "Psychiatry", "Geriatrics", "Nephrology", "Pulmonology",
+    "Gastroenterology", "Burn Unit", "Neonatal ICU", "Dermatology", "Urology", "Rehabilitation",
+]
+FIRST_NAMES = [
+    "Amina", "Ben", "Carla", "Dev", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kemi", "Luca",
+    "Maya", "Nikhil", "Olga", "Pedro", "Quinn", "Rosa", "Sami", "Tara", "Umar", "Vera", "Wei", "Yara", "Zoe",
+]
+LAST_NAMES = [
+    "Abbott", "Banerjee", "Costa", "Dubois", "Eze", "Fischer", "Garcia", "Haddad", "Ito", "Jensen",
+    "Kowalski", "Larsen", "Mensah", "Novak", "Okafor", "Petrov", "Quispe", "Rossi", "Silva", "Tanaka",
+]
+# Per-department headcount by role
+STAFF_PER_ROLE = {"manager": 1, "doctor": 8, "nurse": 24, "staff": 10}
+# (start hour, length) of the day, evening and night shifts
+SHIFT_PATTERN = [(7, 8), (15, 8), (23, 8)]
+# Seats per shift by role: day, evening, night
+REQUIRED = {"doctor": (2, 2, 1), "nurse": (6, 5, 4), "staff": (3, 2, 1)}
+MAX_SHIFTS_PER_WEEK = 5
+
+
+def _monday(day: datetime) -> datetime:
+    day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def generate(
+    db,
+    departments: int = 12,
+    staff_per_role: Optional[Dict[str, int]] = None,
+    weeks: int = 4,
+    start: Optional[datetime] = None,
+    fill: float = 0.85,
+    seed: int = 7,
+) -> dict:
+    """
+    Add a hospital to `db` (normally empty) and return its ids: admin,
+    departments, managers per department, users per role, shifts and
+    assignment counts. Rotas start on `start` (default: the Monday of last
+    week, so there is history as well as upcoming shifts).
+    """
+    rng = random.Random(seed)
+    per_role = {**STAFF_PER_ROLE, **(staff_per_role or {})}
+    start = _monday(start or datetime.utcnow() - timedelta(weeks=1))
+    password = hash_password(PASSWORD)
+
+    next_user = (db.query(func.max(User.id)).scalar() or 0) + 1
+    next_shift = (db.query(func.max(Shift.id)).scalar() or 0) + 1
+    taken = {name for (name,) in db.query(Department.name)}
+    names = [n for n in DEPARTMENT_NAMES if n not in taken]
+    names += [f"Ward {i}" for i in range(1, departments + 1) if f"Ward {i}" not in taken]
+    depts = [Department(name=name, description=f"Synthetic {name} department") for name in names[:departments]]
+    db.add_all(depts)
+    db.flush()
+    dept_ids = [d.id for d in depts]
+
+    users: List[dict] = [{
+        "id": next_user, "name": "Bench Admin", "email": f"admin{next_user}@hospital.bench", "role": "admin",
+        "password": password, "department_id": dept_ids[0], "is_active": True,
+    }]
+    by_role: Dict[str, List[int]] = {role: [] for role in per_role}
+    pools: Dict[tuple, List[int]] = {}
+    managers: Dict[int, int] = {}
+    for dept_id in dept_ids:
+        for role, count in per_role.items():
+            for _ in range(count):
+                uid = next_user + len(users)
+                users.append({
+                    "id": uid, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    "email": f"{role}{uid}@hospital.bench", "role": role, "password": password,
+                    "department_id": dept_id, "is_active": True,
+                })
+                by_role[role].append(uid)
+                pools.setdefault((dept_id, role), []).append(uid)
+                if role == "manager":
+                    managers.setdefault(dept_id, uid)
+    db.execute(insert(User), users)
+
+    shifts: List[dict] = []
+    assignments: List[dict] = []
+    for dept_id in dept_ids:
+        for role, seats in REQUIRED.items():
+            pool = pools.get((dept_id, role), [])
+            cursor = rng.randrange(len(pool)) if pool else 0
+            per_week: Dict[tuple, int] = {}
+            for day in range(weeks * 7):
+                date = start + timedelta(days=day)
+                worked_today = set()
+                for (hour, length), required in zip(SHIFT_PATTERN, seats):
+                    shift_id = next_shift + len(shifts)
+                    begins = date + timedelta(hours=hour)
+                    shifts.append({
+                        "id": shift_id, "department_id": dept_id, "start_time": begins,
+                        "end_time": begins + timedelta(hours=length), "required_role": role,
+                        "required_staff_count": required,
+                    })
+                    wanted = sum(rng.random() < fill for _ in range(required))
+                    for _ in range(len(pool)):
+                        if wanted == 0:
+                            break
+                        uid = pool[cursor % len(pool)]
+                        cursor += 1
+                        week = (uid, day // 7)
+                        if uid in worked_today or per_week.get(week, 0) >= MAX_SHIFTS_PER_WEEK:
+                            continue
+                        worked_today.add(uid)
+                        per_week[week] = per_week.get(week, 0) + 1
+                        assignments.append({"user_id": uid, "shift_id": shift_id, "is_emergency": False})
+                        wanted -= 1
+    db.execute(insert(Shift), shifts)
+    db.execute(insert(Assignment), assignments)
+    db.commit()
+    rebuild_coverage(db)
+    rebuild_rollup(db)
+
+    return {
+        "admin_id": users[0]["id"],
+        "departments": dept_ids,
+        "managers": managers,
+        "users": by_role,
+        "shifts": len(shifts),
+        "assignments": len(assignments),
+        "start": start.isoformat(),
+        "weeks": weeks,
+        "password": PASSWORD,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--departments", type=int, default=12)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--doctors", type=int, default=STAFF_PER_ROLE["doctor"])
+    parser.add_argument("--nurses", type=int, default=STAFF_PER_ROLE["nurse"])
+    parser.add_argument("--staff", type=int, default=STAFF_PER_ROLE["staff"])
+    parser.add_argument("--fill", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="", help="copy the generated SQLite database here")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = datetime.utcnow()
+    hospital = generate(db, args.departments, {"doctor": args.doctors, "nurse": args.nurses, "staff": args.staff},
+                        args.weeks, fill=args.fill, seed=args.seed)
+    db.close()
+    seconds = (datetime.utcnow() - started).total_seconds()
+    users = sum(len(ids) for ids in hospital["users"].values()) + 1
+    print(f"{len(hospital['departments'])} departments, {users} users, {hospital['shifts']} shifts, "
+          f"{hospital['assignments']} assignments from {hospital['start'][:10]} in {seconds:.1f}s")
+    if args.out:
+        out = os.path.join(INVOKED_FROM, args.out)
+        shutil.copyfile(os.path.join(WORKDIR, "medroster.db"), out)
+        print(f"Saved to {out} (password for every account: {PASSWORD})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Login storm at shift change: many concurrent /auth/login calls while a probe
+keeps hitting an unrelated authenticated endpoint. Reports login throughput,
+login latency, 503 rejections and the probe's latency under load.
+
+    python -m benchmarks.login_throughput [--logins 300] [--concurrency 100]
+
+Tune with BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS and PASSWORD_HASH_MAX_PENDING.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks._setup import SessionLocal
+
+import httpx
+
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from app.main import app
+from app.models.user import User
+from app.security import access_token_for, hash_password, hashing_stats, shutdown_hashing_pool
+
+PASSWORD = "shift-change"
+
+
+def seed(users: int) -> str:
+    """Create users sharing one precomputed hash; returns a token for the probe."""
+    db = SessionLocal()
+    hashed = hash_password(PASSWORD)
+    db.bulk_insert_mappings(User, [
+        {"name": f"Staff {i}", "email": f"staff{i}@bench", "role": "nurse", "password": hashed, "is_active": True}
+        for i in range(users)
+    ])
+    db.commit()
+    token = access_token_for(db.query(User).first())
+    db.close()
+    return token
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+async def storm(logins: int, concurrency: int, token: str) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        gate = asyncio.Semaphore(concurrency)
+        login_times, statuses = [], {}
+        probe_times = []
+        done = asyncio.Event()
+
+        async def login(i: int):
+            async with gate:
+                t0 = time.perf_counter()
+                r = await client.post("/auth/login", data={"username": f"staff{i}@bench", "password": PASSWORD})
+                login_times.append(time.perf_counter() - t0)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        async def probe():
+            headers = {"Authorization": f"Bearer {token}"}
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/departments/", headers=headers)
+                probe_times.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.02)
+
+        # Warm the pool so process start-up is not billed to the first logins
+        await client.post("/auth/login", data={"username": "staff0@bench", "password": PASSWORD})
+
+        probe_task = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await probe_task
+
+    print(f"[Bench] Login storm: {logins} logins, concurrency {concurrency}, bcrypt rounds {BCRYPT_ROUNDS}, "
+          f"{PASSWORD_HASH_WORKERS} hash workers, max pending {PASSWORD_HASH_MAX_PENDING}")
+    print(f"        throughput={statuses.get(200, 0) / elapsed:.1f} logins/s  statuses={statuses}")
+    print(f"        login p50={_pct(login_times, 0.5):.0f} ms  p95={_pct(login_times, 0.95):.0f} ms")
+    print(f"        probe GET /departments/ p50={_pct(probe_times, 0.5):.1f} ms  "
+          f"p95={_pct(probe_times, 0.95):.1f} ms  n={len(probe_times)}")
+    print(f"        hashing={hashing_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    token = seed(args.logins)
+    try:
+        asyncio.run(storm(args.logins, args.concurrency, token))
+    finally:
+        shutdown_hashing_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of the metrics middleware and SQL hooks: mean time per request for a
+few representative endpoints, plus the time to render a scrape. Compare a
+run with METRICS_ENABLED=false against one with the default:
+
+    METRICS_ENABLED=false python -m benchmarks.metrics_overhead
+    python -m benchmarks.metrics_overhead [--requests 300]
+"""
+
+import argparse
+import time
+
+from benchmarks._setup import SessionLocal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app import metrics
+from app.config import METRICS_ENABLED
+from app.main import app
+from app.models.department import Department
+from app.models.user import User
+from app.security import access_token_for
+
+ENDPOINTS = ["/", "/public/departments", "/departments/", "/users/"]
+
+
+def seed(users: int) -> str:
+    db = SessionLocal()
+    db.add_all([Department(name=f"Dept {i}") for i in range(1, 21)])
+    db.execute(insert(User), [
+        {"name": f"Staff {i}", "email": f"s{i}@bench", "role": "nurse", "password": "x",
+         "department_id": 1 + i % 20, "is_active": True}
+        for i in range(users)
+    ])
+    db.commit()
+    token = access_token_for(db.query(User).first())
+    db.close()
+    return token
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed(args.users)}"}
+    client = TestClient(app)
+    print(f"metrics {'enabled' if METRICS_ENABLED else 'disabled'}, {args.requests} requests per endpoint")
+    for path in ENDPOINTS:
+        for _ in range(20):
+            client.get(path, headers=headers)
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(path, headers=headers)
+        print(f"  GET {path:22} {(time.perf_counter() - t0) * 1000 / args.requests:8.3f} ms/request")
+    t0 = time.perf_counter()
+    text = metrics.render()
+    print(f"  render scrape: {(time.perf_counter() - t0) * 1000:.2f} ms, {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
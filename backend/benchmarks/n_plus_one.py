@@ -0,0 +1,113 @@
+"""
+N+1 audit: runs every GET route and the main write paths (shift and
+assignment creation, broadcast + acks, Red Alert, workload analysis)
+against a seeded roster under sqltrace.capture(), prints statements and
+distinct statement shapes per request, and details every shape repeated
+--threshold or more times with the app lines that issued it. Exits 1 if
+any request has an N+1 suspect, so it can gate CI.
+
+    python -m benchmarks.n_plus_one [--staff 300] [--threshold 10]
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks._setup import SessionLocal
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app import sqltrace
+from app.main import app
+from app.models.assignment import Assignment
+from app.models.department import Department
+from app.models.shift import Shift
+from app.models.user import User
+from app.security import access_token_for
+from app.services.coverage_service import rebuild_coverage
+
+# Docs, scrapes, provider-only and file routes have nothing to audit
+SKIP = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc", "/metrics", "/ai/tip",
+        "/emergency/sql-traces", "/emergency/voice-alert/{filename}"}
+
+
+def seed(db, staff: int):
+    now = datetime.utcnow()
+    depts = [Department(name=f"Dept {i}") for i in range(1, 11)]
+    db.add_all(depts)
+    db.flush()
+    admin = User(name="Audit Admin", email="admin@bench", role="admin", password="x", department_id=depts[0].id)
+    users = [User(name=f"Staff {i}", email=f"s{i}@bench", role="nurse" if i % 3 else "doctor", password="x",
+                  department_id=depts[i % 10].id) for i in range(staff)]
+    db.add_all([admin] + users)
+    db.flush()
+    shifts = [Shift(department_id=d.id, start_time=now + timedelta(hours=h), end_time=now + timedelta(hours=h + 8),
+                    required_role="nurse", required_staff_count=5)
+              for d in depts for h in range(-4, 72, 8)]
+    db.add_all(shifts)
+    db.flush()
+    by_dept = {}
+    for s in shifts:
+        by_dept.setdefault(s.department_id, []).append(s)
+    db.add_all([Assignment(user_id=u.id, shift_id=by_dept[u.department_id][i % 3].id) for i, u in enumerate(users)])
+    db.commit()
+    rebuild_coverage(db)
+    return admin, users, shifts
+
+
+def scenarios(users, shifts):
+    """(method, path, JSON body or GET query params)"""
+    now = datetime.utcnow()
+    free_shift = next(s for s in shifts if s.start_time > now + timedelta(hours=40))
+    yield "POST", "/shifts/", {"department_id": 2, "start_time": (now + timedelta(days=5)).isoformat(),
+                               "end_time": (now + timedelta(days=5, hours=8)).isoformat(), "required_role": "nurse"}
+    yield "POST", "/assignments/", {"user_id": users[1].id, "shift_id": free_shift.id}
+    yield "POST", "/emergency/broadcast", {"severity": "high", "target_roles": ["all"], "message": "Drill"}
+    yield "POST", "/emergency/broadcasts/acks", {"acks": [{"broadcast_id": 1, "user_id": u.id} for u in users[:100]]}
+    yield "POST", "/emergency/red-alert", {"emergency_type": "ICU surge", "department_id": 1, "refine_with_ai": False}
+    yield "POST", "/ai/analyze-workload", {}
+
+    window = {"start": (now - timedelta(days=1)).isoformat(), "end": (now + timedelta(days=4)).isoformat()}
+    queries = {"/history/shifts": window, "/history/audit-logs": window}
+    params = {"user_id": users[0].id, "dept_id": 1, "department_id": 1, "shift_id": shifts[0].id, "broadcast_id": 1}
+    for route in app.routes:
+        if isinstance(route, APIRoute) and "GET" in route.methods and route.path not in SKIP:
+            yield "GET", route.path.format(**params), queries.get(route.path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--staff", type=int, default=300)
+    parser.add_argument("--threshold", type=int, default=10)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    admin, users, shifts = seed(db, args.staff)
+    headers = {"Authorization": f"Bearer {access_token_for(admin)}"}
+    client = TestClient(app)
+
+    suspects = []
+    print(f"{'request':48} {'status':>6} {'SQL':>5} {'shapes':>6} {'max×':>5}")
+    for method, path, body in scenarios(users, shifts):
+        with sqltrace.capture(f"{method} {path}", threshold=args.threshold) as trace:
+            if method == "GET":
+                status = client.get(path, params=body, headers=headers).status_code
+            else:
+                status = client.request(method, path, json=body, headers=headers).status_code
+        worst = max((s.count for s in trace.shapes.values()), default=0)
+        flag = "  N+1" if trace.n_plus_one() else ""
+        print(f"{method + ' ' + path:48} {status:>6} {trace.queries:>5} {len(trace.shapes):>6} {worst:>5}{flag}")
+        if trace.n_plus_one():
+            suspects.append(trace)
+    db.close()
+
+    for trace in suspects:
+        print()
+        print(trace.report())
+    print(f"\n{len(suspects)} request(s) with N+1 suspects (threshold {args.threshold})")
+    sys.exit(1 if suspects else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Kiosk polling load on the unauthenticated public read path, served by a real
+uvicorn worker on localhost. Keep-alive clients (in forked processes) hammer
+one path at a time for a fixed duration; the report gives requests/second
+for the single worker, latency, and SQL statements per request.
+
+    python -m benchmarks.public_load [--seconds 5] [--connections 32] [--processes 2]
+
+On a single core the client processes compete with the server for CPU, so
+the absolute numbers understate what a dedicated worker sustains; compare
+paths against each other.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._setup import QueryCounter, SessionLocal
+
+import uvicorn
+from sqlalchemy import insert
+
+from app.main import app
+from app.models.assignment import Assignment
+from app.models.department import Department
+from app.models.shift import Shift
+from app.models.user import User
+from app.services.coverage_service import rebuild_coverage
+
+DEPARTMENTS = 30
+
+
+def seed() -> None:
+    db = SessionLocal()
+    db.add_all([Department(name=f"Department {i}") for i in range(1, DEPARTMENTS + 1)])
+    db.execute(insert(User), [
+        {"name": f"Staff {i}", "email": f"s{i}@bench", "role": "nurse", "password": "x",
+         "department_id": 1 + i % DEPARTMENTS, "is_active": True}
+        for i in range(600)
+    ])
+    now = datetime.utcnow()
+    db.execute(insert(Shift), [
+        {"department_id": 1 + i % DEPARTMENTS, "start_time": now + timedelta(hours=i % 48 - 8),
+         "end_time": now + timedelta(hours=i % 48), "required_role": "nurse", "required_staff_count": 4}
+        for i in range(3000)
+    ])
+    rng = random.Random(7)
+    db.execute(insert(Assignment), [
+        {"user_id": 1 + i % 600, "shift_id": shift_id}
+        for i, shift_id in enumerate(rng.sample(range(1, 3001), 2000))
+    ])
+    db.commit()
+    rebuild_coverage(db)
+    db.close()
+
+
+def _free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def serve(port: int) -> tuple:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _read_response(reader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line[:15].lower() == b"content-length:":
+            length = int(line[15:])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client_worker(port: int, connections: int, jobs, results) -> None:
+    """Runs in a child process: one round per job, `connections` keep-alive clients each."""
+    while True:
+        job = await asyncio.to_thread(jobs.get)
+        if job is None:
+            return
+        path, extra_headers, seconds = job
+        request = (f"GET {path} HTTP/1.1\r\nHost: bench\r\n{extra_headers}\r\n").encode()
+        latencies, statuses = [], {}
+        deadline = time.perf_counter() + seconds
+
+        async def client():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                writer.write(request)
+                status = await _read_response(reader)
+                latencies.append(time.perf_counter() - t0)
+                statuses[status] = statuses.get(status, 0) + 1
+            writer.close()
+
+        await asyncio.gather(*(client() for _ in range(connections)))
+        results.put((latencies, statuses))
+
+
+def _client_process(port, connections, jobs, results):
+    asyncio.run(_client_worker(port, connections, jobs, results))
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000 if values else 0.0
+
+
+def run(seconds: float, connections: int, processes: int, paths) -> None:
+    seed()
+    port = _free_port()
+    ctx = multiprocessing.get_context("fork")
+    jobs, results = ctx.Queue(), ctx.Queue()
+    per_process = max(1, connections // processes)
+    workers = [ctx.Process(target=_client_process, args=(port, per_process, jobs, results)) for _ in range(processes)]
+    for w in workers:
+        w.start()
+
+    server, thread = serve(port)
+    try:
+        import httpx
+        print(f"{'path':52} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'SQL/req':>8}  statuses")
+        for label, path, conditional in paths:
+            extra = ""
+            if conditional:
+                tag = httpx.get(f"http://127.0.0.1:{port}{path}").headers.get("etag", "")
+                extra = f"If-None-Match: {tag}\r\n"
+            with QueryCounter() as queries:
+                for _ in workers:
+                    jobs.put((path, extra, seconds))
+                latencies, statuses = [], {}
+                for _ in workers:
+                    worker_latencies, worker_statuses = results.get(timeout=seconds + 60)
+                    latencies += worker_latencies
+                    for status, n in worker_statuses.items():
+                        statuses[status] = statuses.get(status, 0) + n
+            total = len(latencies)
+            print(f"{label:52} {total / seconds:8.0f} {_pct(latencies, 0.5):8.1f} {_pct(latencies, 0.99):8.1f} "
+                  f"{queries.count / max(total, 1):8.2f}  {statuses}")
+        for _ in workers:
+            jobs.put(None)
+        for w in workers:
+            w.join(timeout=30)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+PATHS = [
+    ("GET /public/departments", "/public/departments", False),
+    ("GET /public/departments (If-None-Match)", "/public/departments", True),
+    ("GET /public/departments/7/status", "/public/departments/7/status", False),
+    ("GET /public/departments/7/status?language=es", "/public/departments/7/status?language=es", False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=2)
+    args = parser.parse_args()
+    run(args.seconds, args.connections, args.processes, PATHS)
+
+
+if __name__ == "__main__":
+    main()
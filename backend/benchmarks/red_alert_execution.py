@@ -0,0 +1,108 @@
+"""
+Red Alert execution stage: 200 AI-proposed reassignments (with the name
+variations LLMs produce) against a 1,000-person on-duty roster.
+
+    python -m benchmarks.red_alert_execution [--reassignments 200] [--staff 1000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._setup import QueryCounter, SessionLocal
+
+from app.models.assignment import Assignment
+from app.models.department import Department
+from app.models.shift import Shift
+from app.models.user import User
+from app.services.coverage_service import rebuild_coverage
+from app.services.emergency_service import build_staffing_snapshot, execute_reassignments
+
+FIRST = ["Jane", "John", "Maria", "Wei", "Aisha", "Carlos", "Priya", "Tom", "Fatima", "Olga"]
+LAST = ["Smith", "Garcia", "Chen", "Okafor", "Novak", "Patel", "Kim", "Müller", "Rossi", "Haddad"]
+
+
+def _variant(name: str, rng: random.Random) -> str:
+    first, last, number = name.split(" ")
+    return rng.choice([
+        name,
+        name.upper(),
+        f"Dr. {name}",
+        f"{last}, {first} {number}",
+        f"Nurse {first} {last} {number}",
+        f"{first} {last[:-1]} {number}",  # dropped letter → fuzzy match
+    ])
+
+
+def seed(db, staff_count: int, rng: random.Random):
+    now = datetime.utcnow()
+    depts = [Department(name=f"Dept {i}") for i in range(10)]
+    db.add_all(depts)
+    db.flush()
+    target_dept = depts[0]
+
+    users = []
+    for i in range(staff_count):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}"
+        users.append(User(name=name, email=f"u{i}@bench", role="nurse", password="x",
+                          department_id=depts[1 + i % 9].id))
+    db.add_all(users)
+    db.flush()
+
+    current = {}
+    for d in depts[1:]:
+        current[d.id] = Shift(department_id=d.id, start_time=now - timedelta(hours=2),
+                              end_time=now + timedelta(hours=6), required_role="nurse",
+                              required_staff_count=staff_count // 9)
+    targets = [
+        Shift(department_id=target_dept.id, start_time=now + timedelta(hours=h),
+              end_time=now + timedelta(hours=h + 8), required_role="nurse", required_staff_count=40)
+        for h in range(0, 10, 2)
+    ]
+    db.add_all(list(current.values()) + targets)
+    db.flush()
+    db.add_all([Assignment(user_id=u.id, shift_id=current[u.department_id].id) for u in users])
+    db.commit()
+    rebuild_coverage(db)
+    return target_dept
+
+
+def run(reassignments: int, staff: int, repeats: int) -> None:
+    rng = random.Random(7)
+    db = SessionLocal()
+    dept = seed(db, staff, rng)
+    now = datetime.utcnow()
+    on_duty, _ = build_staffing_snapshot(db, now)
+
+    timings, queries = [], []
+    for _ in range(repeats):
+        picks = rng.sample(on_duty, reassignments)
+        plan = [{"staff_name": _variant(s["name"], rng)} for s in picks]
+
+        with QueryCounter() as qc:
+            t0 = time.perf_counter()
+            out = execute_reassignments(
+                db, plan, on_duty, dept.id, dept.name, "benchmark surge", now
+            )
+            db.flush()
+            timings.append(time.perf_counter() - t0)
+        queries.append(qc.count)
+        created = len(out["created"])
+        db.rollback()
+
+    print(f"[Bench] Red Alert execution: {reassignments} reassignments, {staff} on-duty staff")
+    print(f"        created={created} unresolved={len(out['unresolved'])}")
+    print(f"        median={statistics.median(timings) * 1000:.1f} ms  "
+          f"max={max(timings) * 1000:.1f} ms  queries={statistics.median(queries):.0f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reassignments", type=int, default=200)
+    parser.add_argument("--staff", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.reassignments, args.staff, args.repeats)
@@ -0,0 +1,169 @@
+"""
+Local stand-ins for OpenAI and ElevenLabs, so load runs exercise the real
+provider code paths (HTTP client, timeouts, token accounting) without
+network, keys or cost. Each stub is a threaded HTTP server on localhost
+that sleeps a configurable latency before answering.
+
+- OpenAI: POST /v1/chat/completions returns a chat.completion whose
+  content is JSON. Emergency prompts get a plan built from the on-duty and
+  off-duty staff listed in the prompt, so the Red Alert execution stage has
+  real reassignments to apply; other prompts get a generic object.
+- ElevenLabs: POST /v1/text-to-speech/{voice_id} returns fake MP3 bytes,
+  roughly one second of audio per 15 characters.
+
+    with stubs.running(openai_latency_ms=800) as providers:
+        os.environ.update(providers.env())
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+
+# 16 KB/s is a 128 kbit/s MP3
+AUDIO_BYTES_PER_CHAR = 16_000 // 15
+_ON_DUTY = "Staff Currently On Duty (can be reassigned):\n"
+_OFF_DUTY = "Staff Off Duty (can be called in):\n"
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _staff_list(prompt: str, heading: str) -> List[dict]:
+    """The JSON array printed after `heading` in an emergency prompt."""
+    start = prompt.find(heading)
+    if start < 0:
+        return []
+    try:
+        value, _ = json.JSONDecoder().raw_decode(prompt[start + len(heading):])
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _emergency_plan(prompt: str) -> dict:
+    department = prompt.split("Department Needing Help: ", 1)[1].split("\n", 1)[0]
+    on_duty = _staff_list(prompt, _ON_DUTY)
+    off_duty = _staff_list(prompt, _OFF_DUTY)
+    return {
+        "immediate_reassignments": [
+            {"staff_id": s.get("id"), "staff_name": s.get("name"),
+             "from_department": s.get("current_department", ""), "to_department": department,
+             "urgency": "immediate"}
+            for s in on_duty[:3]
+        ],
+        "call_in_requests": [
+            {"staff_name": s.get("name"), "role": s.get("role", ""), "reason": "Emergency surge coverage"}
+            for s in off_duty[:2]
+        ],
+        "estimated_coverage_minutes": 15,
+        "critical_warning": "Stub plan (benchmark)",
+        "voice_announcement": (
+            f"Attention all staff. {department} needs immediate reinforcement; "
+            f"reassigned staff please report now."
+        ),
+    }
+
+
+def _completion(prompt: str) -> str:
+    if "Emergency AI" in prompt:
+        return json.dumps(_emergency_plan(prompt))
+    if "json" in prompt.lower():
+        return json.dumps({
+            "assignments": [], "recommendations": ["Stub recommendation (benchmark)"],
+            "fairness_score": 80, "overworked_staff": [], "underutilized_staff": [],
+        })
+    return "Stub tip: rotate night shifts fairly."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_StubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.server.count(self.path)
+        time.sleep(self.server.latency)
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+            content = _completion(prompt)
+            body = {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": payload.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": _tokens(prompt), "completion_tokens": _tokens(content),
+                          "total_tokens": _tokens(prompt) + _tokens(content)},
+            }
+            self._reply(200, json.dumps(body).encode(), "application/json")
+        elif "/text-to-speech/" in self.path:
+            size = max(1, len(payload.get("text", ""))) * AUDIO_BYTES_PER_CHAR
+            self._reply(200, b"ID3" + b"\x00" * size, "audio/mpeg")
+        else:
+            self._reply(404, b'{"error": "not stubbed"}', "application/json")
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_ms: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency_ms / 1000
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def count(self, path: str) -> None:
+        route = "/v1/text-to-speech" if "/text-to-speech/" in path else path
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class Providers:
+    def __init__(self, openai_latency_ms: float, elevenlabs_latency_ms: float):
+        self.openai = _StubServer(openai_latency_ms)
+        self.elevenlabs = _StubServer(elevenlabs_latency_ms)
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points app.config at the stubs."""
+        return {
+            "OPENAI_API_KEY": "sk-stub",
+            "OPENAI_BASE_URL": self.openai.url,
+            "ELEVENLABS_API_KEY": "stub",
+            "ELEVENLABS_VOICE_ID": "stub-voice",
+            "ELEVENLABS_BASE_URL": self.elevenlabs.url,
+        }
+
+    def calls(self) -> Dict[str, Dict[str, int]]:
+        return {"openai": dict(self.openai.calls), "elevenlabs": dict(self.elevenlabs.calls)}
+
+    def close(self) -> None:
+        for server in (self.openai, self.elevenlabs):
+            server.shutdown()
+            server.server_close()
+
+
+@contextmanager
+def running(openai_latency_ms: float = 800, elevenlabs_latency_ms: float = 400) -> Iterator[Providers]:
+    providers = Providers(openai_latency_ms, elevenlabs_latency_ms)
+    try:
+        yield providers
+    finally:
+        providers.close()
@@ -0,0 +1,206 @@
+"""
+Live-update fan-out: N WebSocket clients (spread over a few client
+processes) subscribed to one department topic, served by a real uvicorn
+server on localhost. Events are published on the bus, as a committed roster
+write would, and the report gives publish → last-client-received latency per
+event, plus what happens to deliberately slow clients that stop reading.
+
+    python -m benchmarks.ws_fanout [--connections 2000] [--events 50] [--slow 20] [--processes 4]
+
+Clients do not negotiate permessage-deflate, so the volume reaching a slow
+client's socket is what --padding says; it takes tens of MB (kernel socket
+buffers) before a client that stops reading pushes back on the server.
+Tune with WS_SEND_QUEUE_SIZE and WS_SLOW_CONSUMER_DROPS.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import threading
+import time
+
+from benchmarks._setup import SessionLocal
+
+import uvicorn
+import websockets
+
+from app.config import WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_DROPS
+from app.main import app
+from app.models.department import Department
+from app.models.user import User
+from app.security import access_token_for, hash_password
+from app.services import event_bus
+
+
+def seed() -> tuple:
+    db = SessionLocal()
+    dept = Department(name="ICU")
+    db.add(dept)
+    db.flush()
+    user = User(name="Dashboard", email="dash@bench", role="manager",
+                password=hash_password("x"), department_id=dept.id, is_active=True)
+    db.add(user)
+    db.commit()
+    result = (access_token_for(user), dept.id)
+    db.close()
+    return result
+
+
+def _free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def serve(port: int) -> tuple:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           ws_max_queue=32, backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+async def _client_worker(url: str, indices: range, slow: int, events: int, timeout: float, results, finished) -> None:
+    """Runs in a child process: holds its share of the connections and reports arrival times."""
+    async def connect(i: int):
+        ws = await websockets.connect(url, max_queue=1 if i < slow else None, compression=None, open_timeout=60)
+        await ws.recv()  # subscribed
+        return i, ws
+
+    sockets = []
+    for start in range(indices.start, indices.stop, 200):
+        sockets += await asyncio.gather(*(connect(i) for i in range(start, min(start + 200, indices.stop))))
+    results.put(("ready", len(sockets)))
+
+    last_arrival: dict = {}  # seq → latest arrival over this worker's reading clients
+    lagged, complete = 0, 0
+
+    async def reader(ws):
+        nonlocal lagged, complete
+        seen = 0
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if message["type"] == "lagged":
+                    lagged += message["dropped"]
+                    continue
+                batch = message["events"] if message["type"] == "batch" else [message]
+                now = time.time()
+                for event in batch:
+                    if event["type"] != "event":
+                        continue
+                    seq = event["data"]["seq"]
+                    last_arrival[seq] = max(last_arrival.get(seq, 0.0), now - event["data"]["sent_at"])
+                    seen += 1
+                if seen >= events:
+                    complete += 1
+                    return
+        except websockets.ConnectionClosed:
+            pass
+
+    # Clients below `slow` never read: their TCP buffers fill and the server has to shed them
+    readers = [reader(ws) for i, ws in sockets if i >= slow]
+    try:
+        await asyncio.wait_for(asyncio.gather(*readers), timeout)
+    except asyncio.TimeoutError:
+        pass
+    # Keep the slow clients connected until publishing is over
+    await asyncio.to_thread(finished.wait, timeout)
+    results.put(("done", last_arrival, lagged, complete))
+    await asyncio.gather(*(ws.close() for _, ws in sockets), return_exceptions=True)
+
+
+def _client_process(url, indices, slow, events, timeout, results, finished):
+    asyncio.run(_client_worker(url, indices, slow, events, timeout, results, finished))
+
+
+def run(connections: int, events: int, slow: int, padding: int, processes: int):
+    token, dept_id = seed()
+    port = _free_port()
+    url = f"ws://127.0.0.1:{port}/ws/events?token={token}&topics=department:{dept_id}"
+
+    # Fork the clients before the server starts any threads
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    finished = ctx.Event()
+    step = -(-connections // processes)
+    workers = [
+        ctx.Process(target=_client_process,
+                    args=(url, range(start, min(start + step, connections)), slow, events, 60.0, results, finished))
+        for start in range(0, connections, step)
+    ]
+
+    server, thread = serve(port)
+    try:
+        t0 = time.perf_counter()
+        for w in workers:
+            w.start()
+        for _ in workers:
+            assert results.get(timeout=300)[0] == "ready"
+        connect_s = time.perf_counter() - t0
+
+        pad = base64.b64encode(os.urandom(padding * 3 // 4)).decode()
+        t0 = time.perf_counter()
+        for seq in range(events):
+            event_bus.publish([event_bus.department_topic(dept_id)], "shift.created",
+                              {"seq": seq, "sent_at": time.time(), "pad": pad})
+            time.sleep(0.02)
+        publish_s = time.perf_counter() - t0
+        finished.set()
+
+        latency: dict = {}
+        lagged = complete = 0
+        for _ in workers:
+            _, arrivals, worker_lagged, worker_complete = results.get(timeout=120)
+            for seq, value in arrivals.items():
+                latency[seq] = max(latency.get(seq, 0.0), value)
+            lagged += worker_lagged
+            complete += worker_complete
+        stats = event_bus.bus_stats()
+        for w in workers:
+            w.join(timeout=30)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    values = list(latency.values())
+    print(f"connections: {connections} over {len(workers)} client processes ({slow} never read), "
+          f"connected in {connect_s:.1f}s")
+    print(f"events: {events} x {padding} B padding over {publish_s:.1f}s, send queue {WS_SEND_QUEUE_SIZE}, "
+          f"evict after {WS_SLOW_CONSUMER_DROPS} drops in a row")
+    print(f"reading clients that got every event: {complete}/{connections - slow}")
+    if values:
+        print(f"publish → last client: p50 {_pct(values, 0.5):.1f} ms, p95 {_pct(values, 0.95):.1f} ms, "
+              f"max {max(values) * 1000:.1f} ms, mean {statistics.mean(values) * 1000:.1f} ms")
+    print(f"frames sent: {stats['frames_total']} for {stats['delivered_total']} deliveries")
+    print(f"bus: delivered {stats['delivered_total']}, dropped {stats['dropped_total']}, "
+          f"evicted {stats['evicted_total']}, lagged notices received {lagged}, queued at end {stats['queued']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=20)
+    parser.add_argument("--padding", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    run(args.connections, args.events, args.slow, args.padding, args.processes)
+
+
+if __name__ == "__main__":
+    main()